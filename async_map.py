@@ -0,0 +1,277 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: asyncio front end for a HashMap. Concurrent get/put/remove/
+#              contains_key calls are queued and a single task applies
+#              whatever has queued up as batched get_many/put_many/...
+#              calls, so thousands of coroutines share one pass over the
+#              map. The queue is bounded, so callers wait (back-pressure)
+#              once too many requests are pending.
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from a6_include import hash_function_1
+import hash_map_oa
+import hash_map_sc
+
+
+# Operations a request can ask for
+_GET = 'get'
+_PUT = 'put'
+_REMOVE = 'remove'
+_CONTAINS = 'contains'
+
+# Passed to get_many so that each get can substitute its own default
+_MISSING = object()
+
+
+class _Failure:
+    """
+    Result of a request whose batch call raised, so that it can be told
+    apart from a stored value that happens to be an exception
+    """
+    def __init__(self, error: Exception) -> None:
+        self.error = error
+
+
+class AsyncMap:
+    """
+    Coalesces concurrent requests to a HashMap into batched operations.
+    Requests are applied in the order they were made; consecutive requests
+    of the same kind form one batch call.
+    """
+    def __init__(self, hash_map,
+                 window: float = 0.0,
+                 max_batch: int = 1024,
+                 max_pending: int = 16384,
+                 executor=None) -> None:
+        """
+        Wraps a HashMap that has the batch API (get_many, put_many, ...).
+
+        After the first request of a batch arrives, the batching task waits
+        window seconds (or just lets every ready coroutine run, with the
+        default of 0) and then takes up to max_batch queued requests. At
+        most max_pending requests may be queued; further calls wait for
+        room. With an executor, batches run in its threads instead of
+        blocking the event loop.
+        """
+        self._map = hash_map
+        self._window = window
+        self._max_batch = max(1, max_batch)
+        self._max_pending = max(1, max_pending)
+        self._executor = executor
+        self._queue = None
+        self._task = None
+
+        # Counters for stats()
+        self._requests = 0
+        self._batches = 0
+
+    async def __aenter__(self) -> 'AsyncMap':
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    def get_map(self):
+        """
+        Returns the wrapped HashMap
+        """
+        return self._map
+
+    def stats(self) -> dict:
+        """
+        Returns how many requests have been served and in how many batch
+        calls
+        """
+        return {'requests': self._requests, 'batches': self._batches}
+
+    async def get(self, key: str, default: object = None) -> object:
+        """
+        Returns the value associated with the given key, or default
+        """
+        return await self._request(_GET, key, default)
+
+    async def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hash map
+        """
+        await self._request(_PUT, key, value)
+
+    async def remove(self, key: str) -> None:
+        """
+        Removes the given key and its value from the hash map
+        """
+        await self._request(_REMOVE, key)
+
+    async def contains_key(self, key: str) -> bool:
+        """
+        Returns true if the given key is in the hash map, false otherwise
+        """
+        return await self._request(_CONTAINS, key)
+
+    async def close(self) -> None:
+        """
+        Waits for every queued request to be applied, then stops the
+        batching task
+        """
+        if self._task is None:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _request(self, operation: str, key: str,
+                       value: object = None) -> object:
+        """
+        Queues a request, waiting while the queue is full, and returns its
+        result once its batch has been applied
+        """
+        # The queue and task belong to the running event loop, so they are
+        # only created once a request is made
+        if self._task is None:
+            self._queue = asyncio.Queue(self._max_pending)
+            self._task = asyncio.get_running_loop().create_task(self._serve())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((operation, key, value, future))
+        return await future
+
+    async def _serve(self) -> None:
+        """
+        Takes batches of requests off the queue and applies them, forever
+        """
+        queue = self._queue
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+
+            # Give other coroutines the window to add their requests
+            await asyncio.sleep(self._window)
+            while len(batch) < self._max_batch and not queue.empty():
+                batch.append(queue.get_nowait())
+
+            if self._executor is None:
+                results = self._apply(batch)
+            else:
+                results = await loop.run_in_executor(self._executor,
+                                                     self._apply, batch)
+
+            for num in range(len(batch)):
+                future = batch[num][3]
+                # A caller that gave up waiting has cancelled its future
+                if not future.done():
+                    result = results[num]
+                    if isinstance(result, _Failure):
+                        future.set_exception(result.error)
+                    else:
+                        future.set_result(result)
+                queue.task_done()
+
+    def _apply(self, batch: list) -> list:
+        """
+        Applies a batch of requests in order, one batch call for each run
+        of requests of the same kind, and returns each request's result.
+        When a batch call fails, its run is applied again request by
+        request and only the requests that fail get the exception.
+        """
+        self._batches += 1
+        self._requests += len(batch)
+
+        results = []
+        start = 0
+        while start < len(batch):
+            operation = batch[start][0]
+            stop = start + 1
+            while stop < len(batch) and batch[stop][0] == operation:
+                stop += 1
+            run = batch[start:stop]
+            try:
+                results.extend(self._apply_run(operation, run))
+            except Exception:
+                # Retry the run one request at a time, so only the
+                # requests that fail on their own see an exception. Puts
+                # and removes the batch call already made are repeated in
+                # order, which leaves the map as the batch call would have.
+                for request in run:
+                    try:
+                        results.extend(self._apply_run(operation, [request]))
+                    except Exception as error:
+                        results.append(_Failure(error))
+            start = stop
+        return results
+
+    def _apply_run(self, operation: str, run: list) -> list:
+        """
+        Applies a run of requests of one kind with a single batch call and
+        returns their results
+        """
+        keys = [request[1] for request in run]
+        if operation == _GET:
+            values = self._map.get_many(keys, _MISSING)
+            return [run[num][2] if values[num] is _MISSING else values[num]
+                    for num in range(len(run))]
+        if operation == _CONTAINS:
+            found = self._map.contains_many(keys)
+            return [found[num] for num in range(len(run))]
+        if operation == _PUT:
+            self._map.put_many([(request[1], request[2]) for request in run])
+        else:
+            self._map.remove_many(keys)
+        return [None] * len(run)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    async def main() -> None:
+        print("\nconcurrent puts and gets")
+        print("------------------------")
+        async with AsyncMap(hash_map_sc.HashMap(53, hash_function_1)) as m:
+            await asyncio.gather(*(m.put('str' + str(i), i * 100)
+                                   for i in range(150)))
+            values = await asyncio.gather(*(m.get('str' + str(i), -1)
+                                            for i in range(0, 300, 50)))
+            print(values, m.get_map().get_size(), m.stats())
+
+            # Requests keep their order even inside one batch
+            results = await asyncio.gather(
+                m.put('key', 1), m.get('key'), m.remove('key'),
+                m.contains_key('key'), m.put('key', 2), m.get('key'))
+            print(results, m.stats())
+
+        print("\nsmall queue, executor")
+        print("---------------------")
+        with ThreadPoolExecutor(1) as executor:
+            async with AsyncMap(hash_map_oa.HashMap(11, hash_function_1),
+                                max_batch=16, max_pending=8,
+                                executor=executor) as m:
+                await asyncio.gather(*(m.put('key' + str(i), i)
+                                       for i in range(100)))
+                total = sum(await asyncio.gather(*(m.get('key' + str(i))
+                                                   for i in range(100))))
+                print(total, m.stats())
+
+        print("\nexceptions as values")
+        print("--------------------")
+        async with AsyncMap(hash_map_oa.HashMap(11, hash_function_1)) as m:
+            await m.put('e', ValueError('x'))
+            print(repr(await m.get('e')))
+            try:
+                await m.put(None, 1)
+            except Exception as error:
+                print(type(error).__name__)
+
+            # A bad key in a batch only fails its own request
+            results = await asyncio.gather(
+                m.put('a', 1), m.put(None, 2), m.put('b', 3),
+                return_exceptions=True)
+            print([type(result).__name__ for result in results],
+                  await m.get('a'), await m.get('b'))
+
+    asyncio.run(main())
@@ -0,0 +1,5 @@
+# Course: CS261 - Data Structures
+# Description: Benchmarks for the HashMap implementations. Each module is a
+#              script meant to be run from the repository root, e.g.
+#
+#                  python -m benchmarks.oa_memory
@@ -0,0 +1,109 @@
+# Course: CS261 - Data Structures
+# Description: --clients concurrent coroutines each make --requests gets
+#              against one map, first with every get served on its own and
+#              then coalesced by AsyncMap. Each is run with the map calls
+#              made on the event loop and in a worker thread (so the loop
+#              stays responsive), and reports throughput and the p50/p99
+#              latency of single requests.
+#
+#              python -m benchmarks.async_map [--clients 10000] [--requests 5]
+
+import argparse
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import random
+import time
+
+import hash_map_oa
+import hash_map_sc
+from async_map import AsyncMap
+from benchmarks.common import make_keys, print_table
+
+
+class DirectMap:
+    """
+    Serves each get with its own call to the map, in the executor when one
+    is given
+    """
+    def __init__(self, hash_map, executor=None) -> None:
+        self._map = hash_map
+        self._executor = executor
+
+    async def get(self, key: str) -> object:
+        if self._executor is None:
+            return self._map.get(key)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._map.get, key)
+
+    async def close(self) -> None:
+        pass
+
+
+async def run_clients(m, keys: list, clients: int, requests: int,
+                      seed: int) -> tuple:
+    """
+    Runs the clients against the map and returns the total seconds and
+    every request's latency in seconds
+    """
+    latencies = []
+    clock = time.perf_counter
+
+    async def client(num: int) -> None:
+        rnd = random.Random(seed + num)
+        for _ in range(requests):
+            key = keys[rnd.randrange(len(keys))]
+            start = clock()
+            await m.get(key)
+            latencies.append(clock() - start)
+
+    start = clock()
+    await asyncio.gather(*(client(num) for num in range(clients)))
+    await m.close()
+    return clock() - start, latencies
+
+
+def percentile(values: list, fraction: float) -> float:
+    """
+    Returns the value below which the given fraction of values fall
+    """
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--clients', type=int, default=10000)
+    parser.add_argument('--requests', type=int, default=5)
+    parser.add_argument('--keys', type=int, default=100000)
+    parser.add_argument('--max-batch', type=int, default=1024)
+    parser.add_argument('--map', choices=('sc', 'oa'), default='sc')
+    parser.add_argument('--hash', default='builtin')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    keys = make_keys(args.keys)
+    map_type = hash_map_sc.HashMap if args.map == 'sc' else hash_map_oa.HashMap
+    hash_map = map_type(11, args.hash)
+    hash_map.put_many((key, key) for key in keys)
+
+    rows = []
+    with ThreadPoolExecutor(1) as executor:
+        for name, make in (
+                ('per call', lambda: DirectMap(hash_map)),
+                ('per call, thread', lambda: DirectMap(hash_map, executor)),
+                ('coalesced', lambda: AsyncMap(
+                    hash_map, max_batch=args.max_batch)),
+                ('coalesced, thread', lambda: AsyncMap(
+                    hash_map, max_batch=args.max_batch, executor=executor))):
+            seconds, latencies = asyncio.run(run_clients(
+                make(), keys, args.clients, args.requests, args.seed))
+            rows.append([name, f'{len(latencies) / seconds:.0f}',
+                         f'{percentile(latencies, 0.5) * 1000:.2f}',
+                         f'{percentile(latencies, 0.99) * 1000:.2f}'])
+
+    print(f'{args.clients} clients x {args.requests} gets')
+    print_table(['method', 'gets/s', 'p50 ms', 'p99 ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
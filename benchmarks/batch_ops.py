@@ -0,0 +1,70 @@
+# Course: CS261 - Data Structures
+# Description: Compares the batched put_many/get_many/contains_many/
+#              remove_many calls against a per-key loop of put/get/
+#              contains_key/remove on both maps.
+#
+#              python -m benchmarks.batch_ops [--count 1000000] [--hash mix64]
+
+import argparse
+
+import hash_map_oa
+import hash_map_sc
+from benchmarks.common import make_keys, print_table, timed
+
+
+def per_key(m, keys: list, pairs: list) -> list:
+    """
+    Returns the seconds taken by each operation done one key at a time
+    """
+    def put():
+        for key, value in pairs:
+            m.put(key, value)
+
+    def get():
+        for key in keys:
+            m.get(key)
+
+    def contains():
+        for key in keys:
+            m.contains_key(key)
+
+    def remove():
+        for key in keys:
+            m.remove(key)
+
+    return [timed(put), timed(get), timed(contains), timed(remove)]
+
+
+def batched(m, keys: list, pairs: list) -> list:
+    """
+    Returns the seconds taken by each operation done as one batch
+    """
+    return [timed(m.put_many, pairs), timed(m.get_many, keys),
+            timed(m.contains_many, keys), timed(m.remove_many, keys)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--hash', default='mix64',
+                        help='registered hash function name')
+    args = parser.parse_args()
+    keys = make_keys(args.count)
+    pairs = [(key, num) for num, key in enumerate(keys)]
+
+    rows = []
+    for name, module in (('sc', hash_map_sc), ('oa', hash_map_oa)):
+        loop = per_key(module.HashMap(11, args.hash), keys, pairs)
+        batch = batched(module.HashMap(11, args.hash), keys, pairs)
+        for mode, seconds in (('per key', loop), ('batch', batch)):
+            rows.append([name, mode] + [f'{args.count / s:.0f}'
+                                        for s in seconds])
+        rows.append([name, 'speedup'] + [f'{a / b:.2f}x'
+                                         for a, b in zip(loop, batch)])
+
+    print(f'{args.count} keys, {args.hash}, operations per second')
+    print_table(['map', 'mode', 'put', 'get', 'contains', 'remove'], rows)
+
+
+if __name__ == '__main__':
+    main()
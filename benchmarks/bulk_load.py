@@ -0,0 +1,102 @@
+# Course: CS261 - Data Structures
+# Description: Loads a generated CSV file of --rows rows over --keys
+#              distinct keys three ways: putting every row into one open
+#              addressing map that grows as it goes, the bulk loader
+#              building a sharded map, and the bulk loader writing each
+#              partition out as a snapshot. Each runs in a fresh process so
+#              its peak RSS is its own.
+#
+#              python -m benchmarks.bulk_load [--rows 10000000] [--dir /tmp]
+
+import argparse
+import multiprocessing
+import operator
+import os
+import random
+import tempfile
+import time
+
+from bulk_loader import AGGREGATE, BulkLoader, peak_rss, read_csv
+import hash_map_oa
+from benchmarks.common import print_table
+
+
+def write_csv(path: str, rows: int, keys: int) -> None:
+    """
+    Writes rows of user,amount with users drawn uniformly from keys
+    """
+    rng = random.Random(0)
+    with open(path, 'w') as out:
+        out.write('user,amount\n')
+        for _ in range(rows):
+            out.write(f'user{rng.randrange(keys)},{rng.randrange(100)}\n')
+
+
+def put_every_row(path: str, function: str, directory: str) -> tuple:
+    hash_map = hash_map_oa.HashMap(11, function)
+    resizes = 0
+    for key, value in read_csv(path, 'user', 'amount', int):
+        capacity = hash_map.get_capacity()
+        hash_map.upsert(key, lambda old: old + value, 0)
+        resizes += hash_map.get_capacity() != capacity
+    return hash_map.get_size(), resizes
+
+
+def bulk_build(path: str, function: str, directory: str) -> tuple:
+    with BulkLoader(function, 16, AGGREGATE, operator.add,
+                    spill_dir=directory) as loader:
+        loader.add_many(read_csv(path, 'user', 'amount', int))
+        hash_map = loader.build()
+        return hash_map.get_size(), loader.stats()['resizes']
+
+
+def bulk_dump(path: str, function: str, directory: str) -> tuple:
+    with BulkLoader(function, 16, AGGREGATE, operator.add,
+                    spill_dir=directory) as loader:
+        loader.add_many(read_csv(path, 'user', 'amount', int))
+        loader.dump_partitions(os.path.join(directory, 'snapshots'))
+        stats = loader.stats()
+        return stats['keys'], stats['resizes']
+
+
+def measure(method, path: str, function: str, directory: str) -> tuple:
+    """
+    Runs one method and returns its seconds, peak RSS, keys and resizes
+    """
+    start = time.perf_counter()
+    keys, resizes = method(path, function, directory)
+    return time.perf_counter() - start, peak_rss(), keys, resizes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=10000000)
+    parser.add_argument('--keys', type=int, default=1000000)
+    parser.add_argument('--hash', default='mix64')
+    parser.add_argument('--dir', default=None)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context('spawn')
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        path = os.path.join(directory, 'input.csv')
+        write_csv(path, args.rows, args.keys)
+        size = os.path.getsize(path)
+
+        rows = []
+        for name, method in (('oa, put every row', put_every_row),
+                             ('bulk loader, build', bulk_build),
+                             ('bulk loader, dump', bulk_dump)):
+            with context.Pool(1) as pool:
+                seconds, rss, keys, resizes = pool.apply(
+                    measure, (method, path, args.hash, directory))
+            rows.append([name, f'{args.rows / seconds:.0f}',
+                         f'{rss / 2 ** 20:.0f}', keys, resizes])
+
+    print(f'{args.rows} rows, {size / 2 ** 20:.0f} MiB of CSV, '
+          f'aggregated by sum')
+    print_table(['method', 'rows/s', 'peak RSS MiB', 'keys', 'resizes'],
+                rows)
+
+
+if __name__ == '__main__':
+    main()
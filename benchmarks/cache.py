@@ -0,0 +1,116 @@
+# Course: CS261 - Data Structures
+# Description: Replays Zipfian request traces against the bounded cache
+#              (bounded_cache) under each policy and against a naive LRU
+#              that keeps its recency order in a Python list. Every request
+#              is a get, followed by a put of the key when it missed. The
+#              "scans" trace mixes one-off sequential keys into the Zipfian
+#              requests, which flush a plain LRU but not the TinyLFU ones.
+#
+#              python -m benchmarks.cache [--requests 200000] [--items 100000]
+
+import argparse
+import bisect
+import random
+
+import bounded_cache
+from benchmarks.common import print_table, timed
+
+
+class ListLRU:
+    """
+    LRU cache whose recency order is a list of keys, so each hit costs a
+    linear list.remove
+    """
+    def __init__(self, max_entries: int) -> None:
+        self._max_entries = max_entries
+        self._values = {}
+        self._order = []
+        self.hits = 0
+
+    def get(self, key: str) -> object:
+        if key not in self._values:
+            return None
+        self.hits += 1
+        self._order.remove(key)
+        self._order.append(key)
+        return self._values[key]
+
+    def put(self, key: str, value: object) -> None:
+        if key in self._values:
+            self._order.remove(key)
+        elif len(self._order) >= self._max_entries:
+            del self._values[self._order.pop(0)]
+        self._order.append(key)
+        self._values[key] = value
+
+
+def zipf_trace(requests: int, items: int, exponent: float,
+               seed: int = 0) -> list:
+    """
+    Returns requests keys drawn from items keys, the k-th most popular with
+    weight 1 / k ** exponent
+    """
+    rng = random.Random(seed)
+    cumulative, total = [], 0.0
+    for rank in range(1, items + 1):
+        total += 1 / rank ** exponent
+        cumulative.append(total)
+    # Shuffle which key gets which rank, so popularity is not key order
+    names = [f'item{num}' for num in range(items)]
+    rng.shuffle(names)
+    return [names[bisect.bisect(cumulative, rng.random() * total)]
+            for _ in range(requests)]
+
+
+def with_scans(trace: list, scan_length: int, every: int) -> list:
+    """
+    Returns the trace with a run of scan_length never repeated keys after
+    every every requests
+    """
+    mixed = []
+    for start in range(0, len(trace), every):
+        mixed.extend(trace[start:start + every])
+        mixed.extend(f'scan{start}-{num}' for num in range(scan_length))
+    return mixed
+
+
+def replay(cache, trace: list) -> None:
+    for key in trace:
+        if cache.get(key) is None:
+            cache.put(key, key)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200000)
+    parser.add_argument('--items', type=int, default=100000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    args = parser.parse_args()
+
+    traces = (('zipf 0.8', zipf_trace(args.requests, args.items, 0.8)),
+              ('zipf 1.0', zipf_trace(args.requests, args.items, 1.0)))
+    traces += (('zipf 1.0 + scans',
+                with_scans(traces[1][1], max(args.sizes), 10000)),)
+
+    rows = []
+    for trace_name, trace in traces:
+        for size in args.sizes:
+            caches = [('list LRU', ListLRU(size))]
+            caches += [(policy, bounded_cache.BoundedCache(size, policy=policy))
+                       for policy in (bounded_cache.LRU,
+                                      bounded_cache.TINY_LFU,
+                                      bounded_cache.W_TINY_LFU)]
+            for name, cache in caches:
+                seconds = timed(replay, cache, trace)
+                hits = cache.hits if isinstance(cache, ListLRU) \
+                    else cache.stats()['hits']
+                rows.append([trace_name, size, name,
+                             f'{hits / len(trace):.3f}',
+                             f'{len(trace) / seconds:.0f}'])
+
+    print(f'{args.requests} Zipfian requests over {args.items} keys')
+    print_table(['trace', 'size', 'cache', 'hit ratio', 'ops/s'], rows)
+
+
+if __name__ == '__main__':
+    main()
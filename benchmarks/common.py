@@ -0,0 +1,44 @@
+# Course: CS261 - Data Structures
+# Description: Helpers shared by the benchmark scripts
+
+import time
+
+
+def make_keys(count: int, length: int = 0, prefix: str = 'key') -> list:
+    """
+    Returns a list of distinct string keys.
+    When length is given, every key is padded to exactly that many characters
+    """
+    keys = []
+    for num in range(count):
+        key = prefix + str(num)
+        if length:
+            key = key.rjust(length, '#')
+        keys.append(key)
+    return keys
+
+
+def timed(function, *args) -> float:
+    """
+    Calls the function with the given arguments and returns the elapsed
+    wall-clock time in seconds
+    """
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def print_table(headers: list, rows: list) -> None:
+    """
+    Prints rows of values as a simple aligned text table
+    """
+    rows = [[str(cell) for cell in row] for row in rows]
+    widths = [len(header) for header in headers]
+    for row in rows:
+        for col, cell in enumerate(row):
+            widths[col] = max(widths[col], len(cell))
+
+    print('  '.join(header.rjust(widths[col])
+                    for col, header in enumerate(headers)))
+    for row in rows:
+        print('  '.join(cell.rjust(widths[col]) for col, cell in enumerate(row)))
@@ -0,0 +1,90 @@
+# Course: CS261 - Data Structures
+# Description: Compares the insertion-ordered compact map (hash_map_compact)
+#              against the quadratic probing open addressing map
+#              (hash_map_oa): memory held once --count keys have been put,
+#              and the time to put them (growing from an empty map), get
+#              them all, walk items() and double the capacity.
+#
+#              python -m benchmarks.compact [--count 1000000]
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+import hash_map_compact
+import hash_map_oa
+from benchmarks.common import make_keys, print_table, timed
+
+
+def measure(map_class, keys: list, values: list, function) -> int:
+    """
+    Builds a map holding every key and returns the bytes it allocated.
+    Keys and values are created beforehand so only the table is counted
+    """
+    gc.collect()
+    tracemalloc.start()
+    m = map_class(11, function)
+    for num in range(len(keys)):
+        m.put(keys[num], values[num])
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del m
+    return used
+
+
+def put_all(m, keys: list, values: list) -> None:
+    for num in range(len(keys)):
+        m.put(keys[num], values[num])
+
+
+def get_all(m, keys: list) -> None:
+    for key in keys:
+        m.get(key)
+
+
+def walk_items(m) -> None:
+    for _ in m.items():
+        pass
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--hash', default='builtin')
+    args = parser.parse_args()
+
+    keys = make_keys(args.count)
+    values = list(range(args.count))
+
+    rows = []
+    for name, map_class in (('oa', hash_map_oa.HashMap),
+                            ('compact', hash_map_compact.HashMap)):
+        used = measure(map_class, keys, values, args.hash)
+
+        # Timed with the garbage collector off, as both maps allocate
+        # millions of objects that it would otherwise keep traversing
+        gc.disable()
+        m = map_class(11, args.hash)
+        put_seconds = timed(put_all, m, keys, values)
+        get_seconds = timed(get_all, m, keys)
+        items_seconds = timed(walk_items, m)
+        start = time.perf_counter()
+        m.resize_table(m.get_capacity() * 2)
+        resize_seconds = time.perf_counter() - start
+        gc.enable()
+        del m
+
+        rows.append([name, f'{used / 2 ** 20:.1f}',
+                     f'{used / args.count:.0f}',
+                     f'{args.count / put_seconds:.0f}',
+                     f'{args.count / get_seconds:.0f}',
+                     f'{items_seconds:.3f}', f'{resize_seconds:.3f}'])
+
+    print(f'{args.count} keys')
+    print_table(['map', 'MiB', 'B/key', 'puts/s', 'gets/s', 'items() s',
+                 'resize s'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+# Course: CS261 - Data Structures
+# Description: Throughput of the lock-striped concurrent HashMap against a
+#              separate chaining HashMap behind a single lock, with 1 to
+#              --max-threads threads sharing one map. Every thread runs
+#              the same mix of gets, puts and increments on random keys.
+#
+#              python -m benchmarks.concurrent [--ops 1000000] [--keys 100000]
+#
+#              Threads only run Python code in parallel on a free-threaded
+#              build (python3.13t or later, the first row of output says
+#              whether the GIL is enabled); with the GIL the rows show the
+#              cost of the locking alone.
+
+import argparse
+import random
+import sys
+import threading
+import time
+
+import hash_map_concurrent
+import hash_map_sc
+from benchmarks.common import make_keys, print_table
+
+
+class LockedHashMap:
+    """
+    Separate chaining HashMap with every operation behind one lock
+    """
+    def __init__(self, function) -> None:
+        self._map = hash_map_sc.HashMap(11, function)
+        self._lock = threading.Lock()
+
+    def put(self, key: str, value: object) -> None:
+        with self._lock:
+            self._map.put(key, value)
+
+    def get(self, key: str) -> object:
+        with self._lock:
+            return self._map.get(key)
+
+    def increment(self, key: str, amount: int = 1) -> int:
+        with self._lock:
+            return self._map.increment(key, amount)
+
+
+def run_threads(m, keys: list, threads: int, ops: int,
+                read_ratio: float, seed: int) -> float:
+    """
+    Splits ops operations between the given number of threads sharing the
+    map and returns the wall-clock seconds until all of them finish
+    """
+    def work(thread: int) -> None:
+        rnd = random.Random(seed + thread)
+        for _ in range(ops // threads):
+            key = keys[rnd.randrange(len(keys))]
+            choice = rnd.random()
+            if choice < read_ratio:
+                m.get(key)
+            elif choice < (1 + read_ratio) / 2:
+                m.put(key, choice)
+            else:
+                m.increment(key)
+
+    workers = [threading.Thread(target=work, args=(thread,))
+               for thread in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ops', type=int, default=1000000)
+    parser.add_argument('--keys', type=int, default=100000)
+    parser.add_argument('--max-threads', type=int, default=16)
+    parser.add_argument('--stripes', type=int, default=16)
+    parser.add_argument('--read-ratio', type=float, default=0.8)
+    parser.add_argument('--hash', default='builtin')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    keys = make_keys(args.keys)
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f'Python {sys.version.split()[0]}, GIL',
+          'enabled' if gil else 'disabled')
+
+    rows = []
+    threads = 1
+    while threads <= args.max_threads:
+        row = [threads]
+        for m in (LockedHashMap(args.hash),
+                  hash_map_concurrent.HashMap(11, args.hash, args.stripes)):
+            # Load every key first so the timed runs do not include growth
+            for key in keys:
+                m.put(key, 0)
+            seconds = run_threads(m, keys, threads, args.ops,
+                                  args.read_ratio, args.seed)
+            row.append(f'{args.ops / seconds:.0f}')
+        rows.append(row)
+        threads *= 2
+
+    print_table(['threads', 'single lock ops/s', 'striped ops/s'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# Course: CS261 - Data Structures
+# Description: Compares frequency counting approaches on random values:
+#              the original find_mode (contains_key, get and put per
+#              element), find_mode with increment, count_frequencies
+#              streaming string keys in chunks, and count_frequencies on a
+#              NumPy integer array.
+#
+#              python -m benchmarks.frequency [--count 50000000] [--distinct 1000]
+#
+#              The two find_mode rows need a DynamicArray of every element,
+#              so they are measured on the first --mode-count elements only.
+
+import argparse
+
+import numpy as np
+
+import hash_map_sc
+from a6_include import DynamicArray
+from benchmarks.common import print_table, timed
+from frequency import count_frequencies
+
+
+def legacy_find_mode(da: DynamicArray) -> tuple:
+    """
+    find_mode as originally written: three lookups per element
+    """
+    map = hash_map_sc.HashMap()
+    max_frequency = 0
+    for num in range(da.length()):
+        value = da[num]
+        if map.contains_key(value):
+            new_count = map.get(value) + 1
+            map.put(value, new_count)
+        else:
+            map.put(value, 1)
+            new_count = 1
+        if new_count > max_frequency:
+            max_frequency = new_count
+
+    modes_da = DynamicArray()
+    for num in range(map.get_capacity()):
+        for node in map.get_bucket(num):
+            if node.value == max_frequency:
+                modes_da.append(node.key)
+    return modes_da, max_frequency
+
+
+def as_strings(values, chunk_size: int = 65536):
+    """
+    Yields the values of a NumPy array as strings, converting one chunk
+    at a time so the whole input is never held as Python objects
+    """
+    for start in range(0, len(values), chunk_size):
+        yield from map(str, values[start:start + chunk_size].tolist())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=50000000)
+    parser.add_argument('--mode-count', type=int, default=1000000)
+    parser.add_argument('--distinct', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    values = rng.integers(0, args.distinct, args.count)
+    mode_count = min(args.mode_count, args.count)
+    da = DynamicArray([str(value) for value in values[:mode_count].tolist()])
+
+    rows = []
+    results = {}
+    for name, function, argument, count in (
+            ('find_mode (original)', legacy_find_mode, da, mode_count),
+            ('find_mode (increment)', hash_map_sc.find_mode, da, mode_count),
+            ('count_frequencies (streamed)', count_frequencies,
+             as_strings(values), args.count),
+            ('count_frequencies (numpy)', count_frequencies, values,
+             args.count)):
+        def run():
+            results[name] = function(argument)
+
+        seconds = timed(run)
+        rows.append([name, count, f'{seconds:.2f}', f'{count / seconds:.0f}'])
+
+    print(f'{args.count} values drawn from {args.distinct} distinct')
+    print_table(['method', 'elements', 'seconds', 'elements/s'], rows)
+
+    table = results['count_frequencies (numpy)']
+    print('max frequency', table.max_frequency(),
+          'top 3', table.top_k(3))
+
+
+if __name__ == '__main__':
+    main()
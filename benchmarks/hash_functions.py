@@ -0,0 +1,87 @@
+# Course: CS261 - Data Structures
+# Description: Measures every registered hash function on a few realistic
+#              key sets: hashes per second (scalar and batch), put throughput
+#              of the separate chaining map and the chain lengths it ends
+#              up with at a load factor of about 1.
+#
+#              python -m benchmarks.hash_functions [--count 100000]
+
+import argparse
+import itertools
+import random
+import time
+
+import hash_map_sc
+from hash_functions import get_hash_function, hash_batch, hash_function_names
+from benchmarks.common import make_keys, print_table
+
+
+def key_sets(count: int, seed: int) -> dict:
+    """
+    Returns named lists of keys resembling common workloads
+    """
+    rnd = random.Random(seed)
+    anagrams = [''.join(letters) for letters in
+                itertools.islice(itertools.permutations('abcdefghij'), count)]
+    return {
+        'sequential': make_keys(count, prefix='user'),
+        'anagrams': anagrams,
+        'uuid': ['%032x' % rnd.getrandbits(128) for _ in range(count)],
+        'paths': [f'/api/v1/users/{rnd.randrange(10 ** 6)}/orders/{num}'
+                  for num in range(count)],
+    }
+
+
+def chain_stats(m: hash_map_sc.HashMap) -> tuple:
+    """
+    Returns the longest chain, the mean length of non-empty chains and the
+    fraction of empty buckets
+    """
+    longest = 0
+    used = 0
+    for num in range(m.get_capacity()):
+        length = m.get_bucket(num).length()
+        longest = max(longest, length)
+        if length:
+            used += 1
+    return longest, m.get_size() / used, 1 - used / m.get_capacity()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=261)
+    args = parser.parse_args()
+
+    for set_name, keys in key_sets(args.count, args.seed).items():
+        rows = []
+        for name in hash_function_names():
+            function = get_hash_function(name)
+
+            start = time.perf_counter()
+            for key in keys:
+                function(key)
+            scalar = len(keys) / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            hash_batch(function, keys)
+            batch = len(keys) / (time.perf_counter() - start)
+
+            # Size the table for a final load factor of about 1
+            m = hash_map_sc.HashMap(len(keys), function)
+            start = time.perf_counter()
+            for key in keys:
+                m.put(key, None)
+            puts = len(keys) / (time.perf_counter() - start)
+
+            longest, mean, empty = chain_stats(m)
+            rows.append([name, f'{scalar:.0f}', f'{batch:.0f}', f'{puts:.0f}',
+                         longest, f'{mean:.2f}', f'{empty:.1%}'])
+
+        print(f'\n{set_name}: {len(keys)} keys')
+        print_table(['function', 'hashes/s', 'batch/s', 'puts/s',
+                     'max chain', 'mean chain', 'empty'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+# Course: CS261 - Data Structures
+# Description: Compares the NumPy integer-key map (hash_map_int) against
+#              the OA map holding the same integer keys: batch insert and
+#              lookup throughput, plus per-key lookups on the OA map.
+#
+#              python -m benchmarks.int_keys [--count 10000000] [--oa-count 1000000]
+#
+#              The OA map needs a Python object per entry, so by default it
+#              is measured on the first --oa-count keys only.
+
+import argparse
+
+import numpy as np
+
+import hash_map_int
+import hash_map_oa
+from benchmarks.common import print_table, timed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=10000000)
+    parser.add_argument('--oa-count', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    keys = rng.integers(-2 ** 62, 2 ** 62, args.count, dtype=np.int64)
+    values = rng.random(args.count)
+    probes = rng.permutation(keys)
+
+    rows = []
+
+    m = hash_map_int.HashMap()
+    put_seconds = timed(m.put_many, keys, values)
+    get_seconds = timed(m.get_many, probes)
+    rows.append(['int map (batch)', args.count,
+                 f'{args.count / put_seconds:.0f}',
+                 f'{args.count / get_seconds:.0f}'])
+
+    # The OA map gets plain Python ints and the builtin hash
+    oa_count = min(args.oa_count, args.count)
+    oa_keys = keys[:oa_count].tolist()
+    oa_probes = rng.permutation(keys[:oa_count]).tolist()
+    oa_values = values[:oa_count].tolist()
+    oa_map = hash_map_oa.HashMap(11, 'builtin')
+
+    def put_all():
+        for num in range(oa_count):
+            oa_map.put(oa_keys[num], oa_values[num])
+
+    def get_all():
+        for key in oa_probes:
+            oa_map.get(key)
+
+    put_seconds = timed(put_all)
+    get_seconds = timed(get_all)
+    rows.append(['oa map (per key)', oa_count,
+                 f'{oa_count / put_seconds:.0f}',
+                 f'{oa_count / get_seconds:.0f}'])
+
+    oa_map = hash_map_oa.HashMap(11, 'builtin')
+    put_seconds = timed(oa_map.put_many, list(zip(oa_keys, oa_values)))
+    get_seconds = timed(oa_map.get_many, oa_probes)
+    rows.append(['oa map (batch)', oa_count,
+                 f'{oa_count / put_seconds:.0f}',
+                 f'{oa_count / get_seconds:.0f}'])
+
+    print_table(['map', 'keys', 'puts/s', 'gets/s'], rows)
+
+
+if __name__ == '__main__':
+    main()
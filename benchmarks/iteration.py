@@ -0,0 +1,77 @@
+# Course: CS261 - Data Structures
+# Description: Peak memory and time of walking every entry of a map with
+#              get_keys_and_values, which builds a DynamicArray of tuples
+#              first, against the lazy items() and values() generators.
+#              Memory is measured with tracemalloc, started after the map is
+#              built, so only what the iteration itself allocates is counted.
+#
+#              python -m benchmarks.iteration [--count 10000000]
+
+import argparse
+import time
+import tracemalloc
+
+import hash_map_oa
+import hash_map_sc
+from benchmarks.common import print_table
+
+
+def walk_array(m) -> int:
+    """
+    Adds up the values through get_keys_and_values
+    """
+    pairs = m.get_keys_and_values()
+    total = 0
+    for num in range(pairs.length()):
+        total += pairs[num][1]
+    return total
+
+
+def walk_items(m) -> int:
+    """
+    Adds up the values through items()
+    """
+    total = 0
+    for _, value in m.items():
+        total += value
+    return total
+
+
+def walk_values(m) -> int:
+    """
+    Adds up the values through values()
+    """
+    return sum(m.values())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=10000000)
+    parser.add_argument('--hash', default='builtin')
+    args = parser.parse_args()
+
+    rows = []
+    for name, map_type in (('sc', hash_map_sc.HashMap),
+                           ('oa', hash_map_oa.HashMap)):
+        m = map_type.with_expected_size(args.count, args.hash)
+        m.put_many((str(num), num) for num in range(args.count))
+
+        for method, walk in (('get_keys_and_values', walk_array),
+                             ('items()', walk_items),
+                             ('values()', walk_values)):
+            tracemalloc.start()
+            start = time.perf_counter()
+            walk(m)
+            seconds = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            rows.append([name, method, f'{seconds:.2f}',
+                         f'{peak / 2 ** 20:.2f}'])
+        del m
+
+    print(f'{args.count} entries')
+    print_table(['map', 'method', 'seconds', 'peak MiB'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# Course: CS261 - Data Structures
+# Description: Compares starting up from a memory-mapped map file
+#              (hash_map_mmap) against rebuilding an in-memory open
+#              addressing map by putting every record again. The file is
+#              written once up front; the table reports the start-up time,
+#              the first lookup and a pass of gets over every key.
+#
+#              python -m benchmarks.mmap_map [--count 1000000] [--dir /tmp]
+
+import argparse
+import os
+import tempfile
+import time
+
+import hash_map_mmap
+import hash_map_oa
+from benchmarks.common import make_keys, print_table, timed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--value-size', type=int, default=32)
+    parser.add_argument('--hash', default='mix64')
+    parser.add_argument('--dir', default=None)
+    args = parser.parse_args()
+
+    keys = make_keys(args.count)
+    value = b'v' * args.value_size
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        path = os.path.join(directory, 'map.bin')
+        m = hash_map_mmap.HashMap(path, args.count * 2, args.hash)
+        build_seconds = timed(lambda: [m.put(key, value) for key in keys])
+        m.close()
+
+        rows = []
+
+        start = time.perf_counter()
+        oa = hash_map_oa.HashMap(11, args.hash)
+        for key in keys:
+            oa.put(key, value)
+        startup = time.perf_counter() - start
+        first = timed(oa.get, keys[len(keys) // 2])
+        gets = timed(lambda: [oa.get(key) for key in keys])
+        rows.append(['oa, put every record', f'{startup * 1000:.1f}',
+                     f'{first * 1e6:.1f}', f'{args.count / gets:.0f}'])
+        # Let the OA map be freed before the mmap map is timed
+        oa = None
+
+        start = time.perf_counter()
+        m = hash_map_mmap.HashMap(path)
+        startup = time.perf_counter() - start
+        first = timed(m.get, keys[len(keys) // 2])
+        gets = timed(lambda: [m.get(key) for key in keys])
+        rows.append(['mmap, open file', f'{startup * 1000:.1f}',
+                     f'{first * 1e6:.1f}', f'{args.count / gets:.0f}'])
+        m.close()
+
+        print(f'{args.count} records of {args.value_size} bytes, file of '
+              f'{os.path.getsize(path) / 2 ** 20:.1f} MiB written in '
+              f'{build_seconds:.1f} s')
+        print_table(['start-up', 'ms', 'first get us', 'gets/s'], rows)
+
+
+if __name__ == '__main__':
+    main()
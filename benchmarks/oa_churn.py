@@ -0,0 +1,89 @@
+# Course: CS261 - Data Structures
+# Description: Runs an insert/delete churn workload with a stable live set
+#              against the open addressing map and reports tombstones and
+#              probe lengths of unsuccessful lookups as the run goes on,
+#              for each tombstone compaction threshold given. Without
+#              compaction the table eventually holds no empty slots and
+#              every miss scans the whole table, so that case is left out.
+#
+#              python -m benchmarks.oa_churn [--ops 10000000] [--live 100000]
+
+import argparse
+import random
+import time
+
+import hash_map_oa
+from benchmarks.common import print_table
+
+
+def miss_probe_length(m: hash_map_oa.HashMap, key: object) -> int:
+    """
+    Returns the number of slots an unsuccessful lookup of key inspects
+    """
+    capacity = m.get_capacity()
+    index = hash(key) % capacity
+    probe_counter = 0
+    while probe_counter < capacity:
+        if m.get_bucket((index + probe_counter ** 2) % capacity) is None:
+            return probe_counter + 1
+        probe_counter += 1
+    return capacity
+
+
+def churn(m: hash_map_oa.HashMap, ops: int, live: int, windows: int,
+          seed: int) -> list:
+    """
+    Replaces random live keys with new ones and returns one row of stats
+    per window of operations
+    """
+    rnd = random.Random(seed)
+    live_keys = list(range(live))
+    for key in live_keys:
+        m.put(key, key)
+    next_key = live
+
+    rows = []
+    window = max(1, ops // windows)
+    done = 0
+    while done < ops:
+        start = time.perf_counter()
+        for _ in range(0, min(window, ops - done), 3):
+            # remove a live key, insert a fresh one and look up a miss
+            slot = rnd.randrange(live)
+            m.remove(live_keys[slot])
+            live_keys[slot] = next_key
+            m.put(next_key, next_key)
+            m.get(-next_key - 1)
+            next_key += 1
+        elapsed = time.perf_counter() - start
+        done += window
+
+        probes = [miss_probe_length(m, -rnd.randrange(1, 10 ** 9))
+                  for _ in range(1000)]
+        rows.append([done, m.get_size(), m.get_tombstones(), m.get_capacity(),
+                     f'{sum(probes) / len(probes):.2f}', max(probes),
+                     f'{window / elapsed:.0f}'])
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ops', type=int, default=10000000)
+    parser.add_argument('--live', type=int, default=100000)
+    parser.add_argument('--windows', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=261)
+    parser.add_argument('--ratios', type=float, nargs='+', default=[0.1, 0.25],
+                        help='max_tombstone_ratio values to compare')
+    args = parser.parse_args()
+
+    headers = ['ops', 'size', 'tombstones', 'capacity',
+               'miss probes', 'max', 'ops/s']
+    for ratio in args.ratios:
+        m = hash_map_oa.HashMap(11, hash, max_tombstone_ratio=ratio)
+        print(f'\ncompaction above {ratio:.0%} tombstones')
+        print_table(headers, churn(m, args.ops, args.live, args.windows,
+                                   args.seed))
+
+
+if __name__ == '__main__':
+    main()
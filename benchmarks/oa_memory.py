@@ -0,0 +1,59 @@
+# Course: CS261 - Data Structures
+# Description: Compares the memory used by the HashEntry-per-slot open
+#              addressing map (hash_map_oa) against the struct-of-arrays
+#              layout (hash_map_soa).
+#
+#              python -m benchmarks.oa_memory [--max-exp 7]
+
+import argparse
+import gc
+import tracemalloc
+
+import hash_map_oa
+import hash_map_soa
+from benchmarks.common import make_keys, print_table
+
+
+def measure(map_class, keys: list, values: list) -> int:
+    """
+    Builds a map holding every key and returns the bytes it allocated.
+    Keys and values are created beforehand so only the table is counted
+    """
+    gc.collect()
+    tracemalloc.start()
+    m = map_class(11, hash)
+    for num in range(len(keys)):
+        m.put(keys[num], values[num])
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del m
+    return used
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--min-exp', type=int, default=4)
+    parser.add_argument('--max-exp', type=int, default=6)
+    args = parser.parse_args()
+
+    rows = []
+    for exp in range(args.min_exp, args.max_exp + 1):
+        count = 10 ** exp
+        keys = make_keys(count)
+        values = list(range(count))
+
+        entry_bytes = measure(hash_map_oa.HashMap, keys, values)
+        soa_bytes = measure(hash_map_soa.HashMap, keys, values)
+        rows.append([f'10^{exp}',
+                     f'{entry_bytes / 2 ** 20:.1f}',
+                     f'{entry_bytes / count:.0f}',
+                     f'{soa_bytes / 2 ** 20:.1f}',
+                     f'{soa_bytes / count:.0f}',
+                     f'{entry_bytes / soa_bytes:.2f}x'])
+
+    print_table(['keys', 'HashEntry MiB', 'B/key',
+                 'SoA MiB', 'B/key', 'ratio'], rows)
+
+
+if __name__ == '__main__':
+    main()
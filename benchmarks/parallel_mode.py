@@ -0,0 +1,66 @@
+# Course: CS261 - Data Structures
+# Description: Scaling of parallel_find_mode from one worker process up to
+#              --max-workers, against counting the same values in a single
+#              process, plus the cost of merging counter maps built from
+#              inputs of growing length but the same number of distinct
+#              values.
+#
+#              python -m benchmarks.parallel_mode [--count 10000000] [--distinct 100000]
+
+import argparse
+import operator
+import os
+
+import numpy as np
+
+import hash_map_sc
+from a6_include import DynamicArray
+from benchmarks.common import print_table, timed
+from frequency import parallel_find_mode
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=10000000)
+    parser.add_argument('--distinct', type=int, default=100000)
+    parser.add_argument('--chunk-size', type=int, default=1000000)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    values = [str(value) for value in
+              rng.integers(0, args.distinct, args.count).tolist()]
+    da = DynamicArray(values)
+
+    def count_serially():
+        hash_map_sc.HashMap(11, 'builtin').increment_many(values)
+
+    serial = timed(count_serially)
+    rows = [['single process', '-', f'{serial:.2f}', '1.00x']]
+    for workers in range(1, args.max_workers + 1):
+        seconds = timed(parallel_find_mode, da, workers, 'builtin',
+                        args.chunk_size)
+        rows.append(['parallel_find_mode', workers, f'{seconds:.2f}',
+                     f'{serial / seconds:.2f}x'])
+
+    print(f'{args.count} values drawn from {args.distinct} distinct, '
+          f'{os.cpu_count()} cpus')
+    print_table(['method', 'workers', 'seconds', 'speedup'], rows)
+
+    # Merging only walks the distinct keys of the map being merged in
+    rows = []
+    for length in (args.distinct, 4 * args.distinct, 16 * args.distinct):
+        counts = hash_map_sc.HashMap(11, 'builtin')
+        counts.increment_many(str(value) for value in
+                              rng.integers(0, args.distinct, length).tolist())
+        total = hash_map_sc.HashMap(11, 'builtin')
+        seconds = timed(total.merge, counts, operator.add)
+        rows.append([length, counts.get_size(), f'{seconds * 1000:.1f}'])
+
+    print()
+    print_table(['input', 'distinct', 'merge ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
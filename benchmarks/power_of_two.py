@@ -0,0 +1,63 @@
+# Course: CS261 - Data Structures
+# Description: Compares prime-modulo capacities against power-of-two
+#              capacities with multiply-shift indexing for both maps:
+#              put and get throughput, and the time of one table doubling.
+#
+#              python -m benchmarks.power_of_two [--count 200000]
+
+import argparse
+import time
+
+import hash_map_oa
+import hash_map_sc
+from benchmarks.common import make_keys, print_table, timed
+
+
+def fill(m, keys: list) -> None:
+    for key in keys:
+        m.put(key, key)
+
+
+def lookup(m, keys: list) -> None:
+    for key in keys:
+        m.get(key)
+
+
+def measure(name: str, mode: str, make, keys: list) -> list:
+    """
+    Returns a row of put/get throughput and doubling time for the map
+    """
+    m = make()
+    put_seconds = timed(fill, m, keys)
+    get_seconds = timed(lookup, m, keys)
+
+    # Time a single doubling of the full table on its own
+    start = time.perf_counter()
+    m.resize_table(m.get_capacity() * 2)
+    resize_ms = (time.perf_counter() - start) * 1000
+
+    return [name, mode, m.get_capacity(), f'{len(keys) / put_seconds:.0f}',
+            f'{len(keys) / get_seconds:.0f}', f'{resize_ms:.1f}']
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=200000)
+    parser.add_argument('--hash', default='mix64',
+                        help='registered hash function name')
+    args = parser.parse_args()
+    keys = make_keys(args.count)
+
+    rows = []
+    for name, module in (('sc', hash_map_sc), ('oa', hash_map_oa)):
+        for mode, power_of_two in (('prime', False), ('pow2', True)):
+            rows.append(measure(name, mode, lambda: module.HashMap(
+                11, args.hash, power_of_two=power_of_two), keys))
+
+    print(f'{args.count} keys, {args.hash}')
+    print_table(['map', 'capacity', 'final', 'puts/s', 'gets/s',
+                 'resize ms'], rows)
+
+
+if __name__ == '__main__':
+    main()
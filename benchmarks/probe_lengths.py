@@ -0,0 +1,69 @@
+# Course: CS261 - Data Structures
+# Description: Compares the distribution of successful-lookup probe lengths
+#              of quadratic probing (hash_map_oa) and Robin Hood probing
+#              (hash_map_rh) at several load factors.
+#
+#              python -m benchmarks.probe_lengths [--count 100000]
+
+import argparse
+import time
+
+import hash_map_oa
+import hash_map_rh
+from benchmarks.common import make_keys, print_table
+
+
+def summarize(name: str, m, keys: list) -> list:
+    """
+    Returns a row of probe length statistics and lookup speed for the map
+    """
+    counts = m.probe_length_counts()
+    total = 0
+    weighted = 0
+    for num in range(counts.length()):
+        total += counts[num]
+        weighted += (num + 1) * counts[num]
+
+    # Find the 99th percentile probe length
+    seen = 0
+    p99 = 0
+    for num in range(counts.length()):
+        seen += counts[num]
+        if seen >= 0.99 * total:
+            p99 = num + 1
+            break
+
+    start = time.perf_counter()
+    for key in keys:
+        m.get(key)
+    lookups = len(keys) / (time.perf_counter() - start)
+
+    return [name, f'{m.table_load():.2f}', f'{weighted / total:.2f}',
+            p99, counts.length(), f'{lookups:.0f}']
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=100000)
+    args = parser.parse_args()
+    keys = make_keys(args.count)
+
+    rows = []
+    for load in (0.45, 0.5):
+        m = hash_map_oa.HashMap(int(args.count / load), hash)
+        for key in keys:
+            m.put(key, key)
+        rows.append(summarize('quadratic', m, keys))
+
+    for load in (0.5, 0.75, 0.85, 0.9):
+        m = hash_map_rh.HashMap(int(args.count / load), hash, max_load=load)
+        for key in keys:
+            m.put(key, key)
+        rows.append(summarize('robin hood', m, keys))
+
+    print(f'{args.count} keys, successful lookup probe lengths')
+    print_table(['probing', 'load', 'mean', 'p99', 'max', 'gets/s'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+# Course: CS261 - Data Structures
+# Description: Records the latency of every put while a map grows from a
+#              small capacity, comparing stop-the-world resizes against the
+#              incremental resize mode. The histogram shows how many puts
+#              fell into each power-of-two microsecond range. The cyclic
+#              garbage collector is paused while timing so its own pauses
+#              do not hide the resize pauses being measured.
+#
+#              python -m benchmarks.put_latency [--count 1000000]
+
+import argparse
+import gc
+import time
+
+import hash_map_oa
+import hash_map_sc
+from benchmarks.common import make_keys, print_table
+
+
+def put_latencies(m, keys: list) -> list:
+    """
+    Puts every key into the map and returns each put's latency in ns
+    """
+    clock = time.perf_counter_ns
+    latencies = []
+    gc.disable()
+    try:
+        for key in keys:
+            start = clock()
+            m.put(key, None)
+            latencies.append(clock() - start)
+    finally:
+        gc.enable()
+    return latencies
+
+
+def histogram(latencies: list) -> dict:
+    """
+    Counts latencies per power-of-two microsecond bucket
+    """
+    counts = {}
+    for latency in latencies:
+        bucket = 1
+        while bucket * 1000 < latency:
+            bucket *= 2
+        counts[bucket] = counts.get(bucket, 0) + 1
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--step', type=int, default=8,
+                        help='slots/buckets migrated per operation')
+    args = parser.parse_args()
+
+    keys = make_keys(args.count)
+    runs = (
+        ('SC', hash_map_sc.HashMap(11, hash)),
+        ('SC incremental', hash_map_sc.HashMap(
+            11, hash, incremental_resize=True, migration_step=args.step)),
+        ('OA', hash_map_oa.HashMap(11, hash)),
+        ('OA incremental', hash_map_oa.HashMap(
+            11, hash, incremental_resize=True, migration_step=args.step)),
+    )
+
+    rows = []
+    histograms = []
+    for name, m in runs:
+        latencies = sorted(put_latencies(m, keys))
+        count = len(latencies)
+        rows.append([name,
+                     f'{latencies[count // 2] / 1000:.1f}',
+                     f'{latencies[int(count * 0.99)] / 1000:.1f}',
+                     f'{latencies[int(count * 0.999)] / 1000:.1f}',
+                     f'{latencies[-1] / 1000:.1f}'])
+        histograms.append(histogram(latencies))
+
+    print(f'{args.count} puts, latency in microseconds')
+    print_table(['map', 'p50', 'p99', 'p99.9', 'max'], rows)
+
+    print('\nputs per latency bucket (<= N us)')
+    buckets = sorted(set().union(*histograms))
+    hist_rows = [[f'<= {bucket}'] + [counts.get(bucket, 0)
+                                     for counts in histograms]
+                 for bucket in buckets]
+    print_table(['us'] + [name for name, _ in runs], hist_rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# Course: CS261 - Data Structures
+# Description: Times resize_table on both maps filled with long string keys.
+#              The "put" column rebuilds the table by calling put() for
+#              every entry, re-running the hash function the way
+#              resize_table originally did, while the "bulk" column is the
+#              current resize that relinks entries with their cached hashes.
+#
+#              python -m benchmarks.resize [--count 1000000] [--length 64]
+
+import argparse
+
+import hash_map_oa
+import hash_map_sc
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from benchmarks.common import make_keys, print_table, timed
+from capacity_planning import next_prime
+
+
+HASH_FUNCTIONS = {'1': hash_function_1, '2': hash_function_2, 'builtin': hash}
+
+
+class RehashingSCMap(hash_map_sc.HashMap):
+    """
+    Separate chaining map whose resize recomputes every key's hash
+    """
+
+    def resize_table(self, new_capacity: int) -> None:
+        if new_capacity < 1:
+            return
+        self._capacity = next_prime(new_capacity)
+        self._size = 0
+        old_buckets = self._buckets
+        self._buckets = DynamicArray()
+        for _ in range(self._capacity):
+            self._buckets.append(hash_map_sc.LinkedList())
+        self._occupancy = bytearray(self._capacity)
+        self._occupied = 0
+        for num in range(old_buckets.length()):
+            for node in old_buckets[num]:
+                self.put(node.key, node.value)
+
+
+class RehashingOAMap(hash_map_oa.HashMap):
+    """
+    Open addressing map whose resize recomputes every key's hash
+    """
+
+    def resize_table(self, new_capacity: int) -> None:
+        if new_capacity < self._size:
+            return
+        old_buckets = self._buckets
+        self._buckets = DynamicArray()
+        self._capacity = next_prime(new_capacity)
+        self._size = 0
+        for _ in range(self._capacity):
+            self._buckets.append(None)
+        self._occupancy = bytearray(self._capacity)
+        self._tombstones = 0
+        for num in range(old_buckets.length()):
+            bucket = old_buckets[num]
+            if bucket and not bucket.is_tombstone:
+                self.put(bucket.key, bucket.value)
+
+
+def resize_time(map_class, keys: list, function, max_load: float) -> float:
+    """
+    Fills a map just below its resize threshold and times one doubling
+    """
+    m = map_class(int(len(keys) / max_load) + 1, function)
+    for key in keys:
+        m.put(key, None)
+    return timed(m.resize_table, m.get_capacity() * 2)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--length', type=int, default=64)
+    parser.add_argument('--hash', choices=HASH_FUNCTIONS, default='2')
+    args = parser.parse_args()
+
+    keys = make_keys(args.count, args.length)
+    function = HASH_FUNCTIONS[args.hash]
+
+    rows = []
+    for name, rehashing, cached, max_load in (
+            ('SC', RehashingSCMap, hash_map_sc.HashMap, 1.0),
+            ('OA', RehashingOAMap, hash_map_oa.HashMap, 0.5)):
+        before = resize_time(rehashing, keys, function, max_load)
+        after = resize_time(cached, keys, function, max_load)
+        rows.append([name, f'{before:.3f}', f'{after:.3f}',
+                     f'{before / after:.2f}x'])
+
+    print(f'{args.count} keys of {args.length} characters, '
+          f'hash function {args.hash}')
+    print_table(['map', 'put s', 'bulk s', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Course: CS261 - Data Structures
+# Description: Compares one OA HashMap against a sharded map of OA shards
+#              while both grow from a small capacity: total time of the
+#              puts and the longest single put, which is the largest resize
+#              pause. Then bulk loads the sharded map with put_many alone,
+#              in a thread pool and in a process pool.
+#
+#              python -m benchmarks.sharded [--count 1000000] [--shards 16]
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import gc
+import os
+import time
+
+import hash_map_oa
+import hash_map_sharded
+from benchmarks.common import make_keys, print_table, timed
+
+
+def put_each(m, keys: list) -> tuple:
+    """
+    Puts every key and returns the total and the longest put in seconds.
+    The cyclic garbage collector is paused so its own pauses are not
+    mistaken for resizes.
+    """
+    clock = time.perf_counter
+    longest = 0
+    gc.disable()
+    try:
+        start = clock()
+        for key in keys:
+            before = clock()
+            m.put(key, None)
+            longest = max(longest, clock() - before)
+        return clock() - start, longest
+    finally:
+        gc.enable()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--shards', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--hash', default='builtin')
+    args = parser.parse_args()
+
+    keys = make_keys(args.count)
+    rows = []
+    for name, m in (
+            ('oa', hash_map_oa.HashMap(11, args.hash)),
+            (f'sharded oa x{args.shards}',
+             hash_map_sharded.HashMap(11, args.hash, args.shards))):
+        total, longest = put_each(m, keys)
+        rows.append([name, f'{total:.2f}', f'{longest * 1000:.1f}'])
+    print_table(['map', 'put seconds', 'longest put ms'], rows)
+
+    pairs = [(key, None) for key in keys]
+    rows = []
+    for name, executor_type in (('put_many', None),
+                                ('thread pool', ThreadPoolExecutor),
+                                ('process pool', ProcessPoolExecutor)):
+        m = hash_map_sharded.HashMap(11, args.hash, args.shards)
+        if executor_type is None:
+            seconds = timed(m.put_many, pairs)
+        else:
+            with executor_type(args.workers) as executor:
+                seconds = timed(m.put_many, pairs, executor)
+        rows.append([name, f'{seconds:.2f}'])
+
+    print(f'\nbulk load, {args.workers} workers')
+    print_table(['method', 'seconds'], rows)
+
+
+if __name__ == '__main__':
+    main()
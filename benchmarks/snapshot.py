@@ -0,0 +1,73 @@
+# Course: CS261 - Data Structures
+# Description: Times saving and restoring a filled map with dump/load,
+#              plain and zlib-compressed, against pickling the whole object
+#              graph, and reports each file's size. Both are timed with the
+#              garbage collector off, as restoring allocates millions of
+#              objects that it would otherwise keep traversing.
+#
+#              python -m benchmarks.snapshot [--count 10000000] [--dir /tmp]
+
+import argparse
+import gc
+import os
+import pickle
+import tempfile
+import time
+
+import hash_map_oa
+import hash_map_sc
+from benchmarks.common import make_keys, print_table, timed
+
+
+def pickle_dump(m, path: str) -> None:
+    with open(path, 'wb') as out:
+        pickle.dump(m, out, pickle.HIGHEST_PROTOCOL)
+
+
+def pickle_load(path: str):
+    with open(path, 'rb') as source:
+        return pickle.load(source)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--count', type=int, default=10000000)
+    parser.add_argument('--hash', default='mix64')
+    parser.add_argument('--dir', default=None)
+    args = parser.parse_args()
+
+    keys = make_keys(args.count)
+    rows = []
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        path = os.path.join(directory, 'map')
+        for name, map_type in (('sc', hash_map_sc.HashMap),
+                               ('oa', hash_map_oa.HashMap)):
+            m = map_type.with_expected_size(args.count, args.hash)
+            m.put_many((keys[num], num) for num in range(args.count))
+
+            gc.disable()
+            for method, dump, load in (
+                    ('pickle', pickle_dump, pickle_load),
+                    ('dump', map_type.dump, map_type.load),
+                    ('dump, compressed',
+                     lambda m, path: m.dump(path, compress=True),
+                     map_type.load)):
+                save_seconds = timed(dump, m, path)
+                size = os.path.getsize(path)
+                # Stop the clock before the restored copy is freed again
+                start = time.perf_counter()
+                restored = load(path)
+                load_seconds = time.perf_counter() - start
+                del restored
+                rows.append([name, method, f'{save_seconds:.2f}',
+                             f'{load_seconds:.2f}', f'{size / 2 ** 20:.1f}'])
+                gc.collect()
+            gc.enable()
+            del m
+
+    print(f'{args.count} entries')
+    print_table(['map', 'method', 'save s', 'load s', 'MiB'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# Course: CS261 - Data Structures
+# Description: Times whole-table operations on a map that has been resized
+#              to --slots buckets while holding --fill of that many keys.
+#              The "scan" column visits every bucket in Python the way
+#              empty_buckets, the iterators and clear used to, while the
+#              "occupancy" column is the current method, which counts
+#              empty buckets in O(1) and jumps between non-empty ones
+#              with bytearray.find. clear runs last, and its scan is timed
+#              on the already cleared map, as it resets every bucket anyway.
+#
+#              python -m benchmarks.sparse_scan [--slots 10000000] [--fill 0.01]
+
+import argparse
+
+import hash_map_oa
+import hash_map_sc
+from benchmarks.common import make_keys, print_table, timed
+
+
+def scan_empty_sc(m) -> int:
+    """
+    Counts empty separate chaining buckets by visiting every bucket
+    """
+    buckets = m._buckets
+    return sum(1 for num in range(buckets.length())
+               if buckets[num].length() == 0)
+
+
+def scan_empty_oa(m) -> int:
+    """
+    Counts empty open addressing slots by visiting every slot
+    """
+    buckets = m._buckets
+    return sum(1 for num in range(buckets.length())
+               if buckets[num] is None)
+
+
+def scan_values_sc(m) -> int:
+    """
+    Adds up the values by walking the chain of every bucket
+    """
+    buckets = m._buckets
+    total = 0
+    for num in range(buckets.length()):
+        for node in buckets[num]:
+            total += node.value
+    return total
+
+
+def scan_values_oa(m) -> int:
+    """
+    Adds up the values by visiting every slot and skipping removed entries
+    """
+    buckets = m._buckets
+    total = 0
+    for num in range(buckets.length()):
+        entry = buckets[num]
+        if entry is not None and not entry.is_tombstone:
+            total += entry.value
+    return total
+
+
+def scan_clear_sc(m) -> None:
+    """
+    Replaces every bucket with an empty linked list
+    """
+    buckets = m._buckets
+    for num in range(buckets.length()):
+        buckets[num] = hash_map_sc.LinkedList()
+
+
+def scan_clear_oa(m) -> None:
+    """
+    Resets every slot to None
+    """
+    buckets = m._buckets
+    for num in range(buckets.length()):
+        buckets[num] = None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--slots', type=int, default=10000000)
+    parser.add_argument('--fill', type=float, default=0.01)
+    parser.add_argument('--hash', default='builtin')
+    args = parser.parse_args()
+
+    keys = make_keys(int(args.slots * args.fill))
+    rows = []
+    for name, map_type, scans in (
+            ('sc', hash_map_sc.HashMap,
+             (scan_empty_sc, scan_values_sc, scan_clear_sc)),
+            ('oa', hash_map_oa.HashMap,
+             (scan_empty_oa, scan_values_oa, scan_clear_oa))):
+        m = map_type(11, args.hash)
+        m.put_many((keys[num], num) for num in range(len(keys)))
+        m.resize_table(args.slots)
+
+        for method, scan, current in (
+                ('empty_buckets', scans[0], map_type.empty_buckets),
+                ('sum(values())', scans[1], lambda m: sum(m.values())),
+                ('clear', scans[2], map_type.clear)):
+            if method == 'clear':
+                after = timed(current, m)
+                before = timed(scan, m)
+            else:
+                before, after = timed(scan, m), timed(current, m)
+            rows.append([name, method, f'{before:.3f}', f'{after:.4f}',
+                         f'{before / after:.0f}x'])
+        del m
+
+    print(f'{len(keys)} keys in {args.slots} buckets')
+    print_table(['map', 'method', 'scan s', 'occupancy s', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+# Course: CS261 - Data Structures
+# Description: Measures the put/remove throughput of the write-ahead logged
+#              map (durable_map) under each fsync policy, against the plain
+#              open addressing map it wraps. Syncing every write is much
+#              slower than the rest, so it runs --sync-ops operations only.
+#              The last row adds periodic snapshots to the 1 s policy.
+#
+#              python -m benchmarks.wal [--ops 200000] [--dir /tmp]
+
+import argparse
+import os
+import random
+import tempfile
+
+from durable_map import DurableMap
+import hash_map_oa
+from benchmarks.common import print_table, timed
+
+
+# (name, DurableMap options); None is the map without a log
+POLICIES = (
+    ('oa, no log', None),
+    ('no fsync', {'sync_interval': None}),
+    ('fsync every 1 s', {'sync_interval': 1.0}),
+    ('fsync every 10 ms', {'sync_interval': 0.01}),
+    ('fsync every 1 MiB', {'sync_interval': None, 'sync_bytes': 2 ** 20}),
+    ('fsync every 64 KiB', {'sync_interval': None, 'sync_bytes': 2 ** 16}),
+    ('fsync every write', {'sync_interval': None, 'sync_bytes': 0}),
+    ('1 s, snapshot every 4 MiB', {'sync_interval': 1.0,
+                                   'checkpoint_bytes': 4 * 2 ** 20}),
+)
+
+
+def make_operations(count: int, key_count: int) -> list:
+    """
+    Returns count (is_put, key, value) operations on key_count session
+    keys, one in five a remove
+    """
+    rng = random.Random(0)
+    return [(rng.random() >= 0.2, f'session:{rng.randrange(key_count)}',
+             {'user': num, 'token': f'{num:032x}'})
+            for num in range(count)]
+
+
+def run(m, operations: list) -> None:
+    for is_put, key, value in operations:
+        if is_put:
+            m.put(key, value)
+        else:
+            m.remove(key)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--ops', type=int, default=200000)
+    parser.add_argument('--sync-ops', type=int, default=2000)
+    parser.add_argument('--keys', type=int, default=100000)
+    parser.add_argument('--hash', default='mix64')
+    parser.add_argument('--dir', default=None)
+    args = parser.parse_args()
+
+    operations = make_operations(args.ops, args.keys)
+    rows = []
+    for name, options in POLICIES:
+        count = args.sync_ops if options and options.get('sync_bytes') == 0 \
+            else args.ops
+        with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+            if options is None:
+                seconds = timed(run, hash_map_oa.HashMap(11, args.hash),
+                                operations[:count])
+                syncs = checkpoints = '-'
+            else:
+                m = DurableMap(os.path.join(directory, 'map'), 11, args.hash,
+                               **{'checkpoint_bytes': None, **options})
+                # Closing syncs whatever the policy left unsynced
+                seconds = timed(lambda: (run(m, operations[:count]),
+                                         m.close()))
+                stats = m.stats()
+                syncs, checkpoints = stats['syncs'], stats['checkpoints']
+        rows.append([name, count, f'{count / seconds:.0f}', syncs,
+                     checkpoints])
+
+    print_table(['policy', 'ops', 'ops/s', 'fsyncs', 'snapshots'], rows)
+
+
+if __name__ == '__main__':
+    main()
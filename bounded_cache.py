@@ -0,0 +1,554 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Bounded cache built on the separate chaining HashMap. Its
+#              chain nodes also carry the links of a doubly linked recency
+#              list, so finding a key, moving it to the most recently used
+#              end and evicting the least recently used key are all O(1).
+#              Besides plain LRU it offers TinyLFU admission, where a new
+#              key only replaces the LRU victim if a frequency sketch says
+#              it is used more often, and W-TinyLFU, which puts a small LRU
+#              window in front of a segmented LRU main area and applies the
+#              same admission test to keys leaving the window.
+
+import sys
+
+from a6_include import DynamicArray, SLNode
+from capacity_planning import next_power_of_two, plan_capacity
+from hash_functions import mix_hash
+import hash_map_sc
+
+
+# Eviction and admission policies
+LRU = 'lru'
+TINY_LFU = 'tinylfu'
+W_TINY_LFU = 'w-tinylfu'
+
+# W-TinyLFU splits the limits between the window and the main area, and
+# the main area between its protected and probation segments
+_WINDOW_SHARE = 0.01
+_PROTECTED_SHARE = 0.8
+
+# Counters per sketch row for each entry the cache can hold, so that the
+# keys seen between two halvings rarely share all four counters, and the
+# width when only max_bytes bounds the cache
+_SKETCH_FACTOR = 4
+_DEFAULT_SKETCH_WIDTH = 65536
+
+# Frequency counters stop at this count and are halved once the sketch has
+# counted this many accesses per counter of a row
+_MAX_FREQUENCY = 15
+_SAMPLE_FACTOR = 10
+
+# Passed to upsert so that combining can tell a new key from a value
+_MISSING = object()
+
+# Halves every counter of a sketch row through bytearray.translate
+_HALVE = bytes(count >> 1 for count in range(256))
+
+
+class CacheNode(SLNode):
+    """
+    Chain node that is also a link of a segment's recency list
+    """
+    def __init__(self, key: str, value: object, next: SLNode = None,
+                 hash: int = None) -> None:
+        super().__init__(key, value, next, hash)
+        self.older = None
+        self.newer = None
+        self.segment = None
+        self.weight = 0
+
+
+class _Segment:
+    """
+    Circular doubly linked recency list of cache nodes around a sentinel,
+    least recently used first, with its own entry and byte limits
+    """
+    def __init__(self, max_entries: int = None, max_bytes: int = None) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.count = 0
+        self.weight = 0
+        self.sentinel = CacheNode(None, None)
+        self.sentinel.older = self.sentinel.newer = self.sentinel
+
+    def oldest(self) -> CacheNode:
+        """
+        Returns the least recently used node, or None when it is empty
+        """
+        node = self.sentinel.newer
+        return None if node is self.sentinel else node
+
+    def append(self, node: CacheNode) -> None:
+        """
+        Links the node in as the most recently used one
+        """
+        newest = self.sentinel.older
+        node.older, node.newer = newest, self.sentinel
+        newest.newer = self.sentinel.older = node
+        node.segment = self
+        self.count += 1
+        self.weight += node.weight
+
+    def unlink(self, node: CacheNode) -> None:
+        """
+        Takes the node out of the list
+        """
+        node.older.newer = node.newer
+        node.newer.older = node.older
+        node.older = node.newer = node.segment = None
+        self.count -= 1
+        self.weight -= node.weight
+
+    def touch(self, node: CacheNode) -> None:
+        """
+        Moves the node to the most recently used end
+        """
+        if node is not self.sentinel.older:
+            self.unlink(node)
+            self.append(node)
+
+    def is_over(self) -> bool:
+        """
+        Returns true if the segment holds more than its limits allow
+        """
+        return ((self.max_entries is not None
+                 and self.count > self.max_entries)
+                or (self.max_bytes is not None
+                    and self.weight > self.max_bytes))
+
+
+class _FrequencySketch:
+    """
+    Count-min sketch of how often each hash was seen, with four rows of
+    saturating 4-bit counts (kept one per byte) that are all halved after
+    a sample of accesses, so old popularity fades
+    """
+    def __init__(self, width: int) -> None:
+        self._mask = next_power_of_two(max(16, width)) - 1
+        self._rows = [bytearray(self._mask + 1) for _ in range(4)]
+        self._additions = 0
+        self._sample = _SAMPLE_FACTOR * (self._mask + 1)
+
+    def increment(self, hash_code: int) -> None:
+        """
+        Counts one more access to the hash. Its counter in each row is
+        picked by double hashing.
+        """
+        mixed = mix_hash(hash_code)
+        step, mask = (mixed >> 32) | 1, self._mask
+        for row in self._rows:
+            index = mixed & mask
+            if row[index] < _MAX_FREQUENCY:
+                row[index] += 1
+            mixed += step
+
+        self._additions += 1
+        if self._additions >= self._sample:
+            self._rows = [row.translate(_HALVE) for row in self._rows]
+            self._additions //= 2
+
+    def frequency(self, hash_code: int) -> int:
+        """
+        Returns the estimated number of recent accesses to the hash, the
+        smallest of its counters
+        """
+        mixed = mix_hash(hash_code)
+        step, mask = (mixed >> 32) | 1, self._mask
+        frequency = _MAX_FREQUENCY
+        for row in self._rows:
+            if row[mixed & mask] < frequency:
+                frequency = row[mixed & mask]
+            mixed += step
+        return frequency
+
+
+def _entry_size(key: str, value: object) -> int:
+    """
+    Returns the bytes a key and value take up, not counting objects the
+    value refers to
+    """
+    return sys.getsizeof(key) + sys.getsizeof(value)
+
+
+class BoundedCache(hash_map_sc.HashMap):
+    _node_type = CacheNode
+
+    def __init__(self,
+                 max_entries: int = None,
+                 max_bytes: int = None,
+                 policy: str = LRU,
+                 function: callable = 'mix64',
+                 sizeof=_entry_size,
+                 **kwargs) -> None:
+        """
+        Initialize new cache holding at most max_entries keys and at most
+        max_bytes bytes of keys and values, as measured by
+        sizeof(key, value); at least one limit must be given. Once a limit
+        is passed, keys are evicted by the policy: LRU, TINY_LFU or
+        W_TINY_LFU. Other keyword arguments are passed on to
+        hash_map_sc.HashMap, whose table is sized for max_entries keys.
+
+        The frequency sketch tells keys apart by their hashes, so the
+        default is mix64 rather than hash_function_1, under which many
+        keys share a hash.
+        """
+        if max_entries is None and max_bytes is None:
+            raise ValueError('a cache needs max_entries or max_bytes')
+        if policy not in (LRU, TINY_LFU, W_TINY_LFU):
+            raise ValueError(f'unknown cache policy {policy!r}')
+
+        # One extra key is held while the policy picks what to evict
+        capacity = 11 if max_entries is None else plan_capacity(
+            max_entries + 1, 1.0, kwargs.get('power_of_two', False))
+        super().__init__(capacity, function, **kwargs)
+
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._policy = policy
+        self._sizeof = sizeof if max_bytes is not None else None
+
+        self._sketch = None if policy == LRU else _FrequencySketch(
+            _SKETCH_FACTOR * max_entries if max_entries is not None
+            else _DEFAULT_SKETCH_WIDTH)
+        self._make_segments()
+
+        # Counters for stats()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._rejections = 0
+
+    def _make_segments(self) -> None:
+        """
+        Creates the empty recency lists of the policy
+        """
+        if self._policy != W_TINY_LFU:
+            self._main = _Segment(self._max_entries, self._max_bytes)
+            self._window = self._protected = None
+            return
+
+        def share(limit, fraction):
+            return None if limit is None else int(limit * fraction)
+
+        def rest(limit, part):
+            return None if limit is None else limit - part
+
+        # The window holds at least one key unless the cache holds only one
+        window_entries = share(self._max_entries, _WINDOW_SHARE)
+        if window_entries == 0 and self._max_entries > 1:
+            window_entries = 1
+        window_bytes = share(self._max_bytes, _WINDOW_SHARE)
+        main_entries = rest(self._max_entries, window_entries)
+        main_bytes = rest(self._max_bytes, window_bytes)
+
+        self._window = _Segment(window_entries, window_bytes)
+        # The main area's limits bound probation and protected together
+        self._main = _Segment(main_entries, main_bytes)
+        self._protected = _Segment(share(main_entries, _PROTECTED_SHARE),
+                                   share(main_bytes, _PROTECTED_SHARE))
+
+    def stats(self) -> dict:
+        """
+        Returns the number of hits, misses, evictions and rejected
+        admissions so far, the hit ratio, and the keys and bytes held
+        """
+        lookups = self._hits + self._misses
+        segments = [self._main, self._window, self._protected]
+        return {'hits': self._hits, 'misses': self._misses,
+                'hit_ratio': self._hits / lookups if lookups else 0.0,
+                'evictions': self._evictions,
+                'rejections': self._rejections,
+                'entries': self._size,
+                'bytes': sum(segment.weight for segment in segments
+                             if segment is not None)}
+
+    # ------------------------------------------------------------------ #
+
+    def _main_is_over(self) -> bool:
+        """
+        Returns true if the main area holds more than its limits allow. In
+        W-TinyLFU it is made of the probation (main) and protected lists.
+        """
+        main, protected = self._main, self._protected
+        if protected is None:
+            return main.is_over()
+        return ((main.max_entries is not None
+                 and main.count + protected.count > main.max_entries)
+                or (main.max_bytes is not None
+                    and main.weight + protected.weight > main.max_bytes))
+
+    def _victim(self) -> CacheNode:
+        """
+        Returns the node the main area would evict next
+        """
+        victim = self._main.oldest()
+        if victim is None and self._protected is not None:
+            victim = self._protected.oldest()
+        return victim
+
+    def _evict(self, node: CacheNode) -> None:
+        """
+        Drops the node from its recency list and from the table
+        """
+        node.segment.unlink(node)
+        self._remove(node.key, node.hash)
+
+    def _admit(self, node: CacheNode) -> None:
+        """
+        Links a newly added node into the recency lists, then evicts nodes
+        until the cache is back within its limits. Under TinyLFU the new
+        node and the main area's victim duel by frequency, and the loser
+        is evicted.
+        """
+        if self._policy == W_TINY_LFU:
+            self._window.append(node)
+            # Keys pushed out of the window become candidates for the main
+            # area's probation segment
+            while self._window.is_over():
+                candidate = self._window.oldest()
+                self._window.unlink(candidate)
+                self._main.append(candidate)
+                self._shrink_main(candidate)
+            return
+
+        self._main.append(node)
+        if self._policy == LRU:
+            while self._main.is_over():
+                self._evictions += 1
+                self._evict(self._main.oldest())
+        else:
+            self._shrink_main(node)
+
+    def _shrink_main(self, candidate: CacheNode) -> None:
+        """
+        Evicts victims from the main area until it is within its limits,
+        unless the candidate just added to it is used less often than the
+        victim, in which case the candidate is rejected instead
+        """
+        frequency = self._sketch.frequency
+        while self._main_is_over():
+            victim = self._victim()
+            if (victim is candidate
+                    or frequency(candidate.hash) <= frequency(victim.hash)):
+                self._rejections += 1
+                self._evict(candidate)
+                return
+            self._evictions += 1
+            self._evict(victim)
+
+    def _touch(self, node: CacheNode) -> None:
+        """
+        Records a use of the node. In W-TinyLFU a second use promotes a
+        node from probation to the protected segment, which hands its own
+        least recently used nodes back to probation when it is full.
+        """
+        segment = node.segment
+        if segment is not self._main or self._protected is None:
+            segment.touch(node)
+            return
+
+        segment.unlink(node)
+        self._protected.append(node)
+        while self._protected.is_over():
+            demoted = self._protected.oldest()
+            self._protected.unlink(demoted)
+            self._main.append(demoted)
+
+    def _reweigh(self, node: CacheNode) -> None:
+        """
+        Charges the node for the current size of its value and evicts the
+        least recently used nodes if that puts the cache over its limits
+        """
+        if self._sizeof is None or node.segment is None:
+            return
+        weight = self._sizeof(node.key, node.value)
+        node.segment.weight += weight - node.weight
+        node.weight = weight
+
+        # Overflowing window and protected nodes move on to probation
+        if self._window is not None:
+            for segment in (self._window, self._protected):
+                while segment.is_over():
+                    oldest = segment.oldest()
+                    segment.unlink(oldest)
+                    self._main.append(oldest)
+        while self._main_is_over():
+            self._evictions += 1
+            self._evict(self._victim())
+
+    # ------------------------------------------------------------------ #
+
+    def _put(self, key: str, value: object, hash_code: int,
+             replace: bool = True) -> CacheNode:
+        """
+        Updates or adds the key/value pair, counting the access for the
+        frequency sketch. A new node is admitted (or rejected) by the
+        policy; an existing one counts as used.
+        """
+        if self._sketch is not None:
+            self._sketch.increment(hash_code)
+
+        size = self._size
+        node = super()._put(key, value, hash_code, replace)
+        if self._size == size:
+            self._touch(node)
+            if replace:
+                self._reweigh(node)
+            return node
+
+        if self._sizeof is not None:
+            node.weight = self._sizeof(key, value)
+        self._admit(node)
+        return node
+
+    def upsert(self, key: str, update, default: object = None) -> object:
+        """
+        Replaces the value of the key with update(value), or adds the key
+        with update(default) when it is absent. Returns the new value.
+        """
+        node = self._put(key, default, self._hash_function(key), False)
+        node.value = update(node.value)
+        self._reweigh(node)
+        return node.value
+
+    def increment(self, key: str, amount: int = 1) -> int:
+        """
+        Adds amount to the value of the key, treating a missing key as 0.
+        Returns the new value.
+        """
+        return self.upsert(key, lambda value: value + amount, 0)
+
+    def _lookup(self, key: str, hash_code: int) -> CacheNode:
+        """
+        Returns the node of the key, counting a hit and a use, or counts a
+        miss and returns None
+        """
+        if self._sketch is not None:
+            self._sketch.increment(hash_code)
+
+        node = self._find_node(key, hash_code)
+        if node is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._touch(node)
+        return node
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key, or None. Counts
+        as a hit or a miss.
+        """
+        node = self._lookup(key, self._hash_function(key))
+        return node.value if node is not None else None
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of every key of the
+        iterable, or default for keys that are not cached
+        """
+        values = []
+        for key in keys:
+            node = self._lookup(key, self._hash_function(key))
+            values.append(node.value if node is not None else default)
+        return DynamicArray(values)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its value from the cache
+        """
+        node = self._find_node(key, self._hash_function(key))
+        if node is not None:
+            self._evict(node)
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of the iterable that is in the cache
+        """
+        for key in keys:
+            self.remove(key)
+
+    def _put_batch(self, keys: list, values: list, combine=None) -> None:
+        """
+        Puts each key with the value at the same position one at a time,
+        so that every new key goes through admission
+        """
+        for num in range(len(keys)):
+            if combine is None:
+                self.put(keys[num], values[num])
+            else:
+                value = values[num]
+                self.upsert(keys[num],
+                            lambda old: value if old is _MISSING
+                            else combine(old, value), _MISSING)
+
+    def increment_many(self, keys, amount: int = 1) -> DynamicArray:
+        """
+        Increments every key of the iterable as increment would one at a
+        time and returns a dynamic array with each key's new value
+        """
+        return DynamicArray([self.increment(key, amount) for key in keys])
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the cache, keeping its counters and the
+        frequency sketch
+        """
+        super().clear()
+        self._make_segments()
+
+    def dump(self, path, compress: bool = False) -> None:
+        """
+        Caches are not persisted; raises ValueError
+        """
+        raise ValueError('a BoundedCache cannot be dumped')
+
+    @classmethod
+    def load(cls, path) -> 'BoundedCache':
+        """
+        Caches are not persisted; raises ValueError
+        """
+        raise ValueError('a BoundedCache cannot be loaded')
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nLRU eviction order")
+    print("------------------")
+    cache = BoundedCache(3)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, key.upper())
+    cache.get('a')
+    cache.put('d', 'D')
+    print(sorted(cache.keys()), cache.stats()['evictions'])
+
+    print("\nmax_bytes")
+    print("---------")
+    cache = BoundedCache(max_bytes=1000, sizeof=lambda key, value: value)
+    for num in range(10):
+        cache.put('key' + str(num), 150)
+    print(cache.get_size(), cache.stats()['bytes'], cache.contains_key('key3'),
+          cache.contains_key('key4'))
+
+    print("\nTinyLFU keeps frequent keys through a scan")
+    print("------------------------------------------")
+    for policy in (LRU, TINY_LFU, W_TINY_LFU):
+        cache = BoundedCache(100, policy=policy)
+        for _ in range(5):
+            for num in range(50):
+                cache.put('hot' + str(num), num)
+                cache.get('hot' + str(num))
+        for num in range(1000):
+            cache.put('scan' + str(num), num)
+        print(policy, sum(cache.contains_key('hot' + str(num))
+                          for num in range(50)))
+
+    print("\nhits, misses and counters")
+    print("-------------------------")
+    cache = BoundedCache(2, policy=W_TINY_LFU)
+    cache.put('x', 1)
+    print(cache.get('x'), cache.get('y'), cache.increment('x', 5),
+          cache.stats())
@@ -0,0 +1,460 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Streaming bulk loader for inputs larger than memory. Records
+#              are read one at a time, hashed in batches and routed by the
+#              top bits of their mixed hash into per-partition spill files,
+#              while a HyperLogLog sketch per partition estimates how many
+#              distinct keys it holds. Each partition is then built into an
+#              open addressing HashMap sized for that estimate up front, so
+#              the table never has to grow, and repeated keys are resolved
+#              by a dedupe policy (last wins, first wins or aggregate). The
+#              partitions become the shards of a hash_map_sharded.HashMap or
+#              are written one at a time as snapshot files.
+#
+#              python bulk_loader.py events.csv --key user --value amount
+#                  --convert float --policy aggregate --combine sum
+
+import argparse
+import csv
+import json
+from itertools import islice
+import math
+import operator
+import os
+import pickle
+import resource
+import sys
+import tempfile
+import time
+
+from capacity_planning import next_power_of_two
+from hash_functions import get_hash_function, hash_batch, mix_hash
+import hash_map_oa
+import hash_map_sharded
+
+
+# Dedupe policies for keys that appear more than once
+LAST_WINS = 'last'
+FIRST_WINS = 'first'
+AGGREGATE = 'aggregate'
+
+# Each partition's sketch has 2 ** _SKETCH_BITS one-byte registers, for a
+# relative standard error of 1.04 / sqrt(registers), about 1.6%
+_SKETCH_BITS = 12
+_SKETCH_MASK = (1 << _SKETCH_BITS) - 1
+_SKETCH_ERROR = 1.04 / math.sqrt(1 << _SKETCH_BITS)
+
+# Sketches count distinct mix64 hashes, as keys that share a hash under a
+# weaker function (hash_function_1) are still distinct keys
+_SKETCH_FUNCTION = get_hash_function('mix64')
+
+# Records are read and hashed this many at a time
+_READ_CHUNK = 65536
+
+# Passed to upsert so that aggregating can tell a new key from a value
+_MISSING = object()
+
+
+class BulkLoader:
+    """
+    Builds open addressing HashMaps from a stream of (key, value) records
+    with bounded memory: at most spill_rows records per partition are held
+    before they are written to disk, and one partition is built at a time.
+    """
+    def __init__(self,
+                 function='mix64',
+                 partitions: int = 16,
+                 policy: str = LAST_WINS,
+                 combine=None,
+                 spill_rows: int = 4096,
+                 spill_dir=None,
+                 **kwargs) -> None:
+        """
+        Loads records into partitions (rounded up to a power of two) routed
+        the way hash_map_sharded routes keys with the given hash function.
+        The policy decides which value a repeated key keeps: LAST_WINS,
+        FIRST_WINS, or AGGREGATE, which folds every value into the first
+        with combine(old, new). Spill files go to a temporary directory in
+        spill_dir. Other keyword arguments are passed on to the
+        hash_map_oa.HashMap of each partition.
+        """
+        if policy not in (LAST_WINS, FIRST_WINS, AGGREGATE):
+            raise ValueError(f'unknown dedupe policy {policy!r}')
+        if policy == AGGREGATE and combine is None:
+            raise ValueError('the aggregate policy needs a combine function')
+
+        self._function = function
+        self._hash_function = get_hash_function(function)
+        self._partition_count = next_power_of_two(max(1, partitions))
+        self._policy = policy
+        self._combine = combine
+        self._spill_rows = max(1, spill_rows)
+        self._kwargs = kwargs
+
+        self._directory = tempfile.TemporaryDirectory(dir=spill_dir)
+        self._buffers = [([], []) for _ in range(self._partition_count)]
+        self._sketches = [bytearray(1 << _SKETCH_BITS)
+                          for _ in range(self._partition_count)]
+        self._rows = [0] * self._partition_count
+        self._built = False
+
+        # Counters for stats()
+        self._spill_bytes = 0
+        self._spill_seconds = 0.0
+        self._build_seconds = 0.0
+        self._keys = 0
+        self._resizes = 0
+
+    def __enter__(self) -> 'BulkLoader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Deletes the spill files
+        """
+        self._directory.cleanup()
+
+    def _spill_path(self, partition: int) -> str:
+        """
+        Returns the path of the spill file of the given partition
+        """
+        return os.path.join(self._directory.name, f'part-{partition}.spill')
+
+    def add_many(self, records) -> None:
+        """
+        Routes every (key, value) record of the iterable to its partition,
+        spilling partitions to disk as their buffers fill up
+        """
+        if self._built:
+            raise ValueError('records cannot be added once the maps are built')
+
+        records = iter(records)
+        while chunk := list(islice(records, _READ_CHUNK)):
+            start = time.perf_counter()
+            self._route([record[0] for record in chunk],
+                        [record[1] for record in chunk])
+            self._spill_seconds += time.perf_counter() - start
+
+    def _route(self, keys: list, values: list) -> None:
+        """
+        Appends a batch of records to the buffers of their partitions and
+        adds their hashes to the partitions' sketches
+        """
+        hashes = hash_batch(self._hash_function, keys)
+        sketch_hashes = hashes if self._hash_function is _SKETCH_FUNCTION \
+            else hash_batch(_SKETCH_FUNCTION, keys)
+        buffers, sketches, rows = self._buffers, self._sketches, self._rows
+        spill_rows = self._spill_rows
+        # The top bits of the mixed hash pick the partition, as shard_index
+        # does; the sketch uses the low bits of the mix64 hash
+        shift = 65 - self._partition_count.bit_length()
+
+        for num in range(len(keys)):
+            partition = mix_hash(hashes[num]) >> shift
+            buffer_keys, buffer_values = buffers[partition]
+            buffer_keys.append(keys[num])
+            buffer_values.append(values[num])
+            rows[partition] += 1
+
+            # A register keeps the longest run of trailing zeros seen above
+            # the bits that picked it, plus one
+            sketch_hash = sketch_hashes[num]
+            word = sketch_hash >> _SKETCH_BITS
+            rank = (word & -word).bit_length() if word \
+                else 65 - _SKETCH_BITS
+            registers = sketches[partition]
+            if rank > registers[sketch_hash & _SKETCH_MASK]:
+                registers[sketch_hash & _SKETCH_MASK] = rank
+
+            if len(buffer_keys) >= spill_rows:
+                self._spill(partition)
+
+    def _spill(self, partition: int) -> None:
+        """
+        Appends the buffered records of a partition to its spill file
+        """
+        data = pickle.dumps(self._buffers[partition],
+                            pickle.HIGHEST_PROTOCOL)
+        with open(self._spill_path(partition), 'ab') as out:
+            out.write(data)
+        self._spill_bytes += len(data)
+        self._buffers[partition] = ([], [])
+
+    def _read_spill(self, partition: int):
+        """
+        Yields the (keys, values) batches of a partition's spill file in
+        the order they were written
+        """
+        path = self._spill_path(partition)
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as source:
+            while True:
+                try:
+                    yield pickle.load(source)
+                except EOFError:
+                    break
+
+    def estimated_keys(self, partition: int) -> int:
+        """
+        Returns the HyperLogLog estimate of the number of distinct keys
+        routed to the given partition so far
+        """
+        registers = self._sketches[partition]
+        count = len(registers)
+        total = sum(registers.count(rank) * 2.0 ** -rank
+                    for rank in range(66 - _SKETCH_BITS))
+        estimate = 0.7213 / (1 + 1.079 / count) * count * count / total
+
+        # Small counts are estimated from the registers still empty
+        zeros = registers.count(0)
+        if estimate <= 2.5 * count and zeros:
+            estimate = count * math.log(count / zeros)
+        return round(estimate)
+
+    def _expected_size(self, partition: int) -> int:
+        """
+        Returns the number of keys to size a partition's map for: four
+        standard errors above the estimate, but never more than the
+        number of records routed to it
+        """
+        estimate = self.estimated_keys(partition)
+        return min(self._rows[partition],
+                   math.ceil(estimate * (1 + 4 * _SKETCH_ERROR)) + 16)
+
+    def partition_maps(self):
+        """
+        Yields the HashMap of every partition in partition order, building
+        each from its spill file only when it is reached. Spill files are
+        deleted as they are used, so the maps can only be built once.
+        """
+        if self._built:
+            raise ValueError('the maps have already been built')
+        self._built = True
+        for partition in range(self._partition_count):
+            if self._buffers[partition][0]:
+                self._spill(partition)
+
+        for partition in range(self._partition_count):
+            start = time.perf_counter()
+            hash_map = hash_map_oa.HashMap.with_expected_size(
+                self._expected_size(partition), self._function,
+                **self._kwargs)
+            capacity = hash_map.get_capacity()
+            for keys, values in self._read_spill(partition):
+                self._insert(hash_map, keys, values)
+            if hash_map.get_capacity() != capacity:
+                self._resizes += 1
+            self._keys += hash_map.get_size()
+            if os.path.exists(self._spill_path(partition)):
+                os.remove(self._spill_path(partition))
+            self._build_seconds += time.perf_counter() - start
+            yield hash_map
+
+    def _insert(self, hash_map, keys: list, values: list) -> None:
+        """
+        Puts a batch of records into a partition's map, resolving repeated
+        keys by the dedupe policy
+        """
+        if self._policy == LAST_WINS:
+            put = hash_map.put
+            for num in range(len(keys)):
+                put(keys[num], values[num])
+        elif self._policy == FIRST_WINS:
+            upsert = hash_map.upsert
+            for num in range(len(keys)):
+                upsert(keys[num], _keep, values[num])
+        else:
+            upsert, combine = hash_map.upsert, self._combine
+            for num in range(len(keys)):
+                value = values[num]
+                upsert(keys[num],
+                       lambda old: value if old is _MISSING
+                       else combine(old, value), _MISSING)
+
+    def build(self) -> hash_map_sharded.HashMap:
+        """
+        Builds every partition and returns them as the shards of one
+        HashMap
+        """
+        return hash_map_sharded.HashMap.from_shards(
+            list(self.partition_maps()), self._function)
+
+    def dump_partitions(self, directory, compress: bool = False) -> list:
+        """
+        Builds the partitions one at a time and writes each as a snapshot
+        (HashMap.dump) in directory, so only one is in memory at once.
+        Returns the snapshot paths in partition order.
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        for partition, hash_map in enumerate(self.partition_maps()):
+            path = os.path.join(directory, f'part-{partition:05d}.snap')
+            start = time.perf_counter()
+            hash_map.dump(path, compress)
+            self._build_seconds += time.perf_counter() - start
+            paths.append(path)
+        return paths
+
+    def stats(self) -> dict:
+        """
+        Returns the rows loaded, the keys built so far, the bytes spilled,
+        the time spent routing and building, the rows per second overall,
+        the number of partitions whose map still had to grow and the peak
+        resident set size of the process in bytes
+        """
+        rows = sum(self._rows)
+        seconds = self._spill_seconds + self._build_seconds
+        return {'rows': rows, 'keys': self._keys,
+                'partitions': self._partition_count,
+                'spill_bytes': self._spill_bytes,
+                'spill_seconds': self._spill_seconds,
+                'build_seconds': self._build_seconds,
+                'rows_per_second': rows / seconds if seconds else 0.0,
+                'resizes': self._resizes,
+                'peak_rss': peak_rss()}
+
+
+def _keep(value: object) -> object:
+    """
+    Returns value unchanged
+    """
+    return value
+
+
+def peak_rss() -> int:
+    """
+    Returns the peak resident set size of this process in bytes
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def read_csv(path, key: str, value: str = None, convert=None, **fmtparams):
+    """
+    Yields a (key, value) record for every row of a CSV file with a header
+    row: the key column, and the value column passed through convert, or
+    the whole row as a dict when no value column is given. Other keyword
+    arguments are passed on to csv.reader.
+    """
+    with open(path, newline='', encoding='utf-8') as source:
+        reader = csv.reader(source, **fmtparams)
+        header = next(reader)
+        key_column = header.index(key)
+        if value is None:
+            for row in reader:
+                yield row[key_column], dict(zip(header, row))
+        else:
+            value_column = header.index(value)
+            convert = convert or _keep
+            for row in reader:
+                yield row[key_column], convert(row[value_column])
+
+
+def read_jsonl(path, key: str, value: str = None, convert=None):
+    """
+    Yields a (key, value) record for every line of a JSON Lines file: the
+    key field as a string, and the value field passed through convert, or
+    the whole object when no value field is given
+    """
+    convert = convert or _keep
+    with open(path, encoding='utf-8') as source:
+        for line in source:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            yield (str(record[key]),
+                   record if value is None else convert(record[value]))
+
+
+def read_records(path, key: str, value: str = None, convert=None):
+    """
+    Yields the records of a .csv, .tsv or .jsonl/.ndjson file
+    """
+    extension = os.path.splitext(os.fspath(path))[1].lower()
+    if extension == '.csv':
+        return read_csv(path, key, value, convert)
+    if extension == '.tsv':
+        return read_csv(path, key, value, convert, delimiter='\t')
+    if extension in ('.jsonl', '.ndjson'):
+        return read_jsonl(path, key, value, convert)
+    raise ValueError(f'cannot tell the format of {path}')
+
+
+# Choices for --convert and --combine
+_CONVERTERS = {'str': str, 'int': int, 'float': float}
+_COMBINERS = {'sum': operator.add, 'min': min, 'max': max}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('input', help='.csv, .tsv or .jsonl file')
+    parser.add_argument('--key', required=True, help='key column or field')
+    parser.add_argument('--value', help='value column or field '
+                                        '(default: the whole record)')
+    parser.add_argument('--convert', choices=sorted(_CONVERTERS))
+    parser.add_argument('--policy', default=LAST_WINS,
+                        choices=(LAST_WINS, FIRST_WINS, AGGREGATE))
+    parser.add_argument('--combine', choices=sorted(_COMBINERS),
+                        help='how the aggregate policy combines values')
+    parser.add_argument('--hash', default='mix64')
+    parser.add_argument('--partitions', type=int, default=16)
+    parser.add_argument('--spill-rows', type=int, default=4096)
+    parser.add_argument('--spill-dir')
+    parser.add_argument('--out', help='write each partition as a snapshot '
+                                      'in this directory')
+    args = parser.parse_args()
+
+    with BulkLoader(args.hash, args.partitions, args.policy,
+                    _COMBINERS.get(args.combine), args.spill_rows,
+                    args.spill_dir) as loader:
+        loader.add_many(read_records(args.input, args.key, args.value,
+                                     _CONVERTERS.get(args.convert)))
+        if args.out:
+            loader.dump_partitions(args.out)
+        else:
+            # stats() reports the keys of the map that was built
+            loader.build()
+        print(json.dumps(loader.stats(), indent=2))
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    # With arguments this is the command line tool
+    if len(sys.argv) > 1:
+        main()
+        sys.exit()
+
+    import random
+
+    rng = random.Random(0)
+    records = [('key' + str(rng.randrange(3000)), rng.randrange(100))
+               for _ in range(20000)]
+
+    print("\ndedupe policies against a dict, with many small spills")
+    print("------------------------------------------------------")
+    for policy in (LAST_WINS, FIRST_WINS, AGGREGATE):
+        expected = {}
+        for key, value in records:
+            if policy == LAST_WINS:
+                expected[key] = value
+            elif policy == FIRST_WINS:
+                expected.setdefault(key, value)
+            else:
+                expected[key] = expected.get(key, 0) + value
+
+        with BulkLoader('mix64', 8, policy, operator.add,
+                        spill_rows=64) as loader:
+            loader.add_many(records)
+            hash_map = loader.build()
+            stats = loader.stats()
+        built = {key: hash_map.get(key) for key in expected}
+        print(policy, built == expected,
+              hash_map.get_size() == len(expected),
+              stats['spill_bytes'] > 0, stats['resizes'] == 0)
@@ -0,0 +1,126 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Capacity planning shared by the HashMaps. A precomputed ladder
+#              of primes (roughly doubling, up to 2^40) is searched to size a
+#              table for a known number of entries, and next_prime replaces
+#              trial division with a memoized Miller-Rabin test.
+
+from bisect import bisect_left
+from functools import lru_cache
+from math import ceil
+
+
+# Smallest prime above each power of two from 2^1 to 2^40
+PRIME_LADDER = (
+    3, 5, 11, 17, 37, 67, 131, 257, 521, 1031, 2053, 4099, 8209, 16411,
+    32771, 65537, 131101, 262147, 524309, 1048583, 2097169, 4194319,
+    8388617, 16777259, 33554467, 67108879, 134217757, 268435459, 536870923,
+    1073741827, 2147483659, 4294967311, 8589934609, 17179869209,
+    34359738421, 68719476767, 137438953481, 274877906951, 549755813911,
+    1099511627791,
+)
+
+# Witnesses that make Miller-Rabin exact for every n below 3.3 * 10^24
+_WITNESSES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+
+def is_prime(number: int) -> bool:
+    """
+    Determine if given integer is a prime number and return boolean
+    """
+    if number < 2:
+        return False
+
+    for witness in _WITNESSES:
+        if number % witness == 0:
+            return number == witness
+
+    # Write number - 1 as odd * 2^shift
+    odd = number - 1
+    shift = 0
+    while odd % 2 == 0:
+        odd //= 2
+        shift += 1
+
+    for witness in _WITNESSES:
+        value = pow(witness, odd, number)
+        if value == 1 or value == number - 1:
+            continue
+        for _ in range(shift - 1):
+            value = value * value % number
+            if value == number - 1:
+                break
+        else:
+            return False
+
+    return True
+
+
+@lru_cache(maxsize=256)
+def next_prime(capacity: int) -> int:
+    """
+    Returns the smallest odd prime that is at least the given capacity,
+    matching the assignment's original _next_prime (which never returns 2)
+    """
+    if capacity % 2 == 0:
+        capacity += 1
+
+    while not is_prime(capacity):
+        capacity += 2
+
+    return capacity
+
+
+def ladder_prime(capacity: int) -> int:
+    """
+    Returns the smallest prime of the ladder that is at least the given
+    capacity, or the next prime for capacities beyond the ladder
+    """
+    index = bisect_left(PRIME_LADDER, capacity)
+    if index < len(PRIME_LADDER):
+        return PRIME_LADDER[index]
+    return next_prime(capacity)
+
+
+def next_power_of_two(capacity: int) -> int:
+    """
+    Returns the smallest power of two that is at least the given capacity
+    """
+    return 1 << max(0, capacity - 1).bit_length()
+
+
+def plan_capacity(expected_size: int, max_load: float,
+                  power_of_two: bool = False) -> int:
+    """
+    Returns a capacity that holds expected_size entries without its load
+    factor passing max_load, taken from the prime ladder (or the next power
+    of two) so a bulk load of that many entries never resizes
+    """
+    if max_load <= 0:
+        raise ValueError(f'max_load must be positive, got {max_load}')
+
+    minimum = max(1, ceil(max(0, expected_size) / max_load))
+    if power_of_two:
+        return next_power_of_two(minimum)
+    return ladder_prime(minimum)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nnext_prime")
+    print("----------")
+    print([next_prime(num) for num in (0, 1, 2, 3, 53, 75, 106, 1000)])
+
+    print("\nladder is prime and roughly doubling")
+    print("------------------------------------")
+    ratios = [b / a for a, b in zip(PRIME_LADDER, PRIME_LADDER[1:])]
+    print(all(is_prime(prime) for prime in PRIME_LADDER),
+          round(min(ratios), 2), round(max(ratios), 2))
+
+    print("\nplan_capacity")
+    print("-------------")
+    for size in (0, 10, 1000, 1000000):
+        print(size, plan_capacity(size, 1.0), plan_capacity(size, 0.5),
+              plan_capacity(size, 0.5, power_of_two=True))
@@ -0,0 +1,502 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Durability layer for an open addressing HashMap. Every put,
+#              remove and clear is appended to a write-ahead log before the
+#              call returns, the log is synced to disk in groups (every
+#              write, after an interval or after a number of bytes), and
+#              from time to time the whole map is written as a snapshot
+#              (HashMap.dump) and the log started afresh. Opening the
+#              directory again loads the newest snapshot and replays the
+#              log written after it.
+#
+#              A directory holds generation g of the map as snapshot.<g>
+#              (absent for generation 0, the empty map) and wal.<g>, the
+#              operations since that snapshot. Log format, all integers
+#              little-endian:
+#
+#              magic           8 bytes  b'CS261WAL'
+#              version         u32      FORMAT_VERSION
+#              records, each
+#                  length      u32      length of the payload, never 0
+#                  checksum    u32      CRC-32 of the payload
+#                  payload              pickled (operation, key, value)
+#
+#              Replay stops at the first record that is cut short or fails
+#              its checksum (a write torn by the crash) and truncates the
+#              log there. Payloads are pickled, so only open directories
+#              from trusted sources.
+
+import os
+import pickle
+import struct
+import time
+import zlib
+
+from a6_include import hash_function_1
+import hash_map_oa
+from snapshot import fsync_directory, open_temp_file
+
+
+MAGIC = b'CS261WAL'
+FORMAT_VERSION = 1
+
+# Operations a log record can hold
+_PUT = 'put'
+_REMOVE = 'remove'
+_CLEAR = 'clear'
+
+_PREAMBLE = struct.Struct('<8sI')
+_RECORD = struct.Struct('<II')
+
+
+class DurableMap:
+    """
+    Open addressing HashMap whose changes survive a crash. Each change is
+    written to the log with a single unbuffered write before it returns,
+    so killing the process loses nothing; changes not yet synced can only
+    be lost if the machine itself goes down.
+    """
+    def __init__(self, directory,
+                 capacity: int = 11,
+                 function=hash_function_1,
+                 sync_interval: float = 1.0,
+                 sync_bytes: int = None,
+                 checkpoint_bytes: int = 64 * 2 ** 20,
+                 checkpoint_interval: float = None,
+                 **kwargs) -> None:
+        """
+        Opens the map kept in directory, creating the directory and an
+        empty HashMap(capacity, function, **kwargs) if there is no map in
+        it yet. A map that already exists keeps its own capacity, hash
+        function and options.
+
+        The log is synced once sync_interval seconds have passed since the
+        last sync or sync_bytes bytes have been written since then,
+        whichever comes first; a sync_bytes of 0 syncs every write and
+        leaving both None leaves syncing to the operating system. Both are
+        checked as changes are made, so call sync() to cover an idle
+        stretch. A snapshot is taken once the log holds checkpoint_bytes
+        bytes or is checkpoint_interval seconds old.
+        """
+        self._directory = os.fspath(directory)
+        self._sync_interval = sync_interval
+        self._sync_bytes = sync_bytes
+        self._checkpoint_bytes = checkpoint_bytes
+        self._checkpoint_interval = checkpoint_interval
+        self._log = None
+
+        # Counters for stats()
+        self._records = 0
+        self._syncs = 0
+        self._checkpoints = 0
+        self._replayed = 0
+
+        os.makedirs(self._directory, exist_ok=True)
+        self._generation = self._newest_snapshot()
+        if self._generation is None:
+            self._generation = 0
+            self._map = hash_map_oa.HashMap(capacity, function, **kwargs)
+        else:
+            self._map = hash_map_oa.HashMap.load(
+                self._path('snapshot', self._generation))
+
+        log_path = self._path('wal', self._generation)
+        if os.path.exists(log_path):
+            self._replay(log_path)
+        else:
+            self._create_log(log_path)
+        self._remove_stale_files()
+
+        self._log = open(log_path, 'ab', buffering=0)
+        self._log_bytes = self._log.tell()
+        self._unsynced = 0
+        self._last_sync = self._last_checkpoint = time.monotonic()
+
+    def __enter__(self) -> 'DurableMap':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _path(self, kind: str, generation: int) -> str:
+        """
+        Returns the path of the snapshot or log of the given generation
+        """
+        return os.path.join(self._directory, f'{kind}.{generation}')
+
+    def _newest_snapshot(self):
+        """
+        Returns the generation of the newest snapshot in the directory, or
+        None if there is none
+        """
+        generations = [int(name.split('.')[1])
+                       for name in os.listdir(self._directory)
+                       if name.startswith('snapshot.')
+                       and name.split('.')[1].isdigit()
+                       and len(name.split('.')) == 2]
+        return max(generations, default=None)
+
+    def _remove_stale_files(self) -> None:
+        """
+        Removes the snapshots, logs and temporary files of every other
+        generation, left behind by a crash during a checkpoint
+        """
+        keep = {f'snapshot.{self._generation}', f'wal.{self._generation}'}
+        for name in os.listdir(self._directory):
+            if (name.startswith(('snapshot.', 'wal.'))
+                    and name not in keep):
+                os.remove(os.path.join(self._directory, name))
+
+    def _create_log(self, path: str) -> None:
+        """
+        Writes an empty log to path, through a temporary file that is
+        synced and renamed into place
+        """
+        out, temp_path = open_temp_file(path)
+        with out:
+            out.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION))
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temp_path, path)
+        fsync_directory(path)
+
+    def _replay(self, path: str) -> None:
+        """
+        Applies every complete record of the log at path to the map and
+        cuts off a torn record at its end
+        """
+        with open(path, 'rb') as source:
+            data = source.read()
+        magic, version = _PREAMBLE.unpack_from(data) \
+            if len(data) >= _PREAMBLE.size else (None, None)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f'{path} is not a version {FORMAT_VERSION} log')
+
+        # Apply records until the first one that is incomplete or corrupt
+        offset = _PREAMBLE.size
+        while offset + _RECORD.size <= len(data):
+            length, checksum = _RECORD.unpack_from(data, offset)
+            start = offset + _RECORD.size
+            payload = data[start:start + length]
+            if (length == 0 or len(payload) < length
+                    or zlib.crc32(payload) != checksum):
+                break
+            self._apply(*pickle.loads(payload))
+            self._replayed += 1
+            offset = start + length
+
+        if offset < len(data):
+            with open(path, 'r+b') as log:
+                log.truncate(offset)
+                os.fsync(log.fileno())
+
+    def _apply(self, operation: str, key: str, value: object) -> None:
+        """
+        Makes the change a log record describes
+        """
+        if operation == _PUT:
+            self._map.put(key, value)
+        elif operation == _REMOVE:
+            self._map.remove(key)
+        else:
+            self._map.clear()
+
+    def _record(self, operation: str, key: str = None,
+                value: object = None) -> bytes:
+        """
+        Returns the log record of a change, header included
+        """
+        payload = pickle.dumps((operation, key, value),
+                               pickle.HIGHEST_PROTOCOL)
+        return _RECORD.pack(len(payload), zlib.crc32(payload)) + payload
+
+    def _append(self, record: bytes) -> None:
+        """
+        Writes one record to the log and syncs it if one of the sync
+        thresholds has been reached. A write that fails part way is cut
+        back off the log, so the records after it can still be replayed.
+        """
+        try:
+            written = 0
+            while written < len(record):
+                written += self._log.write(record[written:])
+        except BaseException:
+            if not self._log.closed:
+                self._log.truncate(self._log_bytes)
+                self._log.seek(self._log_bytes)
+            raise
+        self._records += 1
+        self._log_bytes += len(record)
+        self._unsynced += len(record)
+
+        if ((self._sync_bytes is not None
+             and self._unsynced >= self._sync_bytes)
+                or (self._sync_interval is not None
+                    and time.monotonic() - self._last_sync
+                    >= self._sync_interval)):
+            self.sync()
+
+    def _after_change(self) -> None:
+        """
+        Takes a snapshot if one of the checkpoint thresholds has been
+        reached. Called once the logged change has reached the map, so the
+        snapshot holds it.
+        """
+        if ((self._checkpoint_bytes is not None
+             and self._log_bytes >= self._checkpoint_bytes)
+                or (self._checkpoint_interval is not None
+                    and time.monotonic() - self._last_checkpoint
+                    >= self._checkpoint_interval)):
+            self.checkpoint()
+
+    def sync(self) -> None:
+        """
+        Forces every change made so far to disk
+        """
+        if self._unsynced:
+            os.fsync(self._log.fileno())
+            self._syncs += 1
+            self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def checkpoint(self) -> None:
+        """
+        Writes a snapshot of the map and starts a new, empty log. A crash
+        part way through leaves the previous snapshot and log in place.
+        """
+        self.sync()
+        generation = self._generation + 1
+        self._map.dump(self._path('snapshot', generation))
+        self._create_log(self._path('wal', generation))
+
+        # Only now that both files are in place can the old ones go
+        self._log.close()
+        os.remove(self._path('wal', self._generation))
+        if self._generation:
+            os.remove(self._path('snapshot', self._generation))
+        self._generation = generation
+
+        self._log = open(self._path('wal', generation), 'ab', buffering=0)
+        self._log_bytes = self._log.tell()
+        self._checkpoints += 1
+        self._last_checkpoint = time.monotonic()
+
+    def close(self) -> None:
+        """
+        Syncs and closes the log. The map cannot be changed afterwards.
+        """
+        if self._log is not None and not self._log.closed:
+            self.sync()
+            self._log.close()
+
+    def get_map(self) -> hash_map_oa.HashMap:
+        """
+        Returns the wrapped HashMap. Changes made to it directly are not
+        logged.
+        """
+        return self._map
+
+    def stats(self) -> dict:
+        """
+        Returns how many records have been logged and replayed, and how
+        many syncs and checkpoints were made
+        """
+        return {'records': self._records, 'replayed': self._replayed,
+                'syncs': self._syncs, 'checkpoints': self._checkpoints,
+                'generation': self._generation,
+                'log_bytes': self._log_bytes}
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Logs the change, then updates the key/value pair in the hash map
+        """
+        # Hashing the key and pickling the record first means a key the
+        # hash function rejects or a value that cannot be pickled raises
+        # before anything is logged
+        self._map._hash_function(key)
+        self._append(self._record(_PUT, key, value))
+        self._map.put(key, value)
+        self._after_change()
+
+    def remove(self, key: str) -> None:
+        """
+        Logs the change, then removes the given key and its value from the
+        hash map. If the key is not in the hash map, nothing is logged.
+        """
+        if self._map.contains_key(key):
+            self._append(self._record(_REMOVE, key))
+            self._map.remove(key)
+            self._after_change()
+
+    def clear(self) -> None:
+        """
+        Logs the change, then clears the contents of the hash map
+        """
+        self._append(self._record(_CLEAR))
+        self._map.clear()
+        self._after_change()
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key, or None
+        """
+        return self._map.get(key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns true if the given key is in the hash map, false otherwise
+        """
+        return self._map.contains_key(key)
+
+    def get_size(self) -> int:
+        """
+        Returns the number of key/value pairs in the hash map
+        """
+        return self._map.get_size()
+
+    def keys(self):
+        """
+        Yields every key in the hash map
+        """
+        return self._map.keys()
+
+    def values(self):
+        """
+        Yields every value in the hash map
+        """
+        return self._map.values()
+
+    def items(self):
+        """
+        Yields every (key, value) pair in the hash map
+        """
+        return self._map.items()
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    import multiprocessing
+    import random
+    import signal
+    import tempfile
+
+    def operations(seed: int, count: int):
+        """
+        Yields a repeatable sequence of (operation, key, value) changes
+        """
+        rng = random.Random(seed)
+        for num in range(count):
+            key = 'session' + str(rng.randrange(500))
+            if rng.random() < 0.2:
+                yield _REMOVE, key, None
+            else:
+                yield _PUT, key, num
+
+    def expected_state(seed: int, count: int) -> dict:
+        """
+        Returns the contents of the map after the first count changes
+        """
+        state = {}
+        for operation, key, value in operations(seed, count):
+            if operation == _PUT:
+                state[key] = value
+            else:
+                state.pop(key, None)
+        return state
+
+    def crash_worker(directory: str, seed: int, count: int, fd: int) -> None:
+        """
+        Applies the sequence, writing one byte to fd as each change is
+        acknowledged, until the parent kills the process
+        """
+        m = DurableMap(directory, sync_interval=0.01, checkpoint_bytes=8192)
+        for operation, key, value in operations(seed, count):
+            if operation == _PUT:
+                m.put(key, value)
+            else:
+                m.remove(key)
+            os.write(fd, b'.')
+
+    print("\nput / remove / reopen")
+    print("---------------------")
+    with tempfile.TemporaryDirectory() as directory:
+        with DurableMap(directory, sync_bytes=0) as m:
+            for i in range(150):
+                m.put('str' + str(i), i * 100)
+            for i in range(0, 150, 3):
+                m.remove('str' + str(i))
+            m.checkpoint()
+            m.put('str1', -1)
+            print(m.get_size(), m.get('str1'), m.stats()['syncs'])
+
+            # A value that cannot be logged leaves the map as it was
+            try:
+                m.put('str2', lambda: None)
+            except Exception as error:
+                print(type(error).__name__, m.get('str2'), m.get_size())
+        with DurableMap(directory) as m:
+            print(m.get_size(), m.get('str1'), m.get('str3'),
+                  m.stats()['replayed'], m.stats()['generation'])
+
+    print("\ntorn log tail")
+    print("-------------")
+    count = 2000
+    ends = []
+    with tempfile.TemporaryDirectory() as directory:
+        with DurableMap(directory, sync_interval=None,
+                        checkpoint_bytes=None) as m:
+            for operation, key, value in operations(1, count):
+                if operation == _PUT:
+                    m.put(key, value)
+                else:
+                    m.remove(key)
+                ends.append(m.stats()['log_bytes'])
+            log_path = m._path('wal', 0)
+
+        # Cut the log at random points, some with garbage written after
+        rng = random.Random(2)
+        ok = True
+        for trial in range(20):
+            with open(log_path, 'r+b') as log:
+                cut = rng.randrange(_PREAMBLE.size, log.seek(0, 2) + 1)
+                log.truncate(cut)
+                if trial % 2:
+                    log.seek(cut)
+                    log.write(bytes(rng.randrange(256)
+                                    for _ in range(rng.randrange(1, 40))))
+            with DurableMap(directory) as m:
+                applied = sum(1 for end in ends if end <= cut)
+                ok = ok and dict(m.items()) == expected_state(1, applied)
+        print(ok)
+
+    print("\ncrash injection")
+    print("---------------")
+    context = multiprocessing.get_context('fork')
+    count = 1000000
+    ok = True
+    for trial in range(10):
+        with tempfile.TemporaryDirectory() as directory:
+            read_fd, write_fd = os.pipe()
+            worker = context.Process(target=crash_worker,
+                                     args=(directory, 3, count, write_fd))
+            worker.start()
+            os.close(write_fd)
+            time.sleep(random.uniform(0.05, 0.5))
+            os.kill(worker.pid, signal.SIGKILL)
+            worker.join()
+
+            acknowledged = 0
+            while data := os.read(read_fd, 65536):
+                acknowledged += data.count(b'.')
+            os.close(read_fd)
+
+            # The change being made when the kill landed may or may not
+            # have reached the log
+            with DurableMap(directory) as m:
+                recovered = dict(m.items())
+                ok = ok and recovered in (
+                    expected_state(3, acknowledged),
+                    expected_state(3, acknowledged + 1))
+    print(ok)
@@ -0,0 +1,296 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Frequency counting on top of the separate chaining HashMap.
+#              Input is streamed in chunks through increment_many, the
+#              highest count and its keys (the modes) are tracked as counts
+#              change, and NumPy arrays are counted without a Python loop.
+#              parallel_find_mode counts chunks in worker processes and
+#              merges their maps.
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import heapq
+from itertools import islice
+import operator
+import os
+
+from a6_include import DynamicArray
+import hash_map_sc
+from hash_functions import DEFAULT_HASH_FUNCTION
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Integer arrays whose values span at most this many numbers (or twice
+# their length) are counted with np.bincount instead of np.unique
+_BINCOUNT_SPAN = 1 << 20
+
+
+class FrequencyTable:
+    """
+    Counts how often each key occurs and keeps the highest count, and the
+    keys that reach it, up to date as keys are added
+    """
+    def __init__(self, function=DEFAULT_HASH_FUNCTION,
+                 chunk_size: int = 65536) -> None:
+        self._counts = hash_map_sc.HashMap(11, function)
+        self._chunk_size = max(1, chunk_size)
+        self._max_frequency = 0
+        self._modes = DynamicArray()
+
+    def add(self, key: object, amount: int = 1) -> int:
+        """
+        Counts amount (which must be positive) more occurrences of the key
+        and returns its new count
+        """
+        count = self._counts.increment(key, amount)
+        self._track(key, count)
+        return count
+
+    def _track(self, key: object, count: int) -> None:
+        """
+        Updates the highest count and the modes for a key's new count
+        """
+        if count > self._max_frequency:
+            self._max_frequency = count
+            self._modes = DynamicArray([key])
+        elif count == self._max_frequency:
+            self._modes.append(key)
+
+    def update(self, keys) -> None:
+        """
+        Counts every key of an iterable or DynamicArray, reading it a chunk
+        at a time so that each chunk is hashed in a single pass
+        """
+        if isinstance(keys, DynamicArray):
+            iterator = (keys[num] for num in range(keys.length()))
+        else:
+            iterator = iter(keys)
+
+        track = self._track
+        while True:
+            chunk = list(islice(iterator, self._chunk_size))
+            if not chunk:
+                break
+
+            counts = self._counts.increment_many(chunk)
+            for num in range(len(chunk)):
+                count = counts[num]
+                # Only counts that reach the current maximum matter
+                if count >= self._max_frequency:
+                    track(chunk[num], count)
+
+    def _load_counts(self, keys: list, counts: list) -> None:
+        """
+        Puts distinct keys with their counts, as produced by NumPy, into a
+        table that has not counted anything yet
+        """
+        self._counts.put_many(zip(keys, counts))
+        top = max(counts, default=0)
+        if top > self._max_frequency:
+            self._max_frequency = top
+            self._modes = DynamicArray()
+        if top == self._max_frequency:
+            for num in range(len(keys)):
+                if counts[num] == top:
+                    self._modes.append(keys[num])
+
+    def get(self, key: object) -> int:
+        """
+        Returns the count of the key, 0 if it has not been seen
+        """
+        return self._counts.get(key) or 0
+
+    def get_size(self) -> int:
+        """
+        Returns the number of distinct keys counted
+        """
+        return self._counts.get_size()
+
+    def max_frequency(self) -> int:
+        """
+        Returns the highest count of any key
+        """
+        return self._max_frequency
+
+    def modes(self) -> DynamicArray:
+        """
+        Returns a da of every key whose count is the highest count
+        """
+        modes = DynamicArray()
+        for num in range(self._modes.length()):
+            modes.append(self._modes[num])
+        return modes
+
+    def top_k(self, k: int) -> DynamicArray:
+        """
+        Returns a da of the (key, count) tuples of the k most frequent keys,
+        most frequent first
+        """
+        pairs = self._counts.get_keys_and_values()
+        top = heapq.nlargest(k, (pairs[num] for num in range(pairs.length())),
+                             key=lambda pair: pair[1])
+        return DynamicArray(top)
+
+    def get_counts(self) -> hash_map_sc.HashMap:
+        """
+        Returns the HashMap from each key to its count
+        """
+        return self._counts
+
+
+def count_frequencies(keys, function=DEFAULT_HASH_FUNCTION,
+                      chunk_size: int = 65536) -> FrequencyTable:
+    """
+    Returns a FrequencyTable of every key of an iterable, DynamicArray or
+    NumPy array. NumPy arrays are counted by NumPy and only their distinct
+    values are put into the table.
+    """
+    table = FrequencyTable(function, chunk_size)
+    if np is not None and isinstance(keys, np.ndarray):
+        values, counts = _count_array(keys.ravel())
+        table._load_counts(values.tolist(), counts.tolist())
+    else:
+        table.update(keys)
+    return table
+
+
+def parallel_find_mode(values, workers: int = None,
+                       function=DEFAULT_HASH_FUNCTION,
+                       chunk_size: int = 1000000) -> tuple:
+    """
+    Returns the same (modes, frequency) tuple as hash_map_sc.find_mode for
+    a DynamicArray, an iterable, or the path of a file with one value per
+    line. Chunks of chunk_size values are counted into separate HashMaps in
+    a pool of worker processes and merged as they finish, so merging costs
+    the number of distinct values per chunk, not the chunk size.
+
+    The hash function must be registered or importable by the workers.
+    """
+    workers = workers or os.cpu_count() or 1
+    total = hash_map_sc.HashMap(11, function)
+    chunks = _chunks(values, chunk_size)
+
+    with ProcessPoolExecutor(workers) as executor:
+        # Keep a couple of chunks per worker in flight, so that a long
+        # input is never read into memory all at once
+        limit = 2 * workers
+        pending = set()
+        while True:
+            for chunk in islice(chunks, limit - len(pending)):
+                pending.add(executor.submit(_count_chunk, chunk, function))
+            if not pending:
+                break
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                total.merge(future.result(), operator.add)
+
+    # Collect the keys with the highest count
+    pairs = total.get_keys_and_values()
+    max_frequency = 0
+    modes = DynamicArray()
+    for num in range(pairs.length()):
+        key, count = pairs[num]
+        if count > max_frequency:
+            max_frequency = count
+            modes = DynamicArray()
+        if count == max_frequency:
+            modes.append(key)
+
+    return modes, max_frequency
+
+
+def _chunks(values, chunk_size: int):
+    """
+    Yields lists of up to chunk_size values from a DynamicArray, an
+    iterable, or the path of a file with one value per line
+    """
+    if isinstance(values, DynamicArray):
+        for start in range(0, values.length(), chunk_size):
+            stop = min(start + chunk_size, values.length())
+            yield [values[num] for num in range(start, stop)]
+        return
+
+    if isinstance(values, str):
+        with open(values, encoding='utf-8') as file:
+            yield from _chunks((line.rstrip('\n') for line in file),
+                               chunk_size)
+        return
+
+    iterator = iter(values)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _count_chunk(chunk: list, function) -> hash_map_sc.HashMap:
+    """
+    Returns a HashMap counting the values of one chunk, in a worker process
+    """
+    counts = hash_map_sc.HashMap(11, function)
+    counts.increment_many(chunk)
+    return counts
+
+
+def _count_array(array) -> tuple:
+    """
+    Returns the distinct values of a NumPy array and how often each occurs
+    """
+    if array.size and np.issubdtype(array.dtype, np.integer):
+        low, high = int(array.min()), int(array.max())
+        bounds = np.iinfo(np.intp)
+        # Values outside intp, such as large uint64 ones, cannot be offset
+        if (bounds.min <= low and high <= bounds.max
+                and high - low <= max(_BINCOUNT_SPAN, 2 * array.size)):
+            # Widen before subtracting, as narrow dtypes would wrap around
+            counts = np.bincount(array.astype(np.intp) - low)
+            values = np.flatnonzero(counts)
+            return (values + low).astype(array.dtype), counts[values]
+    return np.unique(array, return_counts=True)
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nstreamed counts")
+    print("---------------")
+    table = count_frequencies(DynamicArray(["2", "4", "2", "6", "8", "4", "1",
+                                            "3", "4", "5", "7", "3", "3", "2"]),
+                              chunk_size=4)
+    print(table.modes(), table.max_frequency(), table.get("2"), table.get("9"))
+    print(table.top_k(4))
+
+    print("\nadd one at a time")
+    print("-----------------")
+    table = FrequencyTable()
+    for word in "the cat and the hat and the bat".split():
+        table.add(word)
+    print(table.modes(), table.max_frequency(), table.get_size())
+
+    if np is not None:
+        print("\nNumPy arrays")
+        print("------------")
+        table = count_frequencies(np.array([5, -3, 5, 7, -3, 5, -3]))
+        print(table.modes(), table.max_frequency(), table.top_k(2))
+        table = count_frequencies(np.array(["b", "a", "b", "a", "c"]))
+        print(table.modes(), table.max_frequency(), table.get("c"))
+        table = count_frequencies(np.array([-128, 127, 127], dtype=np.int8))
+        print(table.modes(), table.max_frequency(), table.get_size())
+        table = count_frequencies(np.array([-32768, 32767], dtype=np.int16))
+        print(table.modes(), table.max_frequency(), table.get_size())
+        table = count_frequencies(np.array([2 ** 63 + 1, 2 ** 63 + 1, 2 ** 63 + 3],
+                                           dtype=np.uint64))
+        print(table.modes(), table.max_frequency(), table.get_size())
+
+    print("\nparallel find_mode")
+    print("------------------")
+    da = DynamicArray(["Arch", "Manjaro", "Manjaro", "Mint", "Mint", "Mint",
+                       "Ubuntu", "Ubuntu", "Ubuntu"])
+    mode, frequency = parallel_find_mode(da, workers=2, chunk_size=2)
+    print(f"Input: {da}\nMode : {mode}, Frequency: {frequency}")
@@ -0,0 +1,208 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Hash-quality diagnostics. Reports bucket occupancy, chain and
+#              probe lengths, chi-squared uniformity and avalanche behaviour
+#              of a hash function over a key corpus, or of an existing map,
+#              as JSON-friendly dictionaries.
+#
+#              python hash_diagnostics.py --hash hash_function_1 --keys keys.txt
+
+import argparse
+import json
+import random
+
+import hash_map_oa
+import hash_map_sc
+from hash_functions import get_hash_function, hash_function_names
+
+
+_MASK = (1 << 64) - 1
+
+
+def load_keys(source) -> list:
+    """
+    Returns the keys of a corpus given either as a path to a file with one
+    key per line or as any iterable of keys
+    """
+    if isinstance(source, str):
+        with open(source, encoding='utf-8') as file:
+            return [line.rstrip('\n') for line in file]
+    return list(source)
+
+
+def analyze_map(m) -> dict:
+    """
+    Reports on the table of an existing SC or OA HashMap through its
+    get_bucket/get_capacity surface, or probe_length_counts when it has one
+    """
+    capacity = m.get_capacity()
+    first = m.get_bucket(0)
+
+    # Separate chaining buckets are linked lists with a length
+    if hasattr(first, 'length'):
+        lengths = [m.get_bucket(num).length() for num in range(capacity)]
+        return _chain_report(lengths)
+
+    # Maps that know their own probe sequence report it directly
+    if hasattr(m, 'probe_length_counts'):
+        counts = m.probe_length_counts()
+        probes = []
+        for num in range(counts.length()):
+            probes.extend([num + 1] * counts[num])
+        return _probe_report(probes, capacity)
+
+    # Otherwise walk the quadratic sequence from each entry's cached hash
+    probes = []
+    for num in range(capacity):
+        entry = m.get_bucket(num)
+        if entry is None or entry.is_tombstone:
+            continue
+        home = entry.hash % capacity
+        probe_counter = 0
+        while (home + probe_counter ** 2) % capacity != num:
+            probe_counter += 1
+        probes.append(probe_counter + 1)
+    return _probe_report(probes, capacity)
+
+
+def _chain_report(lengths: list) -> dict:
+    """
+    Returns occupancy, chain length and chi-squared statistics for the
+    given chain length of every bucket
+    """
+    capacity = len(lengths)
+    size = sum(lengths)
+    used = capacity - lengths.count(0)
+
+    histogram = [0] * (max(lengths) + 1)
+    for length in lengths:
+        histogram[length] += 1
+
+    # Chi-squared against a uniform spread of the keys over the buckets
+    expected = size / capacity
+    chi_squared = 0.0
+    if expected:
+        chi_squared = sum((length - expected) ** 2 for length in lengths) / expected
+    dof = max(1, capacity - 1)
+
+    return {
+        'capacity': capacity,
+        'size': size,
+        'load': size / capacity,
+        'empty_buckets': capacity - used,
+        'max_chain': max(lengths),
+        'mean_chain': size / used if used else 0.0,
+        'occupancy_histogram': histogram,
+        'chi_squared': chi_squared,
+        'chi_squared_per_dof': chi_squared / dof,
+        'chi_squared_z': (chi_squared - dof) / (2 * dof) ** 0.5,
+    }
+
+
+def _probe_report(probes: list, capacity: int) -> dict:
+    """
+    Returns probe length statistics for the successful lookup of every
+    entry of an open addressing table
+    """
+    histogram = [0] * (max(probes, default=0) + 1)
+    for probe in probes:
+        histogram[probe] += 1
+
+    return {
+        'capacity': capacity,
+        'size': len(probes),
+        'load': len(probes) / capacity,
+        'mean_probe': sum(probes) / len(probes) if probes else 0.0,
+        'max_probe': max(probes, default=0),
+        'probe_histogram': histogram,
+    }
+
+
+def avalanche(function, keys: list, samples: int = 500,
+              seed: int = 0) -> dict:
+    """
+    Flips each of the low eight bits of every character of sampled string
+    keys and measures how often each of the 64 output bits changes.
+    An ideal hash flips every output bit half of the time.
+    """
+    rnd = random.Random(seed)
+    sample = [key for key in keys if isinstance(key, str) and key]
+    sample = rnd.sample(sample, min(samples, len(sample)))
+
+    flips = [0] * 64
+    trials = 0
+    for key in sample:
+        original = function(key) & _MASK
+        for position in range(len(key)):
+            code = ord(key[position])
+            for bit in range(8):
+                changed = chr(code ^ (1 << bit))
+                if 0xD800 <= ord(changed) <= 0xDFFF:
+                    continue
+                diff = original ^ (function(key[:position] + changed
+                                            + key[position + 1:]) & _MASK)
+                trials += 1
+                for out_bit in range(64):
+                    if diff >> out_bit & 1:
+                        flips[out_bit] += 1
+
+    if not trials:
+        return {'samples': 0, 'trials': 0,
+                'mean_flip_probability': 0.0, 'worst_bit_bias': 0.5}
+
+    probabilities = [count / trials for count in flips]
+    return {
+        'samples': len(sample),
+        'trials': trials,
+        'mean_flip_probability': sum(probabilities) / 64,
+        'worst_bit_bias': max(abs(p - 0.5) for p in probabilities),
+    }
+
+
+def analyze(function, source, capacity: int = None,
+            avalanche_samples: int = 500) -> dict:
+    """
+    Builds an SC map (load about 1) and an OA map (load below 0.5) from the
+    key corpus and returns the full report for the hash function
+    """
+    keys = load_keys(source)
+    name = function if isinstance(function, str) else function.__name__
+    function = get_hash_function(function)
+    capacity = capacity or max(1, len(keys))
+
+    sc_map = hash_map_sc.HashMap(capacity, function)
+    oa_map = hash_map_oa.HashMap(capacity * 2, function)
+    for key in keys:
+        sc_map.put(key, None)
+        oa_map.put(key, None)
+
+    return {
+        'hash_function': name,
+        'keys': len(keys),
+        'separate_chaining': analyze_map(sc_map),
+        'open_addressing': analyze_map(oa_map),
+        'avalanche': avalanche(function, keys, avalanche_samples),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--hash', nargs='+', default=hash_function_names(),
+                        help='registered hash function names')
+    parser.add_argument('--keys', help='file with one key per line '
+                                       '(default: str0 .. str9999)')
+    parser.add_argument('--capacity', type=int,
+                        help='SC capacity (default: number of keys)')
+    parser.add_argument('--avalanche-samples', type=int, default=500)
+    parser.add_argument('--indent', type=int, default=2)
+    args = parser.parse_args()
+
+    keys = load_keys(args.keys if args.keys else
+                     ('str' + str(num) for num in range(10000)))
+    reports = [analyze(name, keys, args.capacity, args.avalanche_samples)
+               for name in args.hash]
+    print(json.dumps(reports, indent=args.indent))
+
+
+if __name__ == "__main__":
+    main()
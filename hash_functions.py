@@ -0,0 +1,310 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Registry of hash functions that can be selected by name when
+#              constructing a HashMap, with a fast 64-bit mixing hash and a
+#              NumPy-vectorized batch variant of it
+
+from struct import unpack
+
+from a6_include import hash_function_1, hash_function_2
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+_MASK = (1 << 64) - 1
+
+# Multipliers borrowed from xxHash64
+_PRIME_1 = 0x9E3779B185EBCA87
+_PRIME_2 = 0xC2B2AE3D27D4EB4F
+_PRIME_3 = 0x165667B19E3779F9
+
+# 2^64 divided by the golden ratio, for Fibonacci (multiply-shift) hashing
+_FIBONACCI = 0x9E3779B97F4A7C15
+
+# Keys are hashed by batch variants this many at a time, so one long key
+# only pads the rows of its own chunk
+_BATCH_CHUNK = 8192
+
+# name -> hash function, and hash function -> batch variant
+_HASH_FUNCTIONS = {}
+_BATCH_FUNCTIONS = {}
+
+# Ids of the hash functions that give the same hashes in every process,
+# recorded by file formats that store cached hashes. Ids are never reused.
+_PERSISTENT_IDS = {'hash_function_1': 1, 'hash_function_2': 2, 'mix64': 3}
+
+
+def register_hash_function(name: str, function, batch=None) -> None:
+    """
+    Registers a hash function under the given name. The optional batch
+    variant takes a list of keys and returns the list of their hashes.
+    """
+    _HASH_FUNCTIONS[name] = function
+    if batch is not None:
+        _BATCH_FUNCTIONS[function] = batch
+
+
+def get_hash_function(function):
+    """
+    Returns the hash function registered under the given name.
+    Callables are returned unchanged so either form can be passed to a map.
+    """
+    if callable(function):
+        return function
+    if function not in _HASH_FUNCTIONS:
+        raise ValueError(f'unknown hash function {function!r}, expected one '
+                       f'of {", ".join(sorted(_HASH_FUNCTIONS))}')
+    return _HASH_FUNCTIONS[function]
+
+
+def hash_function_name(function):
+    """
+    Returns the name a hash function is registered under, or None
+    """
+    for name, registered in _HASH_FUNCTIONS.items():
+        if registered is function:
+            return name
+    return None
+
+
+def hash_function_names() -> list:
+    """
+    Returns the names of all registered hash functions
+    """
+    return sorted(_HASH_FUNCTIONS)
+
+
+def persistent_hash_id(function) -> int:
+    """
+    Returns the id that files storing cached hashes record for the given
+    hash function (or its name). Raises ValueError for functions without
+    one, such as the builtin, whose hashes differ between processes.
+    """
+    name = function if isinstance(function, str) else \
+        hash_function_name(function)
+    if name not in _PERSISTENT_IDS:
+        raise ValueError(f'hash function {name or function!r} cannot be '
+                         f'persisted, expected one of '
+                         f'{", ".join(sorted(_PERSISTENT_IDS))}')
+    return _PERSISTENT_IDS[name]
+
+
+def persistent_hash_function(hash_id: int):
+    """
+    Returns the hash function a file records by the given id
+    """
+    for name, registered_id in _PERSISTENT_IDS.items():
+        if registered_id == hash_id:
+            return _HASH_FUNCTIONS[name]
+    raise ValueError(f'unknown hash function id {hash_id}')
+
+
+def hash_batch(function, keys: list) -> list:
+    """
+    Returns the hashes of all keys, using the function's batch variant
+    when one is registered
+    """
+    batch = _BATCH_FUNCTIONS.get(function)
+    if batch is None:
+        return [function(key) for key in keys]
+
+    keys = list(keys)
+    hashes = []
+    for start in range(0, len(keys), _BATCH_CHUNK):
+        hashes.extend(batch(keys[start:start + _BATCH_CHUNK]))
+    return hashes
+
+
+def power_of_two_index(hash_code: int, capacity: int) -> int:
+    """
+    Maps a hash onto a table whose capacity is a power of two. Multiplying
+    by the Fibonacci constant and keeping the top bits mixes every bit of
+    the hash into the index, where masking off the low bits would not.
+    """
+    return ((hash_code * _FIBONACCI) & _MASK) >> (65 - capacity.bit_length())
+
+
+def shard_index(hash_code: int, shard_count: int) -> int:
+    """
+    Picks one of shard_count (a power of two) shards from the top bits of
+    the fully mixed hash, which are unrelated to the bits power_of_two_index
+    uses, so the keys of one shard still spread over every slot of a
+    power-of-two table inside it
+    """
+    return mix_hash(hash_code) >> (65 - shard_count.bit_length())
+
+
+def mix_hash(hash_code: int) -> int:
+    """
+    Returns the hash fully mixed into 64 bits, so that any group of its
+    bits can be used on its own whatever hash function produced it
+    """
+    return _avalanche(hash_code & _MASK)
+
+
+def _code_points(keys: list):
+    """
+    Returns string keys as a zero-padded matrix of their Unicode code
+    points, one row per key
+    """
+    table = np.array(keys, dtype=str)
+    width = max(1, table.dtype.itemsize // 4)
+    return table.view(np.uint32).reshape(len(keys), width)
+
+
+def hash_function_1_batch(keys: list) -> list:
+    """
+    Batch version of hash_function_1: the sum of each key's code points
+    """
+    if np is None or not keys or not all(isinstance(key, str) for key in keys):
+        return [hash_function_1(key) for key in keys]
+    return _code_points(keys).sum(axis=1, dtype=np.uint64).tolist()
+
+
+def hash_function_2_batch(keys: list) -> list:
+    """
+    Batch version of hash_function_2: each key's code points weighted by
+    their one-based position
+    """
+    if np is None or not keys or not all(isinstance(key, str) for key in keys):
+        return [hash_function_2(key) for key in keys]
+    codes = _code_points(keys).astype(np.uint64)
+    weights = np.arange(1, codes.shape[1] + 1, dtype=np.uint64)
+    return (codes * weights).sum(axis=1).tolist()
+
+
+# --------------------------- mix64 hash ----------------------------------- #
+
+def _avalanche(hash: int) -> int:
+    """
+    Final mixing step so every input bit affects every output bit
+    """
+    hash ^= hash >> 33
+    hash = (hash * _PRIME_2) & _MASK
+    hash ^= hash >> 29
+    hash = (hash * _PRIME_3) & _MASK
+    hash ^= hash >> 32
+    return hash
+
+
+def make_mix64(seed: int = 0):
+    """
+    Returns a seeded xxHash-style 64-bit hash function. Strings and bytes
+    are consumed eight bytes at a time and integers are mixed directly, so
+    it costs far fewer Python operations than a per-character loop. Other
+    key types raise TypeError.
+    """
+    seed &= _MASK
+
+    def mix64(key) -> int:
+        if isinstance(key, int):
+            return _avalanche((seed + _PRIME_3 + key) & _MASK)
+
+        if isinstance(key, str):
+            data = key.encode('utf-8')
+        elif isinstance(key, (bytes, bytearray)):
+            data = bytes(key)
+        else:
+            # hash() is salted per process, and mix64 must give the same
+            # hashes everywhere for snapshots to reuse them
+            raise TypeError(f'mix64 cannot hash keys of type '
+                            f'{type(key).__name__}; expected str, bytes '
+                            f'or int')
+
+        # Pad to a whole number of words; the length keeps padding distinct
+        length = len(data)
+        hash_code = (seed + _PRIME_3 + length) & _MASK
+        data += bytes(-length % 8)
+
+        for word in unpack('<%dQ' % (len(data) >> 3), data):
+            hash_code = (hash_code + word * _PRIME_2) & _MASK
+            hash_code = ((hash_code << 31) | (hash_code >> 33)) & _MASK
+            hash_code = (hash_code * _PRIME_1) & _MASK
+
+        return _avalanche(hash_code)
+
+    return mix64
+
+
+def make_mix64_batch(seed: int = 0):
+    """
+    Returns a batch version of make_mix64(seed) that hashes a whole list of
+    string keys with NumPy, one word column at a time across all keys.
+    Falls back to the scalar function without NumPy or for other key types.
+    """
+    scalar = make_mix64(seed)
+
+    def mix64_batch(keys: list) -> list:
+        if np is None or not all(isinstance(key, str) for key in keys):
+            return [scalar(key) for key in keys]
+        if not keys:
+            return []
+
+        encoded = [key.encode('utf-8') for key in keys]
+        lengths = np.array([len(data) for data in encoded], dtype=np.uint64)
+        words = max(1, (int(lengths.max()) + 7) // 8)
+
+        # Lay every key out as one zero-padded row of 64-bit words
+        rows = b''.join(data.ljust(words * 8, b'\0') for data in encoded)
+        table = np.frombuffer(rows, dtype='<u8').reshape(len(keys), words)
+        word_counts = (lengths + np.uint64(7)) // np.uint64(8)
+
+        prime_1, prime_2 = np.uint64(_PRIME_1), np.uint64(_PRIME_2)
+        hashes = np.uint64((seed + _PRIME_3) & _MASK) + lengths
+        for column in range(words):
+            mixed = hashes + table[:, column] * prime_2
+            mixed = (mixed << np.uint64(31)) | (mixed >> np.uint64(33))
+            mixed = mixed * prime_1
+            # Keys shorter than this column keep their hash unchanged
+            hashes = np.where(word_counts > column, mixed, hashes)
+
+        hashes ^= hashes >> np.uint64(33)
+        hashes *= prime_2
+        hashes ^= hashes >> np.uint64(29)
+        hashes *= np.uint64(_PRIME_3)
+        hashes ^= hashes >> np.uint64(32)
+        return hashes.tolist()
+
+    return mix64_batch
+
+
+mix64 = make_mix64()
+mix64_batch = make_mix64_batch()
+
+register_hash_function('hash_function_1', hash_function_1,
+                       hash_function_1_batch)
+register_hash_function('hash_function_2', hash_function_2,
+                       hash_function_2_batch)
+# String hashes of the builtin are randomized per process unless
+# PYTHONHASHSEED is set, so maps using it must not persist their hashes
+register_hash_function('builtin', hash)
+register_hash_function('mix64', mix64, mix64_batch)
+
+# Used by maps that do not need to match the course's sample functions
+DEFAULT_HASH_FUNCTION = 'builtin'
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nregistered hash functions")
+    print("-------------------------")
+    print(hash_function_names())
+
+    print("\nanagrams")
+    print("--------")
+    for name in hash_function_names():
+        function = get_hash_function(name)
+        print(name, function('str12') == function('str21'))
+
+    print("\nbatch variants match scalar")
+    print("---------------------------")
+    keys = ['', 'a', 'key1', 'a' * 8, 'a' * 9, 'long key ' * 10, 'ünïcode',
+            'emoji \U0001F600', 'nul\0']
+    for name in hash_function_names():
+        function = get_hash_function(name)
+        print(name, hash_batch(function, keys) == [function(key) for key in keys])
@@ -0,0 +1,496 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Open addressing HashMap laid out like CPython's compact dict.
+#              Entries are appended to dense hash/key/value arrays in
+#              insertion order, and a sparse index of small integers (8, 16,
+#              32 or 64 bits wide, picked by capacity) maps probe slots to
+#              entry positions. Iteration follows insertion order, a slot
+#              costs one to eight bytes, and a resize only rebuilds the index.
+
+from array import array
+from math import ceil
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from capacity_planning import next_power_of_two
+from hash_functions import get_hash_function, hash_batch, hash_function_name
+
+
+# Index slots that hold no entry position
+EMPTY = -1
+DUMMY = -2
+
+# Cached hashes are stored as unsigned 64-bit integers
+_HASH_MASK = (1 << 64) - 1
+
+# Bits of the hash mixed into each further probe, as in CPython
+_PERTURB_SHIFT = 5
+
+
+class _Deleted:
+    """
+    Key of a removed entry until the dense arrays are compacted. It pickles
+    as a reference to the single instance, so copies still recognize it.
+    """
+    def __reduce__(self) -> str:
+        return '_DELETED'
+
+
+_DELETED = _Deleted()
+
+
+def _index_typecode(capacity: int) -> str:
+    """
+    Returns the narrowest signed array typecode that can hold every entry
+    position of an index with the given number of slots
+    """
+    for typecode in ('b', 'h', 'i', 'q'):
+        if capacity <= 1 << (8 * array(typecode).itemsize - 1):
+            return typecode
+    raise ValueError(f'capacity {capacity} is too large for an index')
+
+
+class HashMap:
+    def __init__(self, capacity: int, function) -> None:
+        """
+        Initialize new HashMap whose index has at least the given number of
+        slots (rounded up to a power of two). Entries may fill two thirds
+        of the slots before the index is rebuilt.
+        """
+        self._hash_function = get_hash_function(function)
+        self._allocate(next_power_of_two(max(8, capacity)))
+
+        # Changes whenever keys are added or removed or entries are moved,
+        # so that iterators can tell the map was changed under them
+        self._version = 0
+
+    @classmethod
+    def with_expected_size(cls, expected_size: int, function) -> 'HashMap':
+        """
+        Returns an empty HashMap sized so that expected_size entries can be
+        put without rebuilding the index
+        """
+        return cls(ceil(max(0, expected_size) * 3 / 2), function)
+
+    def __getstate__(self) -> dict:
+        """
+        Pickles a registered hash function by name, so maps using one of
+        them can be sent to other processes
+        """
+        state = self.__dict__.copy()
+        name = hash_function_name(self._hash_function)
+        if name is not None:
+            state['_hash_function'] = name
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._hash_function = get_hash_function(self._hash_function)
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for position in range(len(self._keys)):
+            key = self._keys[position]
+            if key is not _DELETED:
+                out += (str(position) + ': K: ' + str(key) + ' V: '
+                        + str(self._values[position]) + '\n')
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map, the number of index slots
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Replaces the index and the dense arrays with empty ones, the index
+        having the given number of slots
+        """
+        self._capacity = capacity
+        self._usable = capacity * 2 // 3
+        self._indices = array(_index_typecode(capacity), [EMPTY]) * capacity
+        self._hashes = array('Q')
+        self._keys = []
+        self._values = []
+        self._size = 0
+
+    def _hash(self, key: str) -> int:
+        """
+        Returns the cached form of the key's hash
+        """
+        return self._hash_function(key) & _HASH_MASK
+
+    def _find(self, key: str, hash_code: int) -> tuple:
+        """
+        Returns the index slot and entry position of the given key. For an
+        absent key the position is -1 and the slot is the empty slot that
+        ended its probe sequence, where the key would be added.
+        """
+        indices, hashes, keys = self._indices, self._hashes, self._keys
+        mask = self._capacity - 1
+        perturb = hash_code
+        slot = hash_code & mask
+
+        while True:
+            position = indices[slot]
+            if position == EMPTY:
+                return slot, -1
+
+            # Compare the cached hash before the (possibly costly) key compare
+            if (position != DUMMY and hashes[position] == hash_code
+                    and keys[position] == key):
+                return slot, position
+
+            perturb >>= _PERTURB_SHIFT
+            slot = (slot * 5 + perturb + 1) & mask
+
+    def _empty_slot(self, indices: array, mask: int, hash_code: int) -> int:
+        """
+        Returns the first empty slot of the hash's probe sequence. Used to
+        place keys known to be absent, so no key is compared.
+        """
+        perturb = hash_code
+        slot = hash_code & mask
+        while indices[slot] != EMPTY:
+            perturb >>= _PERTURB_SHIFT
+            slot = (slot * 5 + perturb + 1) & mask
+        return slot
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hash map.
+        If the key already exists, its value is replaced and it keeps its
+        place in the insertion order.
+        If the key doesn't already exist, it is added after every other key.
+        """
+        self._put(key, value, self._hash(key))
+
+    def _put(self, key: str, value: object, hash_code: int,
+             replace: bool = True) -> int:
+        """
+        Updates the key/value pair using an already computed hash of the key
+        and returns its entry position. An existing key keeps its value
+        unless replace is set.
+        """
+        slot, position = self._find(key, hash_code)
+        if position != -1:
+            if replace:
+                self._values[position] = value
+            return position
+
+        # Rebuild the index once the dense arrays have used up their share
+        # of slots, which also drops removed entries
+        if len(self._keys) >= self._usable:
+            self._rebuild(next_power_of_two(max(8, self._size * 3)))
+            slot = self._empty_slot(self._indices, self._capacity - 1,
+                                    hash_code)
+
+        position = len(self._keys)
+        self._indices[slot] = position
+        self._hashes.append(hash_code)
+        self._keys.append(key)
+        self._values.append(value)
+        self._size += 1
+        self._version += 1
+        return position
+
+    def increment(self, key: str, amount: int = 1) -> int:
+        """
+        Adds amount to the value of the key, treating a missing key as 0,
+        with a single lookup. Returns the new value.
+        """
+        position = self._put(key, 0, self._hash(key), False)
+        self._values[position] += amount
+        return self._values[position]
+
+    def upsert(self, key: str, update, default: object = None) -> object:
+        """
+        Replaces the value of the key with update(value), or adds the key
+        with update(default) when it is absent. Returns the new value.
+        """
+        hash_code = self._hash(key)
+        position = self._find(key, hash_code)[1]
+        if position == -1:
+            value = update(default)
+            self._put(key, value, hash_code)
+            return value
+        self._values[position] = update(self._values[position])
+        return self._values[position]
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the number of index slots, rounded up to a power of two
+        that leaves room for every entry. The entries keep their order and
+        are not moved; only the index is rebuilt.
+        """
+        # Check if new capacity is not less than size
+        if new_capacity < self._size:
+            return
+
+        capacity = next_power_of_two(max(8, new_capacity))
+        while self._size > capacity * 2 // 3:
+            capacity *= 2
+        self._rebuild(capacity)
+
+    def _rebuild(self, capacity: int) -> None:
+        """
+        Drops removed entries from the dense arrays, keeping the order of
+        the others, and builds a new index of the given capacity from the
+        cached hashes
+        """
+        hashes = self._hashes
+        if self._size != len(self._keys):
+            keys, values = self._keys, self._values
+            live = [position for position in range(len(keys))
+                    if keys[position] is not _DELETED]
+            self._hashes = hashes = array('Q', [hashes[position]
+                                                for position in live])
+            self._keys = [keys[position] for position in live]
+            self._values = [values[position] for position in live]
+
+        indices = array(_index_typecode(capacity), [EMPTY]) * capacity
+        mask = capacity - 1
+        empty_slot = self._empty_slot
+        for position in range(len(hashes)):
+            indices[empty_slot(indices, mask, hashes[position])] = position
+
+        self._indices = indices
+        self._capacity = capacity
+        self._usable = capacity * 2 // 3
+        self._version += 1
+
+    def table_load(self) -> float:
+        """
+        Calculates and returns the hash table load factor
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty index slots. Every entry ever added
+        since the last rebuild, removed or not, holds exactly one slot.
+        """
+        return self._capacity - len(self._keys)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, returns None
+        """
+        position = self._find(key, self._hash(key))[1]
+        if position == -1:
+            return None
+        return self._values[position]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns true if the key is in the hash map, otherwise false
+        """
+        return self._find(key, self._hash(key))[1] != -1
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        If the key is not in the hash map, the method does nothing
+        """
+        self._remove(key, self._hash(key))
+
+    def _remove(self, key: str, hash_code: int) -> None:
+        """
+        Removes the key using an already computed hash of the key. Its
+        slot becomes a dummy so later probe sequences stay intact, and its
+        entry stays in the dense arrays until the next rebuild.
+        """
+        slot, position = self._find(key, hash_code)
+        if position == -1:
+            return
+
+        self._indices[slot] = DUMMY
+        self._keys[position] = _DELETED
+        self._values[position] = None
+        self._size -= 1
+        self._version += 1
+
+    # ------------------------------------------------------------------ #
+
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair of the iterable, as put would one at a
+        time, hashing the whole batch in one pass. The index is rebuilt as
+        new keys use up its slots, so updating keys never rebuilds it.
+        """
+        pairs = list(pairs)
+        keys = [pair[0] for pair in pairs]
+        hashes = [hash_code & _HASH_MASK
+                  for hash_code in hash_batch(self._hash_function, keys)]
+
+        put = self._put
+        for num in range(len(keys)):
+            put(keys[num], pairs[num][1], hashes[num])
+
+    def increment_many(self, keys, amount: int = 1) -> DynamicArray:
+        """
+        Increments every key of the iterable as increment would one at a
+        time and returns a dynamic array with each key's new value
+        """
+        keys = list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+
+        put, values = self._put, self._values
+        counts = []
+        for num in range(len(keys)):
+            position = put(keys[num], 0, hashes[num] & _HASH_MASK, False)
+            # A rebuild replaces the value array
+            values = self._values
+            values[position] += amount
+            counts.append(values[position])
+        return DynamicArray(counts)
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of every key of the iterable,
+        or default for keys that are not in the hash map
+        """
+        keys = list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+
+        find, values = self._find, self._values
+        found = []
+        for num in range(len(keys)):
+            position = find(keys[num], hashes[num] & _HASH_MASK)[1]
+            found.append(values[position] if position != -1 else default)
+        return DynamicArray(found)
+
+    def contains_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array telling for every key of the iterable
+        whether it is in the hash map
+        """
+        keys = list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+
+        find = self._find
+        return DynamicArray([
+            find(keys[num], hashes[num] & _HASH_MASK)[1] != -1
+            for num in range(len(keys))])
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of the iterable that is in the hash map
+        """
+        keys = list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+
+        remove = self._remove
+        for num in range(len(keys)):
+            remove(keys[num], hashes[num] & _HASH_MASK)
+
+    def keys(self):
+        """
+        Yields every key in the hash map in insertion order, without
+        building an array. Raises RuntimeError if keys are added or removed
+        while iterating; replacing values is allowed.
+        """
+        for position in self._positions():
+            yield self._keys[position]
+
+    def values(self):
+        """
+        Yields every value in the hash map in insertion order, like keys
+        """
+        for position in self._positions():
+            yield self._values[position]
+
+    def items(self):
+        """
+        Yields every (key, value) pair in the hash map in insertion order,
+        like keys
+        """
+        for position in self._positions():
+            yield self._keys[position], self._values[position]
+
+    def _positions(self):
+        """
+        Yields the position of every entry that has not been removed,
+        checking after each one that the map has not been changed in the
+        meantime
+        """
+        version = self._version
+        keys = self._keys
+
+        for position in range(len(keys)):
+            if keys[position] is not _DELETED:
+                yield position
+                if self._version != version:
+                    raise RuntimeError('HashMap changed during iteration')
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a da where each index contains a tuple of a key/value pair
+        stored in the hash map, in insertion order
+        """
+        key_value_arr = DynamicArray()
+        keys, values = self._keys, self._values
+
+        for position in range(len(keys)):
+            if keys[position] is not _DELETED:
+                key_value_arr.append((keys[position], values[position]))
+
+        return key_value_arr
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map. It does not change the number
+        of index slots.
+        """
+        self._allocate(self._capacity)
+        self._version += 1
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nput / get / remove")
+    print("------------------")
+    m = HashMap(8, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+    for i in range(0, 150, 3):
+        m.remove('str' + str(i))
+    result = True
+    for i in range(150):
+        result &= m.get('str' + str(i)) == (None if i % 3 == 0 else i * 100)
+        result &= not m.contains_key('str' + str(i + 150))
+    print(result, m.get_size(), m.get_capacity(), m.empty_buckets())
+
+    print("\ninsertion order survives resizes")
+    print("--------------------------------")
+    m = HashMap(8, hash_function_2)
+    for key in ('pear', 'apple', 'fig', 'kiwi', 'lime'):
+        m.put(key, len(key))
+    m.remove('apple')
+    m.put('pear', 0)
+    m.put('apple', 5)
+    print(list(m.keys()))
+    m.resize_table(1000)
+    print(list(m.items()), m.get_capacity())
+
+    print("\nindex width by capacity")
+    print("-----------------------")
+    for capacity in (8, 128, 256, 32768, 65536):
+        m = HashMap(capacity, hash_function_1)
+        print(capacity, m._indices.typecode, m._indices.itemsize)
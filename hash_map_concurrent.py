@@ -0,0 +1,465 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Separate chaining HashMap that can be shared between threads.
+#              The buckets are split into contiguous ranges, each guarded by
+#              one of a fixed number of striped locks, so writers to
+#              different ranges do not wait for each other. Lookups take no
+#              lock, and a resize holds every stripe while it builds the
+#              new table.
+
+from contextlib import contextmanager
+import operator
+import sys
+import threading
+
+from a6_include import (DynamicArray, LinkedList, SLNode,
+                        hash_function_1, hash_function_2)
+from hash_functions import hash_batch
+import hash_map_sc
+from snapshot import SnapshotReader
+
+
+class HashMap(hash_map_sc.HashMap):
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 stripes: int = 16,
+                 power_of_two: bool = False) -> None:
+        """
+        Initialize new thread-safe HashMap whose buckets are guarded by the
+        given number of striped locks
+
+        Lookups read whichever table is current without locking. A resize
+        copies every node into the new table instead of relinking it, so a
+        table that has been replaced is never changed again and a lookup
+        still walking it finds every key it held. For the same reason
+        keys(), values() and items() never raise when other threads change
+        the map; they may or may not see those changes.
+        """
+        super().__init__(capacity, function, power_of_two=power_of_two)
+        self._stripe_count = max(1, stripes)
+        self._locks = [threading.Lock() for _ in range(self._stripe_count)]
+
+        # Keys held in the buckets of each stripe. A count is only changed
+        # by the thread holding that stripe's lock.
+        self._counts = [0] * self._stripe_count
+
+    def __getstate__(self) -> dict:
+        """
+        Pickles the map without its locks
+        """
+        state = super().__getstate__()
+        del state['_locks']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        super().__setstate__(state)
+        self._locks = [threading.Lock() for _ in range(self._stripe_count)]
+
+    def _options(self) -> dict:
+        """
+        Returns the constructor options that a snapshot records
+        """
+        return {'stripes': self._stripe_count,
+                'power_of_two': self._power_of_two}
+
+    def dump(self, path, compress: bool = False) -> None:
+        """
+        Writes a snapshot of the table to the file at path while holding
+        every stripe, so it is consistent
+        """
+        with self._all_stripes():
+            super().dump(path, compress)
+
+    def _restore(self, reader: SnapshotReader, reuse_hashes: bool) -> None:
+        """
+        Links every node of a snapshot into its bucket and counts the keys
+        of each stripe
+        """
+        super()._restore(reader, reuse_hashes)
+        counts = [0] * self._stripe_count
+        for num in self._occupied_buckets():
+            counts[self._stripe(num, self._capacity)] += \
+                self._buckets[num].length()
+        self._counts = counts
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        with self._all_stripes():
+            return super().__str__()
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return sum(self._counts)
+
+    def _stripe(self, index: int, capacity: int) -> int:
+        """
+        Returns the stripe guarding a bucket index of a table of the given
+        capacity. Each stripe guards one contiguous range of buckets.
+        """
+        return index * self._stripe_count // capacity
+
+    def _lock_bucket(self, hash_code: int) -> tuple:
+        """
+        Acquires the lock of the stripe guarding the hash's bucket in the
+        current table and returns the table, bucket index and stripe.
+        Retries if a resize replaced the table while waiting for the lock.
+        """
+        while True:
+            buckets = self._buckets
+            capacity = buckets.length()
+            index = self._index(hash_code, capacity)
+            stripe = self._stripe(index, capacity)
+            lock = self._locks[stripe]
+            lock.acquire()
+            if buckets is self._buckets:
+                return buckets, index, stripe
+            lock.release()
+
+    @contextmanager
+    def _all_stripes(self):
+        """
+        Holds every stripe lock, for operations on the whole table. Locks
+        are always taken in the same order, and a thread holding a single
+        stripe never waits for another one, so this cannot deadlock.
+        """
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            yield
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hashmap. If the given key already exists in
+        the hash map, its associated value must be replaced with the new value. If the given key is
+        not in the hash map, a new key/value pair must be added.
+        """
+        self._store(key, self._hash_function(key), value)
+
+    def _store(self, key: str, hash_code: int, value: object,
+               combine=None) -> object:
+        """
+        Adds the key with the given value, or replaces the value of an
+        existing key with combine(value, new value) (just the new value
+        when combine is None), holding the lock of the key's stripe.
+        Returns the key's new value.
+        """
+        buckets, index, stripe = self._lock_bucket(hash_code)
+        try:
+            bucket = buckets[index]
+            node = bucket.contains(key, hash_code)
+            if node is not None:
+                if combine is not None:
+                    value = combine(node.value, value)
+                node.value = value
+                return value
+            count = self._link(bucket, index, stripe,
+                               SLNode(key, value, None, hash_code))
+        finally:
+            self._locks[stripe].release()
+
+        self._check_load(buckets, count)
+        return value
+
+    def _link(self, bucket: LinkedList, index: int, stripe: int,
+              node: SLNode) -> int:
+        """
+        Links a node for a new key into its bucket at index and returns the
+        new key count of the stripe, whose lock must be held. The node's
+        value is set first, as lookups may find it as soon as it is linked in.
+        """
+        bucket.insert_node(node)
+        self._occupancy[index] = 1
+        count = self._counts[stripe] + 1
+        self._counts[stripe] = count
+        return count
+
+    def _check_load(self, buckets: DynamicArray, count: int) -> None:
+        """
+        Doubles the table once it holds as many keys as buckets. Only a
+        stripe holding at least its share of the keys adds up the others.
+        The table is grown outside any stripe lock, as growing takes them all.
+        """
+        capacity = buckets.length()
+        if (count * self._stripe_count >= capacity
+                and sum(self._counts) >= capacity):
+            with self._all_stripes():
+                # Another thread may have grown the table in the meantime
+                if buckets is self._buckets:
+                    self._rehash(self._next_capacity(capacity * 2))
+
+    def increment(self, key: str, amount: int = 1) -> int:
+        """
+        Adds amount to the value of the key, treating a missing key as 0,
+        with a single lookup. Returns the new value.
+        """
+        return self._store(key, self._hash_function(key), amount, operator.add)
+
+    def upsert(self, key: str, update, default: object = None) -> object:
+        """
+        Replaces the value of the key with update(value), or adds the key
+        with update(default) when it is absent, with a single lookup.
+        Update is called while the key's stripe is locked. Returns the new
+        value.
+        """
+        hash_code = self._hash_function(key)
+        buckets, index, stripe = self._lock_bucket(hash_code)
+        try:
+            bucket = buckets[index]
+            node = bucket.contains(key, hash_code)
+            if node is not None:
+                node.value = update(node.value)
+                return node.value
+            value = update(default)
+            count = self._link(bucket, index, stripe,
+                               SLNode(key, value, None, hash_code))
+        finally:
+            self._locks[stripe].release()
+
+        self._check_load(buckets, count)
+        return value
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table.
+        All existing key:value pairs must be put into the new table.
+        """
+        # Check if the new capacity is less than 1
+        if new_capacity < 1:
+            return
+
+        with self._all_stripes():
+            # Set the capacity as the nearest prime number, doubling it
+            # until the table can hold every element
+            size = sum(self._counts)
+            capacity = self._next_capacity(new_capacity)
+            while size - 1 >= capacity:
+                capacity = self._next_capacity(capacity * 2)
+            self._rehash(capacity)
+
+    def _rehash(self, capacity: int) -> None:
+        """
+        Copies every node into a new table of exactly the given capacity.
+        Every stripe must be held.
+        """
+        old_buckets = self._buckets
+        buckets = DynamicArray([LinkedList() for _ in range(capacity)])
+        occupancy = bytearray(capacity)
+        counts = [0] * self._stripe_count
+
+        for num in self._occupied_buckets():
+            for node in old_buckets[num]:
+                index = self._index(node.hash, capacity)
+                buckets[index].insert(node.key, node.value, node.hash)
+                occupancy[index] = 1
+                counts[self._stripe(index, capacity)] += 1
+
+        # Publish the new table last: threads waiting for a stripe of the
+        # old one see that it was replaced and retry
+        self._counts = counts
+        self._occupancy = occupancy
+        self._capacity = capacity
+        self._buckets = buckets
+
+    def _find_node(self, key: str, hash_code: int) -> SLNode:
+        """
+        Returns the node holding the given key, or None if it is absent,
+        without taking any lock
+        """
+        buckets = self._buckets
+        bucket = buckets[self._index(hash_code, buckets.length())]
+        return bucket.contains(key, hash_code)
+
+    def table_load(self) -> float:
+        """
+        Calculates and returns the table load factor
+        """
+        return self.get_size() / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table
+        """
+        with self._all_stripes():
+            return self._occupancy.count(0)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its value from the hashmap
+        """
+        hash_code = self._hash_function(key)
+        buckets, index, stripe = self._lock_bucket(hash_code)
+        try:
+            bucket = buckets[index]
+            if bucket.remove(key, hash_code):
+                if bucket.length() == 0:
+                    self._occupancy[index] = 0
+                self._counts[stripe] -= 1
+        finally:
+            self._locks[stripe].release()
+
+    def _put_batch(self, keys: list, values: list, combine=None) -> None:
+        """
+        Puts each key with the value at the same position, combining it
+        with an existing value through combine when one is given. Each key
+        is stored under its own stripe lock, so other threads are never
+        held up for the whole batch.
+        """
+        hashes = hash_batch(self._hash_function, keys)
+        for num in range(len(keys)):
+            self._store(keys[num], hashes[num], values[num], combine)
+
+    def increment_many(self, keys, amount: int = 1) -> DynamicArray:
+        """
+        Increments every key of the iterable as increment would one at a
+        time and returns a dynamic array with each key's new value
+        """
+        keys = list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+        return DynamicArray([
+            self._store(keys[num], hashes[num], amount, operator.add)
+            for num in range(len(keys))])
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of every key of the iterable,
+        or default for keys that are not in the hash map. Each key is looked
+        up in the table that is current when it is reached.
+        """
+        keys = list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+
+        values = []
+        for num in range(len(keys)):
+            node = self._find_node(keys[num], hashes[num])
+            values.append(node.value if node else default)
+        return DynamicArray(values)
+
+    def contains_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array telling for every key of the iterable
+        whether it is in the hash map
+        """
+        keys = list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+        return DynamicArray([
+            self._find_node(keys[num], hashes[num]) is not None
+            for num in range(len(keys))])
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of the iterable that is in the hash map
+        """
+        keys = list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+        for num in range(len(keys)):
+            buckets, index, stripe = self._lock_bucket(hashes[num])
+            try:
+                bucket = buckets[index]
+                if bucket.remove(keys[num], hashes[num]):
+                    if bucket.length() == 0:
+                        self._occupancy[index] = 0
+                    self._counts[stripe] -= 1
+            finally:
+                self._locks[stripe].release()
+
+    def _nodes(self):
+        """
+        Yields every node of the table that is current when iteration
+        starts. The table and its occupancy are read together under every
+        stripe and then walked without locks.
+        """
+        with self._all_stripes():
+            buckets, occupancy = self._buckets, self._occupancy
+
+        find = occupancy.find
+        num = find(1)
+        while num != -1:
+            yield from buckets[num]
+            num = find(1, num + 1)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        This method returns a dynamic array where each index contains a tuple of a key/value pair
+        stored in the hash map. Every stripe is held while it is built, so
+        it is a consistent snapshot.
+        """
+        with self._all_stripes():
+            return super().get_keys_and_values()
+
+    def clear(self) -> None:
+        """
+        This method clears the contents of the hash map. It does not change the underlying hash
+        table capacity.
+        """
+        with self._all_stripes():
+            self._counts = [0] * self._stripe_count
+            self._occupancy = bytearray(self._capacity)
+            self._buckets = DynamicArray([LinkedList()
+                                          for _ in range(self._capacity)])
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nput / get / remove")
+    print("------------------")
+    m = HashMap(53, hash_function_1, stripes=4)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+    for i in range(0, 150, 2):
+        m.remove('str' + str(i))
+    print(m.get_size(), m.get('str1'), m.get('str2'), m.contains_key('str149'))
+
+    print("\nincrement / upsert")
+    print("------------------")
+    m = HashMap(11, hash_function_2)
+    for word in "the cat and the hat and the bat".split():
+        m.increment(word)
+    m.upsert('hats', lambda hats: hats + ['top'], [])
+    m.upsert('hats', lambda hats: hats + ['bowler'], [])
+    print(m.get('the'), m.get('and'), m.get('cat'), m.get('hats'))
+
+    print("\nstress test")
+    print("-----------")
+    # Threads put their own keys, increment shared counters and remove
+    # half of their keys while the table keeps growing under them. A short
+    # switch interval makes threads interleave far more often.
+    sys.setswitchinterval(1e-6)
+    threads, rounds = 8, 2000
+    m = HashMap(11, hash_function_2, stripes=4)
+
+    def work(thread: int) -> None:
+        for i in range(rounds):
+            m.put(f'{thread}-{i}', i)
+            m.increment('shared' + str(i % 10))
+            if i % 2:
+                m.remove(f'{thread}-{i - 1}')
+
+    workers = [threading.Thread(target=work, args=(thread,))
+               for thread in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    result = m.get_size() == threads * rounds // 2 + 10
+    for thread in range(threads):
+        for i in range(rounds):
+            result &= m.get(f'{thread}-{i}') == (i if i % 2 else None)
+    for i in range(10):
+        result &= m.get('shared' + str(i)) == threads * rounds // 10
+    pairs = m.get_keys_and_values()
+    print(result, pairs.length() == m.get_size(), m.get_capacity())
@@ -0,0 +1,459 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Open addressing HashMap specialised for 64-bit integer keys
+#              and float values, kept in NumPy arrays. Batches of keys are
+#              inserted and looked up with vectorized probing that advances
+#              every key of the batch in lockstep.
+
+from a6_include import DynamicArray
+from capacity_planning import next_power_of_two
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Slot states kept in the control array
+EMPTY = 0
+LIVE = 1
+TOMBSTONE = 2
+
+_MASK = (1 << 64) - 1
+
+# 2^64 divided by the golden ratio, for Fibonacci (multiply-shift) hashing
+_FIBONACCI = 0x9E3779B97F4A7C15
+
+
+class HashMap:
+    def __init__(self, capacity: int = 16,
+                 max_tombstone_ratio: float = 0.25) -> None:
+        """
+        Initialize new HashMap for int keys and float values that uses
+        triangular probing over a power-of-two table, growing like the
+        OA map once the load factor reaches 0.5
+        """
+        if np is None:
+            raise ImportError('hash_map_int requires NumPy')
+
+        self._capacity = next_power_of_two(max(2, capacity))
+        self._allocate(self._capacity)
+        self._size = 0
+        self._tombstones = 0
+        self._max_tombstone_ratio = max_tombstone_ratio
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            out += str(i) + ': ' + str(self.get_bucket(i)) + '\n'
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Replaces the slot arrays with empty arrays of the given capacity
+        """
+        self._control = np.zeros(capacity, dtype=np.uint8)
+        self._keys = np.zeros(capacity, dtype=np.int64)
+        self._values = np.zeros(capacity, dtype=np.float64)
+        self._shift = 65 - capacity.bit_length()
+
+    def _home(self, key: int) -> int:
+        """
+        Returns the first slot probed for the key
+        """
+        # NumPy integer scalars would overflow in the multiplication
+        key = int(key)
+        return (((key & _MASK) * _FIBONACCI) & _MASK) >> self._shift
+
+    def _homes(self, keys):
+        """
+        Returns the first slot probed for every key of an int64 array
+        """
+        mixed = keys.view(np.uint64) * np.uint64(_FIBONACCI)
+        return (mixed >> np.uint64(self._shift)).astype(np.int64)
+
+    def _find(self, key: int) -> int:
+        """
+        Returns the slot index holding the given key, or -1 if it is absent
+        """
+        key = int(key)
+        control, keys = self._control, self._keys
+        mask = self._capacity - 1
+        index = self._home(key)
+        probe_counter = 0
+
+        while probe_counter <= mask:
+            probe_index = (index + (probe_counter * (probe_counter + 1) >> 1)) & mask
+            state = control[probe_index]
+
+            # An empty slot ends the probe sequence
+            if state == EMPTY:
+                return -1
+            if state == LIVE and keys[probe_index] == key:
+                return probe_index
+
+            probe_counter += 1
+
+        return -1
+
+    def _find_many(self, keys):
+        """
+        Returns the slot index of every key of an int64 array, or -1 for
+        keys that are absent. All keys probe in lockstep, one probe per round.
+        """
+        control, table_keys = self._control, self._keys
+        mask = self._capacity - 1
+        slots = np.full(len(keys), -1, dtype=np.int64)
+
+        active = np.arange(len(keys))
+        homes = self._homes(keys)
+        probe_counter = 0
+        while len(active) and probe_counter <= mask:
+            probe_index = (homes + (probe_counter * (probe_counter + 1) >> 1)) & mask
+            state = control[probe_index]
+
+            found = (state == LIVE) & (table_keys[probe_index] == keys[active])
+            slots[active[found]] = probe_index[found]
+
+            # Keys stop probing once found or once an empty slot is reached
+            going = ~found & (state != EMPTY)
+            active, homes = active[going], homes[going]
+            probe_counter += 1
+
+        return slots
+
+    def put(self, key: int, value: float) -> None:
+        """
+        Updates the key/value pair in the hash map.
+        If the key already exists, its value will be replaced by the new value.
+        If the key doesn't already exist, a new key/value pair will be added.
+        """
+        key = int(key)
+
+        # Check if resizing is necessary
+        if self.table_load() >= 0.5:
+            self.resize_table(self._capacity * 2)
+
+        control = self._control
+        mask = self._capacity - 1
+        index = self._home(key)
+        probe_counter = 0
+        free_index = -1
+
+        # Probe until an empty slot proves the key is absent
+        while probe_counter <= mask:
+            probe_index = (index + (probe_counter * (probe_counter + 1) >> 1)) & mask
+            state = control[probe_index]
+
+            if state == EMPTY:
+                if free_index == -1:
+                    free_index = probe_index
+                break
+
+            if state == TOMBSTONE:
+                # Remember the first tombstone so it can be reused
+                if free_index == -1:
+                    free_index = probe_index
+            elif self._keys[probe_index] == key:
+                # If the key already exists, update the value
+                self._values[probe_index] = value
+                return
+
+            probe_counter += 1
+
+        # Store the key/value pair into the first free slot found before
+        # marking it live, so a key outside int64 or a value that is not a
+        # float raises without leaving the map changed
+        self._keys[free_index] = key
+        self._values[free_index] = value
+        if control[free_index] == TOMBSTONE:
+            self._tombstones -= 1
+        control[free_index] = LIVE
+        self._size += 1
+
+    def put_many(self, keys, values) -> None:
+        """
+        Puts every key of an integer array with the value at the same
+        position of the values array. When a key repeats, its last value
+        wins. The table is grown at most once.
+        """
+        keys = np.asarray(keys, dtype=np.int64).ravel()
+        values = np.broadcast_to(np.asarray(values, dtype=np.float64),
+                                 keys.shape)
+
+        # Keep only the last occurrence of every key
+        unique, last = np.unique(keys[::-1], return_index=True)
+        keys, values = unique, values[::-1][last]
+
+        # Update the keys already in the map in place, so only the new
+        # keys count toward the growth below
+        slots = self._find_many(keys)
+        present = slots >= 0
+        self._values[slots[present]] = values[present]
+        keys, values = keys[~present], values[~present]
+        if not len(keys):
+            return
+
+        # Grow as far as the puts could have grown the table one at a time
+        capacity = self._capacity
+        while (self._size + len(keys) - 1) / capacity >= 0.5:
+            capacity *= 2
+        if capacity != self._capacity:
+            self.resize_table(capacity)
+
+        self._insert_many(keys, values)
+
+    def _insert_many(self, keys, values) -> None:
+        """
+        Updates or inserts distinct keys into a table with room for them
+        """
+        control, table_keys = self._control, self._keys
+        mask = self._capacity - 1
+
+        active = np.arange(len(keys))
+        homes = self._homes(keys)
+        counters = np.zeros(len(keys), dtype=np.int64)
+        free = np.full(len(keys), -1, dtype=np.int64)
+
+        while len(active):
+            probe_index = (homes + (counters * (counters + 1) >> 1)) & mask
+            state = control[probe_index]
+            batch_keys = keys[active]
+
+            # Existing keys only need their value updated
+            found = (state == LIVE) & (table_keys[probe_index] == batch_keys)
+            self._values[probe_index[found]] = values[active[found]]
+
+            # Remember the first tombstone of each probe sequence
+            tombstone = (state == TOMBSTONE) & (free == -1)
+            free[tombstone] = probe_index[tombstone]
+
+            # An empty slot proves the key is absent: claim a free slot.
+            # A remembered tombstone may have been claimed since, in which
+            # case the key tries again from its current slot
+            empty = state == EMPTY
+            target = np.where(free >= 0, free, probe_index)
+            stale = empty & (control[target] == LIVE)
+            free[stale] = -1
+            claim = np.flatnonzero(empty & ~stale)
+
+            # When several keys claim one slot the first of them gets it
+            # and the others look at their current slot again
+            _, first = np.unique(target[claim], return_index=True)
+            won = claim[first]
+            slots = target[won]
+            self._tombstones -= int(np.count_nonzero(control[slots] == TOMBSTONE))
+            control[slots] = LIVE
+            table_keys[slots] = keys[active[won]]
+            self._values[slots] = values[active[won]]
+            self._size += len(won)
+
+            done = found.copy()
+            done[won] = True
+            counters[~done & ~empty] += 1
+
+            going = ~done
+            active, homes = active[going], homes[going]
+            counters, free = counters[going], free[going]
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table.
+        All active key/value pairs are placed into the new arrays at once.
+        """
+        # Check if new capacity is not less than size
+        if new_capacity < self._size:
+            return
+
+        # Make sure that the new capacity is a power of two that keeps the
+        # load factor below 0.5 once every entry is placed
+        capacity = next_power_of_two(max(2, new_capacity))
+        while self._size > 0 and (self._size - 1) / capacity >= 0.5:
+            capacity *= 2
+
+        self._rehash(capacity)
+
+    def _rehash(self, capacity: int) -> None:
+        """
+        Moves every live entry into new arrays of exactly the given capacity
+        """
+        live = self._control == LIVE
+        keys, values = self._keys[live], self._values[live]
+
+        self._capacity = capacity
+        self._allocate(capacity)
+        self._size = 0
+        self._tombstones = 0
+        self._insert_many(keys, values)
+
+    def table_load(self) -> float:
+        """
+        Calculates and returns the hash table load factor
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table
+        """
+        return int(np.count_nonzero(self._control == EMPTY))
+
+    def get(self, key: int) -> float:
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, returns None
+        """
+        index = self._find(key)
+        if index == -1:
+            return None
+        return float(self._values[index])
+
+    def get_many(self, keys, default: float = np.nan if np else None):
+        """
+        Returns a float array with the value of every key of an integer
+        array, or default for keys that are not in the hash map
+        """
+        keys = np.asarray(keys, dtype=np.int64).ravel()
+        slots = self._find_many(keys)
+        return np.where(slots >= 0, self._values[slots], default)
+
+    def contains_key(self, key: int) -> bool:
+        """
+        Returns true if the key is in the hash map, otherwise false
+        """
+        return self._find(key) != -1
+
+    def contains_many(self, keys):
+        """
+        Returns a boolean array telling for every key of an integer array
+        whether it is in the hash map
+        """
+        keys = np.asarray(keys, dtype=np.int64).ravel()
+        return self._find_many(keys) >= 0
+
+    def remove(self, key: int) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        If the key is not in the hash map, the method does nothing
+        """
+        index = self._find(key)
+        if index == -1:
+            return
+
+        # Leave a tombstone so later probe sequences stay intact
+        self._control[index] = TOMBSTONE
+        self._size -= 1
+        self._tombstones += 1
+        self._compact()
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of an integer array that is in the hash map
+        """
+        keys = np.asarray(keys, dtype=np.int64).ravel()
+        slots = np.unique(self._find_many(keys))
+        slots = slots[slots >= 0]
+
+        self._control[slots] = TOMBSTONE
+        self._size -= len(slots)
+        self._tombstones += len(slots)
+        self._compact()
+
+    def _compact(self) -> None:
+        """
+        Clears out tombstones once they take up too much of the table
+        """
+        if self._tombstones > self._max_tombstone_ratio * self._capacity:
+            self._rehash(self._capacity)
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a da where each index contains a tuple of a key/value pair
+        stored in the hash map
+        """
+        keys, values = self.to_arrays()
+        return DynamicArray(list(zip(keys.tolist(), values.tolist())))
+
+    def to_arrays(self) -> tuple:
+        """
+        Returns the keys and values stored in the hash map as two arrays
+        """
+        live = self._control == LIVE
+        return self._keys[live], self._values[live]
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map
+        """
+        self._allocate(self._capacity)
+        self._size = 0
+        self._tombstones = 0
+
+    def get_bucket(self, index: int) -> tuple:
+        """
+        Returns the (key, value) pair in the slot at the given index,
+        or None if the slot is empty or holds a tombstone
+        """
+        if self._control[index] != LIVE:
+            return None
+        return int(self._keys[index]), float(self._values[index])
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nput / get example")
+    print("-----------------")
+    m = HashMap(8)
+    for i in range(150):
+        m.put(i * 7, i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+    print(m.get(7), m.get(8), m.contains_key(1043), m.contains_key(1044))
+
+    print("\nbatch example")
+    print("-------------")
+    m = HashMap()
+    keys = np.arange(-500, 500, 3)
+    m.put_many(keys, keys * 0.5)
+    m.put_many([1, 1, 1], [1.0, 2.0, 3.0])
+    print(m.get_size(), m.get_capacity(), m.get(1), m.get(-500))
+    print(m.get_many([-500, -499, 1, 2 ** 62], default=-1.0))
+    m.remove_many(keys[::2])
+    print(m.get_size(), m.contains_many([-500, -497, 1]))
+
+    print("\nremove / re-put example")
+    print("-----------------------")
+    m = HashMap()
+    m.put(-1, 10)
+    m.remove(-1)
+    m.put(-1, 20)
+    print(m.get(-1), m.get_size(), m.contains_key(-1))
+
+    print("\nNumPy scalar key example")
+    print("------------------------")
+    m = HashMap()
+    m.put(np.int64(-5), 1)
+    m.put(np.uint64(5), 2)
+    print(m.get(np.int64(-5)), m.get(np.uint64(5)), m.get(-5), m.get(5))
+    m.remove(np.int64(-5))
+    m.remove(np.uint64(5))
+    print(m.get_size(), m.contains_key(np.int64(-5)), m.contains_key(np.uint64(5)))
@@ -0,0 +1,545 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Persistent open addressing HashMap kept in a memory-mapped
+#              file, probed with the quadratic sequence of hash_map_oa.
+#              Opening a map only maps the file, so its pages are read in
+#              as lookups touch them. Keys are strings and values are bytes;
+#              get returns a memoryview into the mapping instead of a copy.
+#
+#              File format, all integers little-endian:
+#
+#              header, 64 bytes
+#                   0  magic       8 bytes   b'CS261HMM'
+#                   8  version     u32       FORMAT_VERSION
+#                  12  hash id     u32       hash_functions.persistent_hash_id
+#                  16  capacity    u64       number of slots, a prime
+#                  24  size        u64       live keys
+#                  32  tombstones  u64       removed keys still holding a slot
+#                  40  heap end    u64       offset just past the last record
+#                  48  reserved    16 bytes  zero
+#              slots, capacity x 16 bytes, from offset 64
+#                   0  hash        u64       the key's 64-bit hash
+#                   8  record      u64       offset of the key's record, or
+#                                            EMPTY (0) or TOMBSTONE (1)
+#              record heap, from 64 + 16 * capacity up to heap end
+#                   0  key length    u32
+#                   4  value length  u32
+#                   8  key (UTF-8), then value
+#
+#              Records are only ever appended; replacing a value appends a
+#              new record and points the slot at it. A resize or clear
+#              writes a complete new file next to the old one and renames
+#              it over the old file, so a crash leaves either file intact.
+
+import mmap
+import os
+import struct
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from capacity_planning import next_prime
+from hash_functions import persistent_hash_function, persistent_hash_id
+from snapshot import fsync_directory, open_temp_file
+
+
+MAGIC = b'CS261HMM'
+FORMAT_VERSION = 1
+
+# Record offsets of slots that hold no record
+EMPTY = 0
+TOMBSTONE = 1
+
+_HEADER = struct.Struct('<8sIIQQQQ16x')
+_SLOT = struct.Struct('<QQ')
+_RECORD = struct.Struct('<II')
+
+# Hashes are stored as unsigned 64-bit integers
+_HASH_MASK = (1 << 64) - 1
+
+
+class HashMap:
+    def __init__(self, path, capacity: int = 11, function=None) -> None:
+        """
+        Opens the map stored in the file at path, or creates an empty one
+        with the given capacity and hash function (hash_function_1 by
+        default) when there is no such file. An existing file keeps the
+        hash function it was created with; a different function raises
+        ValueError. Only hash functions that give the same hashes in every
+        process can be used.
+        """
+        self._path = os.fspath(path)
+        self._file = None
+        self._mm = None
+        self._view = None
+
+        # Changes whenever keys are added or removed or records are moved,
+        # so that iterators can tell the map was changed under them
+        self._version = 0
+
+        if not os.path.exists(self._path):
+            hash_id = persistent_hash_id(function or hash_function_1)
+            self._write_file(next_prime(capacity), hash_id, ())
+        self._open()
+
+        if (function is not None
+                and persistent_hash_id(function) != self._hash_id):
+            self.close()
+            raise ValueError(f'{self._path} was created with another hash '
+                             f'function')
+
+    def __enter__(self) -> 'HashMap':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for num in range(self._capacity):
+            ref = self._slot(num)[1]
+            if ref == EMPTY:
+                out += str(num) + ': None\n'
+            elif ref == TOMBSTONE:
+                out += str(num) + ': TS\n'
+            else:
+                key, value = self._record(ref)
+                out += (str(num) + ': K: ' + str(key, 'utf-8') + ' V: '
+                        + str(bytes(value)) + '\n')
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    def get_tombstones(self) -> int:
+        """
+        Returns the number of tombstones in the hash table
+        """
+        return self._tombstones
+
+    # ------------------------------------------------------------------ #
+
+    def _open(self) -> None:
+        """
+        Maps the file and reads its header
+        """
+        self._file = open(self._path, 'r+b')
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self._view = memoryview(self._mm)
+
+        if len(self._mm) < _HEADER.size:
+            self.close()
+            raise ValueError(f'{self._path} is not a hash map file')
+        (magic, version, self._hash_id, self._capacity, self._size,
+         self._tombstones, self._heap_end) = _HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f'{self._path} is not a version '
+                             f'{FORMAT_VERSION} hash map file')
+        self._hash_function = persistent_hash_function(self._hash_id)
+
+    def _write_header(self) -> None:
+        """
+        Writes the in-memory header fields into the mapping
+        """
+        _HEADER.pack_into(self._mm, 0, MAGIC, FORMAT_VERSION, self._hash_id,
+                          self._capacity, self._size, self._tombstones,
+                          self._heap_end)
+
+    def _write_file(self, capacity: int, hash_id: int, records) -> None:
+        """
+        Writes a complete map file of the given capacity holding the given
+        (hash, key, value) records to a temporary file, syncs it and
+        renames it over the map's file
+        """
+        slots = bytearray(_SLOT.size * capacity)
+        offset = _HEADER.size + len(slots)
+        size = 0
+
+        out, temp_path = open_temp_file(self._path)
+        try:
+            with out:
+                out.seek(offset)
+                for hash_code, key, value in records:
+                    # Place the record in the first empty slot of its sequence
+                    index = hash_code % capacity
+                    probe_counter = 0
+                    probe_index = index
+                    while _SLOT.unpack_from(
+                            slots, probe_index * _SLOT.size)[1] != EMPTY:
+                        probe_counter += 1
+                        probe_index = (index + probe_counter ** 2) % capacity
+                    _SLOT.pack_into(slots, probe_index * _SLOT.size,
+                                    hash_code, offset)
+
+                    out.write(_RECORD.pack(len(key), len(value)))
+                    out.write(key)
+                    out.write(value)
+                    offset += _RECORD.size + len(key) + len(value)
+                    size += 1
+
+                out.seek(0)
+                out.write(_HEADER.pack(MAGIC, FORMAT_VERSION, hash_id,
+                                       capacity, size, 0, offset))
+                out.write(slots)
+                out.flush()
+                os.fsync(out.fileno())
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        os.replace(temp_path, self._path)
+        fsync_directory(self._path)
+
+    def _remap(self, length: int) -> None:
+        """
+        Extends the file to the given length and maps it again. Views
+        already handed out keep the old mapping alive and stay valid.
+        """
+        self._file.truncate(length)
+        self._view.release()
+        try:
+            self._mm.close()
+        except BufferError:
+            # Values returned by get still point into the old mapping
+            pass
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        self._view = memoryview(self._mm)
+
+    def _slot(self, index: int) -> tuple:
+        """
+        Returns the (hash, record offset) pair of the slot at index
+        """
+        return _SLOT.unpack_from(self._mm, _HEADER.size + index * _SLOT.size)
+
+    def _record(self, ref: int) -> tuple:
+        """
+        Returns views of the key and value of the record at offset ref
+        """
+        key_length, value_length = _RECORD.unpack_from(self._mm, ref)
+        start = ref + _RECORD.size
+        return (self._view[start:start + key_length],
+                self._view[start + key_length:
+                           start + key_length + value_length])
+
+    def _hash(self, key: str) -> int:
+        """
+        Returns the stored form of the key's hash
+        """
+        return self._hash_function(key) & _HASH_MASK
+
+    def _locate(self, key: bytes, hash_code: int) -> tuple:
+        """
+        Returns the slot index of the encoded key, or -1 if it is absent,
+        along with the first slot of its probe sequence a new record could
+        take (a tombstone or the empty slot that ended the search)
+        """
+        mm, view = self._mm, self._view
+        capacity = self._capacity
+        index = hash_code % capacity
+        probe_counter = 0
+        free_index = -1
+
+        while probe_counter < capacity:
+            probe_index = (index + probe_counter ** 2) % capacity
+            slot_hash, ref = _SLOT.unpack_from(
+                mm, _HEADER.size + probe_index * _SLOT.size)
+
+            # An empty slot ends the probe sequence
+            if ref == EMPTY:
+                if free_index == -1:
+                    free_index = probe_index
+                break
+
+            if ref == TOMBSTONE:
+                if free_index == -1:
+                    free_index = probe_index
+            elif slot_hash == hash_code:
+                # Compare the stored key in place, without copying it
+                key_length = _RECORD.unpack_from(mm, ref)[0]
+                start = ref + _RECORD.size
+                if view[start:start + key_length] == key:
+                    return probe_index, free_index
+
+            probe_counter += 1
+
+        return -1, free_index
+
+    def _append(self, key: bytes, value) -> int:
+        """
+        Appends a record to the heap, growing the file when it is full, and
+        returns its offset
+        """
+        ref = self._heap_end
+        start = ref + _RECORD.size
+        end = start + len(key) + len(value)
+        if end > len(self._mm):
+            self._remap(max(end, 2 * len(self._mm)))
+
+        _RECORD.pack_into(self._mm, ref, len(key), len(value))
+        self._mm[start:start + len(key)] = key
+        self._mm[start + len(key):end] = value
+        self._heap_end = end
+        return ref
+
+    def put(self, key: str, value) -> None:
+        """
+        Updates the key/value pair in the hash map. The value may be any
+        bytes-like object. If the key already exists, its value will be
+        replaced by the new value.
+        """
+        encoded = key.encode('utf-8')
+        value = memoryview(value).cast('B')
+        hash_code = self._hash(key)
+        index, free_index = self._locate(encoded, hash_code)
+
+        if index == -1:
+            # Keep at most half of the slots in use, so quadratic probing
+            # always finds an empty one. Tombstones are dropped by a rehash
+            # at the same capacity when only they are in the way.
+            if (self._size + self._tombstones + 1) * 2 > self._capacity:
+                capacity = self._capacity
+                if (self._size + 1) * 2 > capacity:
+                    capacity = next_prime(capacity * 2)
+                self._rehash(capacity)
+                free_index = self._locate(encoded, hash_code)[1]
+
+        # Write the record before pointing a slot at it, and the header last
+        ref = self._append(encoded, value)
+        if index == -1:
+            index = free_index
+            if self._slot(index)[1] == TOMBSTONE:
+                self._tombstones -= 1
+            self._size += 1
+            self._version += 1
+        _SLOT.pack_into(self._mm, _HEADER.size + index * _SLOT.size,
+                        hash_code, ref)
+        self._write_header()
+
+    def get(self, key: str) -> memoryview:
+        """
+        Returns a read-only view of the value associated with the given key
+        in the mapped file, or None if the key is not in the hash map
+        """
+        index = self._locate(key.encode('utf-8'), self._hash(key))[0]
+        if index == -1:
+            return None
+        return self._record(self._slot(index)[1])[1].toreadonly()
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns true if the key is in the hash map, otherwise false
+        """
+        return self._locate(key.encode('utf-8'), self._hash(key))[0] != -1
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        If the key is not in the hash map, the method does nothing
+        """
+        index = self._locate(key.encode('utf-8'), self._hash(key))[0]
+        if index == -1:
+            return
+
+        # Leave a tombstone so later probe sequences stay intact
+        hash_code = self._slot(index)[0]
+        _SLOT.pack_into(self._mm, _HEADER.size + index * _SLOT.size,
+                        hash_code, TOMBSTONE)
+        self._size -= 1
+        self._tombstones += 1
+        self._version += 1
+        self._write_header()
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Rewrites the file with a table of the given capacity (the next
+        prime that keeps the load factor at or below 0.5), dropping
+        tombstones and replaced values
+        """
+        # Check if new capacity is not less than size
+        if new_capacity < self._size:
+            return
+
+        capacity = next_prime(new_capacity)
+        while self._size * 2 > capacity:
+            capacity = next_prime(capacity * 2)
+        self._rehash(capacity)
+
+    def _rehash(self, capacity: int) -> None:
+        """
+        Writes every live record into a new file of exactly the given
+        capacity using the stored hashes, then maps the new file
+        """
+        self._write_file(capacity, self._hash_id, self._live_records())
+        self._close_mapping()
+        self._open()
+        self._version += 1
+
+    def _live_records(self):
+        """
+        Yields the (hash, key view, value view) of every live record
+        """
+        for num in range(self._capacity):
+            hash_code, ref = self._slot(num)
+            if ref > TOMBSTONE:
+                key, value = self._record(ref)
+                yield hash_code, key, value
+
+    def table_load(self) -> float:
+        """
+        Calculates and returns the hash table load factor
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table
+        """
+        return self._capacity - self._size - self._tombstones
+
+    def keys(self):
+        """
+        Yields every key in the hash map, one at a time. Raises
+        RuntimeError if keys are added or removed while iterating.
+        """
+        for key, _ in self._records():
+            yield str(key, 'utf-8')
+
+    def values(self):
+        """
+        Yields a view of every value in the hash map, one at a time, like
+        keys
+        """
+        for _, value in self._records():
+            yield value.toreadonly()
+
+    def items(self):
+        """
+        Yields every (key, value view) pair in the hash map, one at a time,
+        like keys
+        """
+        for key, value in self._records():
+            yield str(key, 'utf-8'), value.toreadonly()
+
+    def _records(self):
+        """
+        Yields the key and value views of every live record, checking
+        after each one that the map has not been changed in the meantime
+        """
+        version = self._version
+        for num in range(self._capacity):
+            ref = self._slot(num)[1]
+            if ref > TOMBSTONE:
+                yield self._record(ref)
+                if self._version != version:
+                    raise RuntimeError('HashMap changed during iteration')
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a da where each index contains a tuple of a key and a view
+        of its value
+        """
+        key_value_arr = DynamicArray()
+        for key, value in self.items():
+            key_value_arr.append((key, value))
+        return key_value_arr
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map, keeping its capacity. Views of
+        old values stay valid, as a new file replaces the old one.
+        """
+        self._write_file(self._capacity, self._hash_id, ())
+        self._close_mapping()
+        self._open()
+        self._version += 1
+
+    def flush(self) -> None:
+        """
+        Writes every change made through the mapping back to the file
+        """
+        self._mm.flush()
+
+    def close(self) -> None:
+        """
+        Flushes the map and closes its file. Views returned by get stay
+        valid until they are released.
+        """
+        if self._mm is not None:
+            self._mm.flush()
+        self._close_mapping()
+
+    def _close_mapping(self) -> None:
+        """
+        Drops the mapping and closes the file, leaving any mapping that
+        returned views still use to be unmapped once they are released
+        """
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mm is not None:
+            try:
+                self._mm.close()
+            except BufferError:
+                pass
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'map.bin')
+
+        print("\nput / get / remove")
+        print("------------------")
+        with HashMap(path, 53, hash_function_2) as m:
+            for i in range(150):
+                m.put('str' + str(i), str(i * 100).encode())
+                if i % 25 == 24:
+                    print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+            for i in range(0, 150, 3):
+                m.remove('str' + str(i))
+            m.put('str1', b'replaced')
+            print(bytes(m.get('str1')), m.get('str3'), m.contains_key('str4'))
+
+        print("\nreopen")
+        print("------")
+        with HashMap(path) as m:
+            result = m.get_size() == 100
+            for i in range(2, 150):
+                value = m.get('str' + str(i))
+                if i % 3 == 0:
+                    result &= value is None
+                else:
+                    result &= bytes(value) == str(i * 100).encode()
+            print(result, m.get_size(), m.get_capacity(), m.get_tombstones())
+
+            # Views survive a resize, which replaces the file
+            value = m.get('str2')
+            m.resize_table(1000)
+            print(bytes(value), m.get_capacity(), m.get_tombstones(),
+                  os.path.getsize(path))
+
+        print("\nhash function must match")
+        print("------------------------")
+        try:
+            HashMap(path, function=hash_function_1)
+        except ValueError as error:
+            print(error.args[0].endswith('another hash function'))
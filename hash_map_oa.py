@@ -7,67 +7,224 @@
 
 from a6_include import (DynamicArray, DynamicArrayException, HashEntry,
                         hash_function_1, hash_function_2)
+from capacity_planning import next_power_of_two, next_prime, plan_capacity
+from hash_functions import (get_hash_function, hash_batch, hash_function_name,
+                            power_of_two_index)
+from snapshot import CHUNK_SIZE, SnapshotReader, SnapshotWriter, make_header
+
+
+# Slot states kept in the occupancy array
+EMPTY = 0
+LIVE = 1
+TOMBSTONE = 2
+
+# Maps every slot state to 1 except EMPTY, to find used slots with find
+_USED = bytes([0, 1, 1]) + bytes(253)
 
 
 class HashMap:
-    def __init__(self, capacity: int, function) -> None:
+    # Kind recorded in snapshot headers; load only accepts its own kind,
+    # as subclasses lay out their tables differently
+    _snapshot_kind = 'oa'
+    _snapshot_name = 'an open addressing'
+
+    def __init__(self, capacity: int, function,
+                 incremental_resize: bool = False,
+                 migration_step: int = 8,
+                 max_tombstone_ratio: float = 0.25,
+                 power_of_two: bool = False) -> None:
         """
         Initialize new HashMap that uses
         quadratic probing for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+
+        The hash function may also be given by its name in hash_functions.
+
+        With incremental_resize, growing the table allocates the new table
+        and then moves migration_step old slots per put/get/remove instead
+        of rehashing everything inside a single put.
+
+        Once tombstones fill more than max_tombstone_ratio of the table it
+        is rehashed in place to clear them out.
+
+        With power_of_two, capacities are powers of two, slots are picked by
+        multiply-shift hashing instead of a prime modulo and probing follows
+        triangular numbers.
         """
-        self._buckets = DynamicArray()
+        # capacity must be a prime number (or a power of two)
+        self._power_of_two = power_of_two
+        self._capacity = self._next_capacity(capacity)
+        self._buckets = DynamicArray([None] * self._capacity)
 
-        # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
-        for _ in range(self._capacity):
-            self._buckets.append(None)
+        # State of every slot of the current table, one byte each, so scans
+        # can jump between live slots with bytearray.find instead of
+        # inspecting every slot in Python
+        self._occupancy = bytearray(self._capacity)
 
-        self._hash_function = function
+        self._hash_function = get_hash_function(function)
         self._size = 0
 
-    def __str__(self) -> str:
+        # Changes whenever keys are added or removed or entries are moved,
+        # so that iterators can tell the map was changed under them
+        self._version = 0
+
+        # Removed entries still occupying slots of the table
+        self._tombstones = 0
+        self._max_tombstone_ratio = max_tombstone_ratio
+
+        # Old table still being drained by an incremental resize
+        self._incremental_resize = incremental_resize
+        self._migration_step = max(2, migration_step)
+        self._old_buckets = None
+        self._old_capacity = 0
+        self._migrate_index = 0
+
+    @classmethod
+    def with_expected_size(cls, expected_size: int, function,
+                           max_load: float = 0.5, **kwargs) -> 'HashMap':
         """
-        Override string method to provide more readable output
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Returns an empty HashMap sized so that expected_size entries can be
+        put without a resize, keeping the load factor at or below max_load
+        (at most 0.5, where the map itself resizes). Other keyword
+        arguments are passed on to the constructor.
         """
-        out = ''
-        for i in range(self._buckets.length()):
-            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
-        return out
+        if max_load > 0.5:
+            raise ValueError(f'max_load must be at most 0.5, got {max_load}')
+        capacity = plan_capacity(expected_size, max_load,
+                                 kwargs.get('power_of_two', False))
+        return cls(capacity, function, **kwargs)
 
-    def _next_prime(self, capacity: int) -> int:
+    def __getstate__(self) -> dict:
         """
-        Increment from given number to find the closest prime number
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Pickles a registered hash function by name, so maps using one of
+        them can be sent to other processes
         """
-        if capacity % 2 == 0:
-            capacity += 1
+        state = self.__dict__.copy()
+        name = hash_function_name(self._hash_function)
+        if name is not None:
+            state['_hash_function'] = name
+        return state
 
-        while not self._is_prime(capacity):
-            capacity += 2
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._hash_function = get_hash_function(self._hash_function)
 
-        return capacity
+    def _options(self) -> dict:
+        """
+        Returns the constructor options that a snapshot records
+        """
+        return {'incremental_resize': self._incremental_resize,
+                'migration_step': self._migration_step,
+                'max_tombstone_ratio': self._max_tombstone_ratio,
+                'power_of_two': self._power_of_two}
 
-    @staticmethod
-    def _is_prime(capacity: int) -> bool:
+    def dump(self, path, compress: bool = False) -> None:
         """
-        Determine if given integer is a prime number and return boolean
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Writes a snapshot of the table to the file at path, optionally
+        zlib-compressed (see snapshot.py): the state of every slot, then
+        the cached hash, key and value of each used slot in slot order, so
+        load puts every entry back in its slot without probing.
         """
-        if capacity == 2 or capacity == 3:
-            return True
+        self._finish_migration()
+        header = make_header(self._snapshot_kind, self._capacity,
+                             self._size, self._hash_function,
+                             self._options())
+
+        with SnapshotWriter(path, header, compress) as writer:
+            writer.write_frame(bytes(self._occupancy))
+
+            buckets = self._buckets
+            hashes, keys, values = [], [], []
+            for num in self._used_slots():
+                entry = buckets.get_at_index(num)
+                hashes.append(entry.hash)
+                # Tombstones only need their hash
+                if entry.is_tombstone:
+                    keys.append(None)
+                    values.append(None)
+                else:
+                    keys.append(entry.key)
+                    values.append(entry.value)
+                if len(keys) == CHUNK_SIZE:
+                    writer.write_entries(hashes, keys, values)
+                    hashes, keys, values = [], [], []
+            writer.write_entries(hashes, keys, values)
+
+    @classmethod
+    def load(cls, path) -> 'HashMap':
+        """
+        Returns the HashMap stored in a snapshot written by dump, with the
+        same capacity and options. When the map uses a hash function that
+        differs between processes (the builtin), keys are hashed and
+        placed again instead.
+        """
+        with SnapshotReader(path) as reader:
+            header = reader.header
+            if header['kind'] != cls._snapshot_kind:
+                raise ValueError(f'{path} is not {cls._snapshot_name} '
+                                 f'snapshot')
+            hash_map = cls(header['capacity'], header['function'],
+                           **header['options'])
+            hash_map._restore(reader, header['reuse_hashes'])
+        return hash_map
+
+    def _restore(self, reader: SnapshotReader, reuse_hashes: bool) -> None:
+        """
+        Puts every entry of a snapshot back into the slot it was dumped
+        from, or places the live entries again when hashes are not reused
+        """
+        states = bytearray(reader.read_frame())
+        buckets, capacity = self._buckets, self._capacity
+
+        if not reuse_hashes:
+            # The slot states tell live entries from tombstones, as a live
+            # key may itself be None
+            used_slots = self._used_slots(states)
+            for _, keys, values in reader.entries():
+                live = [num for num in range(len(keys))
+                        if states[next(used_slots)] == LIVE]
+                hashes = hash_batch(self._hash_function,
+                                    [keys[num] for num in live])
+                for num, hash_code in zip(live, hashes):
+                    self._occupancy[self._place(
+                        buckets, capacity, HashEntry(
+                            keys[num], values[num], hash_code))] = LIVE
+                    self._size += 1
+            self._version += 1
+            return
 
-        if capacity == 1 or capacity % 2 == 0:
-            return False
+        slots = [None] * capacity
+        used_slots = self._used_slots(states)
+        for hashes, keys, values in reader.entries():
+            for num in range(len(keys)):
+                index = next(used_slots)
+                entry = HashEntry(keys[num], values[num], hashes[num])
+                if states[index] == TOMBSTONE:
+                    entry.is_tombstone = True
+                slots[index] = entry
+
+        self._buckets = DynamicArray(slots)
+        self._occupancy = states
+        self._size = states.count(LIVE)
+        self._tombstones = states.count(TOMBSTONE)
+        self._version += 1
 
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        self._finish_migration()
+        out = ''
+        for i in range(self._buckets.length()):
+            out += str(i) + ': ' + str(self._buckets[i]) + '\n'
+        return out
 
-        return True
+    def _next_capacity(self, capacity: int) -> int:
+        """
+        Returns the smallest valid table capacity of at least the given size
+        """
+        if self._power_of_two:
+            return next_power_of_two(capacity)
+        return next_prime(capacity)
 
     def get_size(self) -> int:
         """
@@ -91,34 +248,108 @@ class HashMap:
         If the key already exists, its value will be replaced by the new value.
         If the key doesn't already exist, a new key/value pair will be added.
         """
-        # Check if resizing is necessary
-        if self.table_load() >= 0.5:
-            self.resize_table(self._capacity * 2)
+        self._put(key, value, self._hash_function(key))
 
+    def _put(self, key: str, value: object, hash_code: int,
+             replace: bool = True) -> HashEntry:
+        """
+        Updates the key/value pair using an already computed hash of the key
+        and returns its entry. An existing key keeps its value unless replace
+        is set.
+        """
+        # Continue an incremental resize that is in progress
+        if self._old_buckets is not None:
+            self._migrate(self._migration_step)
+
+        # Check if resizing is necessary. A key already in the table only
+        # has its value changed, which never resizes, so that updating
+        # values does not disturb an iteration.
+        if (self.table_load() >= 0.5 and self._find_index(
+                self._buckets, self._capacity, key, hash_code) == -1):
+            if self._incremental_resize:
+                self._start_migration(self._capacity * 2)
+            else:
+                self.resize_table(self._capacity * 2)
+
+        # A key that has not been migrated yet is updated in the old table
+        if self._old_buckets is not None:
+            old_index = self._find_index(self._old_buckets, self._old_capacity,
+                                         key, hash_code)
+            if old_index >= self._migrate_index:
+                entry = self._old_buckets.get_at_index(old_index)
+                if replace:
+                    entry.value = value
+                return entry
+
+        return self._store(key, value, hash_code, replace)
+
+    def _store(self, key: str, value: object, hash_code: int,
+               replace: bool = True) -> HashEntry:
+        """
+        Updates or inserts the key/value pair in the current table, which
+        must already have room for it, and returns its entry
+        """
         # Calculate the initial index and setup counter
-        index = self._hash_function(key) % self._capacity
+        index = self._home_index(hash_code, self._capacity)
         probe_counter = 0
+        free_index = -1
 
-        # Use quadratic probing to find an open slot
+        # Use quadratic probing until an empty slot shows the key is absent
         while probe_counter < self._capacity:
             # Calculate probing index
-            probe_index = (index + probe_counter ** 2) % self._capacity
+            probe_index = self._probe_index(index, probe_counter, self._capacity)
             bucket = self._buckets.get_at_index(probe_index)
 
-            # If the slot is empty, add the key/value pair
+            # An empty slot ends the search
             if bucket is None:
-                self._buckets.set_at_index(probe_index, HashEntry(key, value))
-                self._size += 1
-                return
-
-            # If the key already exists, update the value
-            if bucket.key == key:
-                bucket.value = value
-                return
+                if free_index == -1:
+                    free_index = probe_index
+                break
+
+            if bucket.is_tombstone:
+                # Remember the first tombstone so its slot can be reused
+                if free_index == -1:
+                    free_index = probe_index
+            elif bucket.hash == hash_code and bucket.key == key:
+                # If the key already exists, update the value
+                if replace:
+                    bucket.value = value
+                return bucket
 
             # Move to the next probe index
             probe_counter += 1
 
+        # Add the key/value pair into the first reusable slot
+        if free_index == -1:
+            return None
+        if self._buckets.get_at_index(free_index) is not None:
+            self._tombstones -= 1
+        entry = HashEntry(key, value, hash_code)
+        self._buckets.set_at_index(free_index, entry)
+        self._occupancy[free_index] = LIVE
+        self._size += 1
+        self._version += 1
+        return entry
+
+    def increment(self, key: str, amount: int = 1) -> int:
+        """
+        Adds amount to the value of the key, treating a missing key as 0,
+        with a single lookup. Returns the new value.
+        """
+        entry = self._put(key, 0, self._hash_function(key), False)
+        entry.value += amount
+        return entry.value
+
+    def upsert(self, key: str, update, default: object = None) -> object:
+        """
+        Replaces the value of the key with update(value), or adds the key
+        with update(default) when it is absent, with a single lookup.
+        Returns the new value.
+        """
+        entry = self._put(key, default, self._hash_function(key), False)
+        entry.value = update(entry.value)
+        return entry.value
+
     def resize_table(self, new_capacity: int) -> None:
         """
         Changes the capacity of the underlying table.
@@ -128,22 +359,116 @@ class HashMap:
         if new_capacity < self._size:
             return
 
-        # Make sure that the new capacity is a prime number
-        prime_capacity = self._next_prime(new_capacity)
+        # Make sure that the new capacity is a prime number, doubling it
+        # until the table can hold every entry below a load of 0.5
+        capacity = self._next_capacity(new_capacity)
+        while self._size > 0 and (self._size - 1) / capacity >= 0.5:
+            capacity = self._next_capacity(capacity * 2)
+
+        self._finish_migration()
+        self._rehash(capacity)
 
-        # Save current buckets and reinitialize the table
+    def _rehash(self, capacity: int) -> None:
+        """
+        Moves every active entry into a new table of exactly the given
+        capacity. Keys are already unique and the new table has no
+        tombstones, so each entry goes into the first empty slot it probes.
+        """
+        # Save current buckets and preallocate the new table
         old_buckets = self._buckets
-        self._buckets = DynamicArray()
-        self._capacity = prime_capacity
-        self._size = 0
-        for _ in range(prime_capacity):
-            self._buckets.append(None)
+        buckets = DynamicArray([None] * capacity)
+        occupancy = bytearray(capacity)
+
+        # Place active entries using their cached hashes
+        for num in self._live_slots():
+            occupancy[self._place(buckets, capacity,
+                                  old_buckets.get_at_index(num))] = LIVE
+
+        self._buckets = buckets
+        self._occupancy = occupancy
+        self._capacity = capacity
+        self._tombstones = 0
+        self._version += 1
+
+    def _place(self, buckets: DynamicArray, capacity: int,
+               entry: HashEntry) -> int:
+        """
+        Puts an entry whose key is known to be absent into the first empty
+        slot of its probe sequence and returns that slot
+        """
+        index = self._home_index(entry.hash, capacity)
+        probe_index = index
+        probe_counter = 0
+        while buckets.get_at_index(probe_index) is not None:
+            probe_counter += 1
+            probe_index = self._probe_index(index, probe_counter, capacity)
+
+        buckets.set_at_index(probe_index, entry)
+        return probe_index
+
+    def _home_index(self, hash_code: int, capacity: int) -> int:
+        """
+        Returns the first slot probed for a hash in a table of the capacity
+        """
+        if self._power_of_two:
+            return power_of_two_index(hash_code, capacity)
+        return hash_code % capacity
+
+    def _probe_index(self, index: int, probe_counter: int,
+                     capacity: int) -> int:
+        """
+        Returns the slot inspected by the given probe from the home index.
+        Prime tables probe quadratically; power-of-two tables step by
+        triangular numbers, which visits every slot of the table.
+        """
+        if self._power_of_two:
+            return (index + (probe_counter * (probe_counter + 1) >> 1)) \
+                & (capacity - 1)
+        return (index + probe_counter ** 2) % capacity
+
+    def _start_migration(self, new_capacity: int) -> None:
+        """
+        Allocates a larger table and starts moving entries into it a few
+        slots at a time. Until migration completes, lookups check both tables.
+        """
+        self._finish_migration()
+
+        self._old_buckets = self._buckets
+        self._old_capacity = self._capacity
+        self._migrate_index = 0
 
-        # Rehash active entries
-        for num in range(old_buckets.length()):
+        self._capacity = self._next_capacity(new_capacity)
+        self._buckets = DynamicArray([None] * self._capacity)
+        self._occupancy = bytearray(self._capacity)
+        self._tombstones = 0
+        self._version += 1
+
+    def _migrate(self, slot_count: int) -> None:
+        """
+        Moves the active entries of the next slot_count old slots into the
+        new table, dropping the old table once every slot has been moved
+        """
+        old_buckets = self._old_buckets
+        stop = min(self._migrate_index + slot_count, self._old_capacity)
+
+        for num in range(self._migrate_index, stop):
             bucket = old_buckets.get_at_index(num)
-            if bucket and not bucket.is_tombstone:
-                self.put(bucket.key, bucket.value)
+            if bucket is not None and not bucket.is_tombstone:
+                self._occupancy[self._place(self._buckets, self._capacity,
+                                            bucket)] = LIVE
+
+        # Slots below the migrate index are no longer searched in the old table
+        self._migrate_index = stop
+        if stop == self._old_capacity:
+            self._old_buckets = None
+            self._old_capacity = 0
+
+    def _finish_migration(self) -> None:
+        """
+        Completes an incremental resize that is in progress, if any
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._old_capacity)
 
     def table_load(self) -> float:
         """
@@ -155,113 +480,312 @@ class HashMap:
         """
         Returns the number of empty buckets in the hash table
         """
-        # Initialize empty bucket counter
-        empty_bucket_counter = 0
-
-        # Check if the value of each bucket is None
-        for num in range(self._buckets.length()):
-            if self._buckets.get_at_index(num) is None:
-                empty_bucket_counter += 1
+        self._finish_migration()
 
-        return empty_bucket_counter
+        # Every slot is either empty, live or a tombstone
+        return self._capacity - self._size - self._tombstones
 
-    def get(self, key: str) -> object:
+    def _find_index(self, buckets: DynamicArray, capacity: int,
+                    key: str, hash_code: int) -> int:
         """
-        Returns the value associated with the given key.
-        If the key is not in the hash map, returns None
+        Returns the index of the active entry with the given key in the given
+        table, or -1 if the key is not in that table
         """
         # Calculate the initial index and setup counter
-        index = self._hash_function(key) % self._capacity
+        index = self._home_index(hash_code, capacity)
         probe_counter = 0
 
         # Search for the key
-        while probe_counter < self._capacity:
-            probe_index = (index + probe_counter ** 2) % self._capacity
+        while probe_counter < capacity:
+            probe_index = self._probe_index(index, probe_counter, capacity)
 
-            # If the bucket is empty, key is not in map
-            bucket = self._buckets.get_at_index(probe_index)
+            # If the bucket is empty, key is not in the table
+            bucket = buckets.get_at_index(probe_index)
             if bucket is None:
-                return None
+                return -1
 
-            # If the key is in the map, return its value
-            if bucket.key == key and not bucket.is_tombstone:
-                return bucket.value
+            # If the key is in the table, return its index
+            if (bucket.hash == hash_code and bucket.key == key
+                    and not bucket.is_tombstone):
+                return probe_index
 
             # Continue probing
             probe_counter += 1
 
-        # If all other conditions don't pass, return None
-        return None
+        # If all other conditions don't pass, key is not in the table
+        return -1
 
-    def contains_key(self, key: str) -> bool:
+    def _find_entry(self, key: str, hash_code: int) -> HashEntry:
         """
-        Returns true if the key is in the hash map, otherwise galse
+        Returns the active entry with the given key, or None if the key is
+        not in the hash map
         """
-        # Calculate the initial index and setup counter
-        index = self._hash_function(key) % self._capacity
-        probe_counter = 0
+        # Continue an incremental resize that is in progress
+        if self._old_buckets is not None:
+            self._migrate(self._migration_step)
 
-        # Search for the key
-        while probe_counter < self._capacity:
-            probe_index = (index + probe_counter ** 2) % self._capacity
+        index = self._find_index(self._buckets, self._capacity, key, hash_code)
+        if index != -1:
+            return self._buckets.get_at_index(index)
 
-            # If the bucket is empty, key is not in map
-            bucket = self._buckets.get_at_index(probe_index)
-            if bucket is None:
-                return False
+        # Entries that have not been migrated yet are still in the old table
+        if self._old_buckets is not None:
+            index = self._find_index(self._old_buckets, self._old_capacity,
+                                     key, hash_code)
+            if index >= self._migrate_index:
+                return self._old_buckets.get_at_index(index)
 
-            # If the key is in the map, return True
-            if bucket.key == key and not bucket.is_tombstone:
-                return True
+        return None
 
-            # Continue probing
-            probe_counter += 1
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, returns None
+        """
+        entry = self._find_entry(key, self._hash_function(key))
+        if entry is None:
+            return None
+        return entry.value
 
-        # If all other conditions don't pass, return False
-        return False
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns true if the key is in the hash map, otherwise false
+        """
+        return self._find_entry(key, self._hash_function(key)) is not None
 
     def remove(self, key: str) -> None:
         """
         Removes the given key and its associated value from the hash map.
         If the key is not in the has map, the method does nothing
         """
-        # Calculate the initial index and setup counter
-        index = self._hash_function(key) % self._capacity
-        probe_counter = 0
+        # Continue an incremental resize that is in progress
+        if self._old_buckets is not None:
+            self._migrate(self._migration_step)
 
-        # Search for the key
-        while probe_counter < self._capacity:
-            probe_index = (index + probe_counter ** 2) % self._capacity
+        self._remove(key, self._hash_function(key))
 
-            # If the bucket is empty, key is not in map
-            bucket = self._buckets.get_at_index(probe_index)
-            if bucket is None:
-                return
+    def _remove(self, key: str, hash_code: int) -> None:
+        """
+        Removes the key using an already computed hash of the key
+        """
+        index = self._find_index(self._buckets, self._capacity, key, hash_code)
+
+        # If the key is in the map, leave a tombstone in its slot
+        if index != -1:
+            self._buckets.get_at_index(index).is_tombstone = True
+            self._occupancy[index] = TOMBSTONE
+            self._size -= 1
+            self._tombstones += 1
+            self._version += 1
+
+            # Clear out tombstones once they take up too much of the table
+            if (self._old_buckets is None and self._tombstones
+                    > self._max_tombstone_ratio * self._capacity):
+                self._rehash(self._capacity)
+            return
 
-            # If the key is in the map, remove it
-            if bucket.key == key and not bucket.is_tombstone:
-                bucket.is_tombstone = True
+        # Entries that have not been migrated yet are dropped by the migration
+        if self._old_buckets is not None:
+            index = self._find_index(self._old_buckets, self._old_capacity,
+                                     key, hash_code)
+            if index >= self._migrate_index:
+                self._old_buckets.get_at_index(index).is_tombstone = True
                 self._size -= 1
-                return
+                self._version += 1
 
-            # Continue probing
+    # ------------------------------------------------------------------ #
+
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair of the iterable, as put would one at a
+        time, hashing the whole batch in one pass. The table grows as new
+        keys arrive, so a batch that only updates keys never resizes it.
+        """
+        pairs = list(pairs)
+        keys = [pair[0] for pair in pairs]
+        hashes = hash_batch(self._hash_function, keys)
+        self._finish_migration()
+
+        put = self._put
+        for num in range(len(keys)):
+            put(keys[num], pairs[num][1], hashes[num])
+
+    def increment_many(self, keys, amount: int = 1) -> DynamicArray:
+        """
+        Increments every key of the iterable as increment would one at a
+        time and returns a dynamic array with each key's new value.
+        Batches often repeat keys, so the table grows as new keys arrive
+        rather than being sized for the whole batch up front.
+        """
+        keys = list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+
+        put = self._put
+        values = []
+        for num in range(len(keys)):
+            entry = put(keys[num], 0, hashes[num], False)
+            entry.value += amount
+            values.append(entry.value)
+        return DynamicArray(values)
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of every key of the iterable,
+        or default for keys that are not in the hash map
+        """
+        keys = list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+        self._finish_migration()
+
+        buckets, capacity = self._buckets, self._capacity
+        find_index = self._find_index
+        values = []
+        for num in range(len(keys)):
+            index = find_index(buckets, capacity, keys[num], hashes[num])
+            values.append(buckets.get_at_index(index).value
+                          if index != -1 else default)
+        return DynamicArray(values)
+
+    def contains_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array telling for every key of the iterable
+        whether it is in the hash map
+        """
+        keys = list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+        self._finish_migration()
+
+        buckets, capacity = self._buckets, self._capacity
+        find_index = self._find_index
+        return DynamicArray([
+            find_index(buckets, capacity, keys[num], hashes[num]) != -1
+            for num in range(len(keys))])
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of the iterable that is in the hash map
+        """
+        keys = list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+        self._finish_migration()
+
+        remove = self._remove
+        for num in range(len(keys)):
+            remove(keys[num], hashes[num])
+
+    def probe_length_counts(self) -> DynamicArray:
+        """
+        Returns a da where index i holds the number of active entries that
+        a successful lookup reaches on its (i + 1)th probe
+        """
+        self._finish_migration()
+        counts = DynamicArray()
+
+        for num in range(self._capacity):
+            bucket = self._buckets.get_at_index(num)
+            if bucket is None or bucket.is_tombstone:
+                continue
+
+            # Grow the histogram as longer probe sequences show up
+            probes = self._probe_count(num, bucket)
+            while counts.length() < probes:
+                counts.append(0)
+            counts[probes - 1] += 1
+
+        return counts
+
+    def _probe_count(self, index: int, entry: HashEntry) -> int:
+        """
+        Returns how many slots a lookup inspects to find the entry at index
+        """
+        home = self._home_index(entry.hash, self._capacity)
+        probe_counter = 0
+        while self._probe_index(home, probe_counter, self._capacity) != index:
             probe_counter += 1
+        return probe_counter + 1
+
+    def get_tombstones(self) -> int:
+        """
+        Returns the number of tombstones in the hash table
+        """
+        return self._tombstones
+
+    def keys(self):
+        """
+        Yields every key in the hash map, one at a time, without building
+        an array. Raises RuntimeError if keys are added or removed while
+        iterating; replacing values is allowed.
+        """
+        for entry in self._entries():
+            yield entry.key
+
+    def values(self):
+        """
+        Yields every value in the hash map, one at a time, like keys
+        """
+        for entry in self._entries():
+            yield entry.value
+
+    def items(self):
+        """
+        Yields every (key, value) pair in the hash map, one at a time,
+        like keys
+        """
+        for entry in self._entries():
+            yield entry.key, entry.value
+
+    def _entries(self):
+        """
+        Yields every active entry of the table, skipping tombstones and
+        checking after each one that the map has not been changed in the
+        meantime
+        """
+        self._finish_migration()
+        version = self._version
+        buckets = self._buckets
+
+        for num in self._live_slots():
+            yield buckets.get_at_index(num)
+            if self._version != version:
+                raise RuntimeError('HashMap changed during iteration')
+
+    def _live_slots(self, start: int = 0):
+        """
+        Yields the index of every live slot of the current table from start
+        on, skipping runs of empty slots and tombstones at C speed
+        """
+        find = self._occupancy.find
+        index = find(LIVE, start)
+        while index != -1:
+            yield index
+            index = find(LIVE, index + 1)
+
+    def _used_slots(self, states: bytearray = None):
+        """
+        Yields the index of every live slot or tombstone, in slot order, of
+        the current table or of the given slot states
+        """
+        used = (self._occupancy if states is None else states).translate(_USED)
+        find = used.find
+        index = find(1)
+        while index != -1:
+            yield index
+            index = find(1, index + 1)
 
     def get_keys_and_values(self) -> DynamicArray:
         """
         Returns a da where each index contains a tuple of a key/value pair
         stored in the hash map
         """
+        self._finish_migration()
+
         # Initialize the resulting array
         key_value_arr = DynamicArray()
 
-        # Iterate through all the buckets
-        for num in range(self._capacity):
+        # Append the pair of every live slot
+        for num in self._live_slots():
             bucket = self._buckets.get_at_index(num)
-
-            # Check if the bucket is not none, append the pair to the array
-            if bucket is not None and not bucket.is_tombstone:
-                key_value_arr.append((bucket.key, bucket.value))
+            key_value_arr.append((bucket.key, bucket.value))
 
         return key_value_arr
 
@@ -269,23 +793,36 @@ class HashMap:
         """
         Clears the contents of the hash map
         """
-        # Reset all buckets to none
-        for num in range(self._capacity):
-            self._buckets.set_at_index(num, None)
-
-        # Reset the size to 0
+        # Drop any table that was still being migrated
+        self._old_buckets = None
+        self._old_capacity = 0
+
+        # Reset every slot that is not already empty to none
+        find = self._occupancy.find
+        for state in (LIVE, TOMBSTONE):
+            num = find(state)
+            while num != -1:
+                self._buckets.set_at_index(num, None)
+                num = find(state, num + 1)
+        self._occupancy = bytearray(self._capacity)
+
+        # Reset the size and tombstone count to 0
         self._size = 0
+        self._tombstones = 0
+        self._version += 1
 
     def __iter__(self):
         """
         Enables the hash map to iterate across itself
         """
+        self._finish_migration()
         return HashMapIterator(self)
 
     def get_bucket(self, index: int) -> int:
         """
         Returns the bucket at the given index
         """
+        self._finish_migration()
         return self._buckets.get_at_index(index)
 
 
@@ -296,27 +833,27 @@ class HashMapIterator:
     def __init__(self, hash_map: HashMap) -> None:
         self._hash_map = hash_map
         self._current_index = 0
+        self._version = hash_map._version
 
     def __iter__(self):
         return self
 
     def __next__(self):
         """
-        Returns the next active item in the hash map
+        Returns the next active entry in the hash map
         """
-        # Iterate through the hash map
-        while self._current_index < self._hash_map.get_capacity():
-            # Find the bucket at current index
-            bucket = self._hash_map.get_bucket(self._current_index)
-            self._current_index += 1
+        if self._hash_map._version != self._version:
+            raise RuntimeError('HashMap changed during iteration')
 
-            # Make sure the bucket isn't empty, then set key and value
-            if bucket is not None:
-                self.key, self.value = bucket.key, bucket.value
-                return self
+        # Jump to the next live slot, skipping empty slots and removed entries
+        index = self._hash_map._occupancy.find(LIVE, self._current_index)
 
         # Stop iteration if all buckets have been processed
-        raise StopIteration
+        if index == -1:
+            raise StopIteration
+
+        self._current_index = index + 1
+        return self._hash_map.get_bucket(index)
 
 
 # ------------------- BASIC TESTING ---------------------------------------- #
@@ -527,3 +1064,19 @@ if __name__ == "__main__":
     print(m)
     for item in m:
         print('K:', item.key, 'V:', item.value)
+
+    print("\ndump / load with a None key")
+    print("---------------------------")
+    import os
+    import tempfile
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'map.snap')
+        m = HashMap(10, 'builtin')
+        m.put(None, 'v')
+        m.put('a', 1)
+        m.put('b', 2)
+        m.remove('b')
+        m.dump(path)
+        loaded = HashMap.load(path)
+        print(loaded.get_size(), loaded.get(None), loaded.contains_key(None),
+              loaded.get('a'), loaded.contains_key('b'))
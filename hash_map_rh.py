@@ -0,0 +1,226 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Open addressing HashMap that uses Robin Hood linear probing
+#              with backward-shift deletion, so it can run at a much higher
+#              load factor than quadratic probing
+
+from a6_include import DynamicArray, HashEntry, hash_function_1, hash_function_2
+from capacity_planning import plan_capacity
+import hash_map_oa
+from hash_map_oa import EMPTY, LIVE
+
+
+class HashMap(hash_map_oa.HashMap):
+    _snapshot_kind = 'rh'
+    _snapshot_name = 'a Robin Hood'
+
+    def __init__(self, capacity: int, function,
+                 max_load: float = 0.9, power_of_two: bool = False) -> None:
+        """
+        Initialize new HashMap that uses Robin Hood linear probing for
+        collision resolution and grows once the load factor passes max_load
+        """
+        if not 0 < max_load < 1:
+            raise ValueError(f'max_load must be between 0 and 1, got {max_load}')
+        super().__init__(capacity, function, power_of_two=power_of_two)
+        self._max_load = max_load
+
+    @classmethod
+    def with_expected_size(cls, expected_size: int, function,
+                           max_load: float = 0.9, **kwargs) -> 'HashMap':
+        """
+        Returns an empty HashMap that grows past max_load and is sized so
+        that expected_size entries can be put without a resize
+        """
+        if not 0 < max_load < 1:
+            raise ValueError(f'max_load must be between 0 and 1, got {max_load}')
+        capacity = plan_capacity(expected_size, max_load,
+                                 kwargs.get('power_of_two', False))
+        return cls(capacity, function, max_load, **kwargs)
+
+    def _options(self) -> dict:
+        """
+        Returns the constructor options that a snapshot records
+        """
+        return {'max_load': self._max_load,
+                'power_of_two': self._power_of_two}
+
+    # ------------------------------------------------------------------ #
+
+    def _put(self, key: str, value: object, hash_code: int,
+             replace: bool = True) -> HashEntry:
+        """
+        Updates the key/value pair using an already computed hash of the key
+        and returns its entry. An existing key keeps its value unless replace
+        is set.
+        """
+        # Check if resizing is necessary, unless the key is already in the
+        # table and only its value changes
+        if ((self._size + 1) / self._capacity > self._max_load
+                and self._find_index(self._buckets, self._capacity,
+                                     key, hash_code) == -1):
+            self.resize_table(self._capacity * 2)
+
+        return self._store(key, value, hash_code, replace)
+
+    def _store(self, key: str, value: object, hash_code: int,
+               replace: bool = True) -> HashEntry:
+        """
+        Updates or inserts the key/value pair in a table that already has
+        room for it, and returns its entry
+        """
+        # If the key already exists, update the value
+        index = self._find_index(self._buckets, self._capacity, key, hash_code)
+        if index != -1:
+            entry = self._buckets.get_at_index(index)
+            if replace:
+                entry.value = value
+            return entry
+
+        # Otherwise insert a new entry
+        entry = HashEntry(key, value, hash_code)
+        self._occupancy[self._place(self._buckets, self._capacity,
+                                    entry)] = LIVE
+        self._size += 1
+        self._version += 1
+        return entry
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table.
+        All active key/value pairs must be put into the new table.
+        """
+        # Check if new capacity is not less than size
+        if new_capacity < self._size:
+            return
+
+        # Make sure that the new capacity is a prime number, doubling it
+        # until every entry fits without passing the max load factor
+        capacity = self._next_capacity(new_capacity)
+        while self._size / capacity > self._max_load:
+            capacity = self._next_capacity(capacity * 2)
+
+        self._rehash(capacity)
+
+    def _place(self, buckets: DynamicArray, capacity: int,
+               entry: HashEntry) -> int:
+        """
+        Inserts an entry whose key is known to be absent. Whenever the entry
+        has probed further from home than the resident of a slot, it takes
+        that slot and the displaced resident continues probing instead.
+        Returns the empty slot that ends up filled.
+        """
+        index = self._home_index(entry.hash, capacity)
+        distance = 0
+
+        while True:
+            bucket = buckets.get_at_index(index)
+            if bucket is None:
+                buckets.set_at_index(index, entry)
+                return index
+
+            # Swap with residents that are closer to their home slot
+            bucket_distance = (index - self._home_index(bucket.hash, capacity)) \
+                % capacity
+            if bucket_distance < distance:
+                buckets.set_at_index(index, entry)
+                entry, distance = bucket, bucket_distance
+
+            index = (index + 1) % capacity
+            distance += 1
+
+    def _find_index(self, buckets: DynamicArray, capacity: int,
+                    key: str, hash_code: int) -> int:
+        """
+        Returns the index of the entry with the given key in the given
+        table, or -1 if the key is not in that table
+        """
+        index = self._home_index(hash_code, capacity)
+        distance = 0
+
+        while distance < capacity:
+            # If the bucket is empty, key is not in the table
+            bucket = buckets.get_at_index(index)
+            if bucket is None:
+                return -1
+
+            # The key would have displaced any entry closer to its home slot
+            if (index - self._home_index(bucket.hash, capacity)) \
+                    % capacity < distance:
+                return -1
+
+            if bucket.hash == hash_code and bucket.key == key:
+                return index
+
+            index = (index + 1) % capacity
+            distance += 1
+
+        return -1
+
+    def _remove(self, key: str, hash_code: int) -> None:
+        """
+        Removes the key using an already computed hash of the key
+        """
+        buckets, capacity = self._buckets, self._capacity
+        index = self._find_index(buckets, capacity, key, hash_code)
+        if index == -1:
+            return
+
+        # Shift following entries back one slot until one is already home
+        next_index = (index + 1) % capacity
+        while True:
+            bucket = buckets.get_at_index(next_index)
+            if (bucket is None
+                    or self._home_index(bucket.hash, capacity) == next_index):
+                break
+            buckets.set_at_index(index, bucket)
+            index = next_index
+            next_index = (next_index + 1) % capacity
+
+        buckets.set_at_index(index, None)
+        self._occupancy[index] = EMPTY
+        self._size -= 1
+        self._version += 1
+
+    def _probe_count(self, index: int, entry: HashEntry) -> int:
+        """
+        Returns how many slots a lookup inspects to find the entry at index
+        """
+        home = self._home_index(entry.hash, self._capacity)
+        return (index - home) % self._capacity + 1
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nput / get at high load")
+    print("----------------------")
+    m = HashMap(53, hash_function_2)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+    result = True
+    for i in range(150):
+        result &= m.get('str' + str(i)) == i * 100
+        result &= not m.contains_key('str' + str(i + 150))
+    print(result)
+
+    print("\nremove example")
+    print("--------------")
+    m = HashMap(11, hash_function_1)
+    for i in range(1, 9):
+        m.put('key' + str(i), i)
+    m.remove('key3')
+    m.remove('key4')
+    m.remove('key9')
+    print(m.get_size(), m.get('key3'), m.get('key5'), m.contains_key('key8'))
+    print(m)
+
+    print("\nprobe length counts")
+    print("-------------------")
+    m = HashMap(101, hash_function_2)
+    for i in range(90):
+        m.put(str(i), i)
+    print(m.probe_length_counts())
@@ -6,71 +6,194 @@
 # Description: Implementation of a HashMap using separate chaining
 
 
-from a6_include import (DynamicArray, LinkedList,
+from a6_include import (DynamicArray, LinkedList, SLNode,
                         hash_function_1, hash_function_2)
+from capacity_planning import next_power_of_two, next_prime, plan_capacity
+from hash_functions import (get_hash_function, hash_batch, hash_function_name,
+                            power_of_two_index)
+from snapshot import CHUNK_SIZE, SnapshotReader, SnapshotWriter, make_header
 
 
 class HashMap:
+    # Chain nodes created by put, which subclasses may extend
+    _node_type = SLNode
+
     def __init__(self,
                  capacity: int = 11,
-                 function: callable = hash_function_1) -> None:
+                 function: callable = hash_function_1,
+                 incremental_resize: bool = False,
+                 migration_step: int = 8,
+                 power_of_two: bool = False) -> None:
         """
         Initialize new HashMap that uses
         separate chaining for collision resolution
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+
+        The hash function may also be given by its name in hash_functions.
+
+        With incremental_resize, growing the table allocates the new table
+        and then moves migration_step old buckets per put/get/remove instead
+        of rehashing everything inside a single put.
+
+        With power_of_two, capacities are powers of two and buckets are
+        picked by multiply-shift hashing instead of a prime modulo.
         """
         self._buckets = DynamicArray()
 
-        # capacity must be a prime number
-        self._capacity = self._next_prime(capacity)
+        # capacity must be a prime number (or a power of two)
+        self._power_of_two = power_of_two
+        self._capacity = self._next_capacity(capacity)
         for _ in range(self._capacity):
             self._buckets.append(LinkedList())
 
-        self._hash_function = function
+        # One byte per bucket of the current table, set while the bucket
+        # holds nodes, so scans can jump between non-empty buckets with
+        # bytearray.find instead of visiting every bucket in Python, and
+        # the number of buckets that are set
+        self._occupancy = bytearray(self._capacity)
+        self._occupied = 0
+
+        self._hash_function = get_hash_function(function)
         self._size = 0
 
+        # Changes whenever keys are added or removed or nodes are moved, so
+        # that iterators can tell the map was changed under them
+        self._version = 0
+
+        # Old table still being drained by an incremental resize
+        self._incremental_resize = incremental_resize
+        self._migration_step = max(1, migration_step)
+        self._old_buckets = None
+        self._old_capacity = 0
+        self._migrate_index = 0
+        self._fill_index = 0
+
+    @classmethod
+    def with_expected_size(cls,
+                           expected_size: int,
+                           function: callable = hash_function_1,
+                           max_load: float = 1.0,
+                           **kwargs) -> 'HashMap':
+        """
+        Returns an empty HashMap sized so that expected_size entries can be
+        put without a resize, keeping the load factor at or below max_load
+        (at most 1, where the map itself resizes). Other keyword
+        arguments are passed on to the constructor.
+        """
+        if max_load > 1.0:
+            raise ValueError(f'max_load must be at most 1, got {max_load}')
+        capacity = plan_capacity(expected_size, max_load,
+                                 kwargs.get('power_of_two', False))
+        return cls(capacity, function, **kwargs)
+
+    def __getstate__(self) -> dict:
+        """
+        Pickles a registered hash function by name, so maps using one of
+        them can be sent to other processes
+        """
+        state = self.__dict__.copy()
+        name = hash_function_name(self._hash_function)
+        if name is not None:
+            state['_hash_function'] = name
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._hash_function = get_hash_function(self._hash_function)
+
+    def _options(self) -> dict:
+        """
+        Returns the constructor options that a snapshot records
+        """
+        return {'incremental_resize': self._incremental_resize,
+                'migration_step': self._migration_step,
+                'power_of_two': self._power_of_two}
+
+    def dump(self, path, compress: bool = False) -> None:
+        """
+        Writes a snapshot of the table to the file at path, optionally
+        zlib-compressed (see snapshot.py). Nodes are written bucket by
+        bucket with their cached hashes, so load never hashes a key again.
+        """
+        self._finish_migration()
+        header = make_header('sc', self._capacity, self.get_size(),
+                             self._hash_function, self._options())
+
+        with SnapshotWriter(path, header, compress) as writer:
+            hashes, keys, values = [], [], []
+            for num in self._occupied_buckets():
+                # Write each chain from its tail, so that inserting every
+                # node at the head on load rebuilds the chain in order
+                nodes = list(self._buckets[num])
+                for node in reversed(nodes):
+                    hashes.append(node.hash)
+                    keys.append(node.key)
+                    values.append(node.value)
+                if len(keys) >= CHUNK_SIZE:
+                    writer.write_entries(hashes, keys, values)
+                    hashes, keys, values = [], [], []
+            writer.write_entries(hashes, keys, values)
+
+    @classmethod
+    def load(cls, path) -> 'HashMap':
+        """
+        Returns the HashMap stored in a snapshot written by dump, with the
+        same capacity and options. Keys are only hashed again when the map
+        uses a hash function that differs between processes (the builtin).
+        """
+        with SnapshotReader(path) as reader:
+            header = reader.header
+            if header['kind'] != 'sc':
+                raise ValueError(f'{path} is not a separate chaining snapshot')
+            hash_map = cls(header['capacity'], header['function'],
+                           **header['options'])
+            hash_map._restore(reader, header['reuse_hashes'])
+        return hash_map
+
+    def _restore(self, reader: SnapshotReader, reuse_hashes: bool) -> None:
+        """
+        Links every node of a snapshot into the bucket its hash picks
+        """
+        buckets, occupancy = self._buckets, self._occupancy
+
+        for hashes, keys, values in reader.entries():
+            if not reuse_hashes:
+                hashes = hash_batch(self._hash_function, keys)
+            indices = self._bucket_indices(hashes)
+            node_type = self._node_type
+            for num in range(len(keys)):
+                buckets[indices[num]].insert_node(
+                    node_type(keys[num], values[num], None, hashes[num]))
+                occupancy[indices[num]] = 1
+            self._size += len(keys)
+
+        self._occupied = self._capacity - occupancy.count(0)
+        self._version += 1
+
     def __str__(self) -> str:
         """
         Override string method to provide more readable output
-        DO NOT CHANGE THIS METHOD IN ANY WAY
         """
+        self._finish_migration()
         out = ''
         for i in range(self._buckets.length()):
             out += str(i) + ': ' + str(self._buckets[i]) + '\n'
         return out
 
-    def _next_prime(self, capacity: int) -> int:
+    def _next_capacity(self, capacity: int) -> int:
         """
-        Increment from given number and the find the closest prime number
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Returns the smallest valid table capacity of at least the given size
         """
-        if capacity % 2 == 0:
-            capacity += 1
-
-        while not self._is_prime(capacity):
-            capacity += 2
-
-        return capacity
+        if self._power_of_two:
+            return next_power_of_two(capacity)
+        return next_prime(capacity)
 
-    @staticmethod
-    def _is_prime(capacity: int) -> bool:
+    def _index(self, hash_code: int, capacity: int) -> int:
         """
-        Determine if given integer is a prime number and return boolean
-        DO NOT CHANGE THIS METHOD IN ANY WAY
+        Returns the bucket index of a hash in a table of the given capacity
         """
-        if capacity == 2 or capacity == 3:
-            return True
-
-        if capacity == 1 or capacity % 2 == 0:
-            return False
-
-        factor = 3
-        while factor ** 2 <= capacity:
-            if capacity % factor == 0:
-                return False
-            factor += 2
-
-        return True
+        if self._power_of_two:
+            return power_of_two_index(hash_code, capacity)
+        return hash_code % capacity
 
     def get_size(self) -> int:
         """
@@ -94,21 +217,78 @@ class HashMap:
         the hash map, its associated value must be replaced with the new value. If the given key is
         not in the hash map, a new key/value pair must be added.
         """
-        # Check if the load factor >= 1. If it is, resize to double capacity
+        self._put(key, value, self._hash_function(key))
+
+    def _put(self, key: str, value: object, hash_code: int,
+             replace: bool = True) -> SLNode:
+        """
+        Updates the key/value pair using an already computed hash of the key
+        and returns its node. An existing key keeps its value unless replace
+        is set.
+        """
+        # Continue an incremental resize that is in progress
+        if self._old_buckets is not None:
+            self._migrate(self._migration_step)
+
+        # Check if the load factor >= 1. If it is, resize to double capacity,
+        # unless the key is already in the table and only its value changes,
+        # so that updating values never disturbs an iteration
         if self.table_load() >= 1:
-            self.resize_table(self._capacity * 2)
+            bucket = self._buckets[self._index(hash_code, self._capacity)]
+            if bucket is None or bucket.contains(key, hash_code) is None:
+                if self._incremental_resize:
+                    self._start_migration(self._capacity * 2)
+                else:
+                    self.resize_table(self._capacity * 2)
+
+        # A key that has not been migrated yet is updated in the old table
+        if self._old_buckets is not None:
+            node = self._find_old_node(key, hash_code)
+            if node:
+                if replace:
+                    node.value = value
+                return node
 
         # Find the correct bucket
-        bucket = self.find_bucket(key)
+        index = self._index(hash_code, self._capacity)
+        bucket = self._buckets[index]
+        if bucket is None:
+            bucket = self._fill_bucket(index)
 
         # Check if the given key already exists
-        node = bucket.contains(key)
+        node = bucket.contains(key, hash_code)
         if node:
-            node.value = value
+            if replace:
+                node.value = value
         else:
             # If the key doesn't exist, add a new key-value pair
-            bucket.insert(key, value)
+            node = self._node_type(key, value, None, hash_code)
+            bucket.insert_node(node)
+            if bucket.length() == 1:
+                self._occupancy[index] = 1
+                self._occupied += 1
             self._size += 1
+            self._version += 1
+        return node
+
+    def increment(self, key: str, amount: int = 1) -> int:
+        """
+        Adds amount to the value of the key, treating a missing key as 0,
+        with a single lookup. Returns the new value.
+        """
+        node = self._put(key, 0, self._hash_function(key), False)
+        node.value += amount
+        return node.value
+
+    def upsert(self, key: str, update, default: object = None) -> object:
+        """
+        Replaces the value of the key with update(value), or adds the key
+        with update(default) when it is absent, with a single lookup.
+        Returns the new value.
+        """
+        node = self._put(key, default, self._hash_function(key), False)
+        node.value = update(node.value)
+        return node.value
 
     def resize_table(self, new_capacity: int) -> None:
         """
@@ -119,22 +299,129 @@ class HashMap:
         if new_capacity < 1:
             return
 
-        # Set the capacity as the nearest prime number and reset size
-        prime_capacity = self._next_prime(new_capacity)
-        self._capacity = prime_capacity
-        self._size = 0
+        # Set the capacity as the nearest prime number, doubling it until
+        # the table can hold every element without reaching a load of 1
+        capacity = self._next_capacity(new_capacity)
+        while self._size - 1 >= capacity:
+            capacity = self._next_capacity(capacity * 2)
+
+        self._finish_migration()
+        self._rehash(capacity)
 
-        # Save the old buckets and initialize new buckets
+    def _rehash(self, capacity: int) -> None:
+        """
+        Moves every node into a new table of exactly the given capacity.
+        Keys are already unique, so nodes are relinked without any lookups.
+        """
+        # Save the old buckets and preallocate the new buckets
         old_buckets = self._buckets
-        self._buckets = DynamicArray()
-        for _ in range(prime_capacity):
-            self._buckets.append(LinkedList())
+        buckets = DynamicArray([LinkedList() for _ in range(capacity)])
+        occupancy = bytearray(capacity)
 
-        # Rehash all elements in the old table
-        for num in range(old_buckets.length()):
-            bucket = old_buckets[num]
-            for node in bucket:
-                self.put(node.key, node.value)
+        # Relink each node into its new bucket using its cached hash
+        for num in self._occupied_buckets():
+            for node in old_buckets[num]:
+                index = self._index(node.hash, capacity)
+                buckets[index].insert_node(node)
+                occupancy[index] = 1
+
+        self._buckets = buckets
+        self._occupancy = occupancy
+        self._occupied = capacity - occupancy.count(0)
+        self._capacity = capacity
+        self._version += 1
+
+    def _start_migration(self, new_capacity: int) -> None:
+        """
+        Allocates a larger table and starts moving nodes into it a few
+        buckets at a time. Until migration completes, lookups check both tables.
+        """
+        self._finish_migration()
+
+        self._old_buckets = self._buckets
+        self._old_capacity = self._capacity
+        self._migrate_index = 0
+        self._version += 1
+
+        # New buckets are created as they are needed, or a few at a time
+        # alongside the migration, so starting it stays cheap
+        self._capacity = self._next_capacity(new_capacity)
+        self._buckets = DynamicArray([None] * self._capacity)
+        self._occupancy = bytearray(self._capacity)
+        self._occupied = 0
+        self._fill_index = 0
+
+    def _migrate(self, bucket_count: int) -> None:
+        """
+        Relinks the nodes of the next bucket_count old buckets into the new
+        table, dropping the old table once every bucket has been moved
+        """
+        old_buckets = self._old_buckets
+        stop = min(self._migrate_index + bucket_count, self._old_capacity)
+
+        for num in range(self._migrate_index, stop):
+            for node in old_buckets[num]:
+                index = self._index(node.hash, self._capacity)
+                bucket = self._buckets[index]
+                if bucket is None:
+                    bucket = self._fill_bucket(index)
+                bucket.insert_node(node)
+                if bucket.length() == 1:
+                    self._occupancy[index] = 1
+                    self._occupied += 1
+
+        # Create empty new buckets at the same pace as old ones are drained
+        fill_stop = stop * self._capacity // self._old_capacity
+        for num in range(self._fill_index, fill_stop):
+            if self._buckets[num] is None:
+                self._fill_bucket(num)
+        self._fill_index = fill_stop
+
+        # Buckets below the migrate index are no longer searched
+        self._migrate_index = stop
+        if stop == self._old_capacity:
+            self._old_buckets = None
+            self._old_capacity = 0
+
+    def _fill_bucket(self, index: int) -> LinkedList:
+        """
+        Creates the empty bucket at the given index of a table that is
+        still being filled by an incremental resize
+        """
+        bucket = LinkedList()
+        self._buckets[index] = bucket
+        return bucket
+
+    def _finish_migration(self) -> None:
+        """
+        Completes an incremental resize that is in progress, if any
+        """
+        if self._old_buckets is not None:
+            self._migrate(self._old_capacity)
+
+    def _find_old_node(self, key: str, hash_code: int) -> SLNode:
+        """
+        Returns the node for a key that is still waiting in the old table of
+        an incremental resize, or None
+        """
+        index = self._index(hash_code, self._old_capacity)
+        if index < self._migrate_index:
+            return None
+        return self._old_buckets[index].contains(key, hash_code)
+
+    def _find_node(self, key: str, hash_code: int) -> SLNode:
+        """
+        Returns the node holding the given key, or None if it is absent
+        """
+        # Continue an incremental resize that is in progress
+        if self._old_buckets is not None:
+            self._migrate(self._migration_step)
+
+        bucket = self._buckets[self._index(hash_code, self._capacity)]
+        node = bucket.contains(key, hash_code) if bucket is not None else None
+        if node is None and self._old_buckets is not None:
+            node = self._find_old_node(key, hash_code)
+        return node
 
     def table_load(self) -> float:
         """
@@ -147,23 +434,17 @@ class HashMap:
         """
         Returns the number of empty buckets in the hash table
         """
-        # Initialize empty buckets counter
-        empty_buckets = 0
-
-        # Iterate through the table and check each key
-        for num in range(self._buckets.length()):
-            if self._buckets[num].length() == 0:
-                empty_buckets += 1
+        self._finish_migration()
 
-        return empty_buckets
+        # Every bucket that is not marked as holding nodes is empty
+        return self._capacity - self._occupied
 
     def get(self, key: str) -> object:
         """
         Returns the value associated with the given key
         """
-        # Calculate the bucket index
-        bucket = self.find_bucket(key)
-        node = bucket.contains(key)
+        # Find the node holding the key
+        node = self._find_node(key, self._hash_function(key))
 
         # Check if the node is not empty
         if node:
@@ -174,33 +455,266 @@ class HashMap:
         """
         Returns true if the given key is in the hashmap, false otherwise
         """
-        # Calculate the bucket index
-        bucket = self.find_bucket(key)
-
-        # Check if the key exists in the bucket
-        return bucket.contains(key) is not None
+        # Check if the key exists in the map
+        return self._find_node(key, self._hash_function(key)) is not None
 
     def remove(self, key: str) -> None:
         """
         Removes the given key and its value from the hashmap
         """
+        # Continue an incremental resize that is in progress
+        if self._old_buckets is not None:
+            self._migrate(self._migration_step)
+
+        self._remove(key, self._hash_function(key))
+
+    def _remove(self, key: str, hash_code: int) -> None:
+        """
+        Removes the given key using an already computed hash of the key
+        """
         # Find the correct bucket
-        bucket = self.find_bucket(key)
+        index = self._index(hash_code, self._capacity)
+        bucket = self._buckets[index]
 
         # Reset the bucket
-        if bucket.remove(key):
+        if bucket is not None and bucket.remove(key, hash_code):
+            if bucket.length() == 0:
+                self._occupancy[index] = 0
+                self._occupied -= 1
             self._size -= 1
+            self._version += 1
+            return
+
+        # The key may still be waiting in the old table
+        if self._old_buckets is not None:
+            index = self._index(hash_code, self._old_capacity)
+            if (index >= self._migrate_index
+                    and self._old_buckets[index].remove(key, hash_code)):
+                self._size -= 1
+                self._version += 1
+
+    # ------------------------------------------------------------------ #
+
+    def _batch_indices(self, keys: list) -> tuple:
+        """
+        Hashes a whole batch of keys in one pass and finishes any resize in
+        progress, then returns the hashes and bucket indices of the keys
+        """
+        hashes = hash_batch(self._hash_function, keys)
+        self._finish_migration()
+        return hashes, self._bucket_indices(hashes)
+
+    def _bucket_indices(self, hashes: list) -> list:
+        """
+        Returns the bucket index of every hash in the current table
+        """
+        capacity = self._capacity
+        if self._power_of_two:
+            return [power_of_two_index(hash_code, capacity)
+                    for hash_code in hashes]
+        return [hash_code % capacity for hash_code in hashes]
+
+    def put_many(self, pairs) -> None:
+        """
+        Puts every (key, value) pair of the iterable, as put would one at a
+        time, hashing the whole batch in one pass. The table grows as new
+        keys arrive, so a batch that only updates keys never resizes it.
+        """
+        pairs = list(pairs)
+        self._put_batch([pair[0] for pair in pairs],
+                        [pair[1] for pair in pairs])
+
+    def merge(self, other: 'HashMap', combine=None) -> None:
+        """
+        Puts every key/value pair of another separate chaining HashMap into
+        this one. A key found in both maps gets combine(value, other_value),
+        or simply other's value when combine is None. The cost depends only
+        on the number of keys in other.
+        """
+        pairs = other.get_keys_and_values()
+        keys, values = [], []
+        for num in range(pairs.length()):
+            key, value = pairs[num]
+            keys.append(key)
+            values.append(value)
+
+        # Hashes are recomputed, as other may use another function or have
+        # been built by another process
+        self._put_batch(keys, values, combine)
+
+    def _put_batch(self, keys: list, values: list, combine=None) -> None:
+        """
+        Puts each key with the value at the same position, combining it
+        with an existing value through combine when one is given
+        """
+        hashes, indices = self._batch_indices(keys)
+        buckets, capacity = self._buckets, self._capacity
+
+        for num in range(len(keys)):
+            bucket = buckets[indices[num]]
+            node = bucket.contains(keys[num], hashes[num])
+            if node is None:
+                # Grow the same way put does before adding a key
+                if self._size >= capacity:
+                    self.resize_table(capacity * 2)
+                    buckets, capacity = self._buckets, self._capacity
+                    indices = self._bucket_indices(hashes)
+                    bucket = buckets[indices[num]]
+                bucket.insert_node(self._node_type(keys[num], values[num],
+                                                   None, hashes[num]))
+                if bucket.length() == 1:
+                    self._occupancy[indices[num]] = 1
+                    self._occupied += 1
+                self._size += 1
+                self._version += 1
+            elif combine is None:
+                node.value = values[num]
+            else:
+                node.value = combine(node.value, values[num])
+
+    def increment_many(self, keys, amount: int = 1) -> DynamicArray:
+        """
+        Increments every key of the iterable as increment would one at a
+        time and returns a dynamic array with each key's new value.
+        Batches often repeat keys, so the table grows as new keys arrive
+        rather than being sized for the whole batch up front.
+        """
+        keys = list(keys)
+        hashes = hash_batch(self._hash_function, keys)
+        self._finish_migration()
+        buckets, capacity = self._buckets, self._capacity
+
+        values = []
+        for num in range(len(keys)):
+            hash_code = hashes[num]
+            index = self._index(hash_code, capacity)
+            bucket = buckets[index]
+            node = bucket.contains(keys[num], hash_code)
+            if node is None:
+                # Grow the same way put does before adding a key
+                if self._size >= capacity:
+                    self.resize_table(capacity * 2)
+                    buckets, capacity = self._buckets, self._capacity
+                    index = self._index(hash_code, capacity)
+                    bucket = buckets[index]
+                node = self._node_type(keys[num], 0, None, hash_code)
+                bucket.insert_node(node)
+                if bucket.length() == 1:
+                    self._occupancy[index] = 1
+                    self._occupied += 1
+                self._size += 1
+                self._version += 1
+            node.value += amount
+            values.append(node.value)
+        return DynamicArray(values)
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of every key of the iterable,
+        or default for keys that are not in the hash map
+        """
+        keys = list(keys)
+        hashes, indices = self._batch_indices(keys)
+        buckets = self._buckets
+
+        values = []
+        for num in range(len(keys)):
+            node = buckets[indices[num]].contains(keys[num], hashes[num])
+            values.append(node.value if node else default)
+        return DynamicArray(values)
+
+    def contains_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array telling for every key of the iterable
+        whether it is in the hash map
+        """
+        keys = list(keys)
+        hashes, indices = self._batch_indices(keys)
+        buckets = self._buckets
+
+        return DynamicArray([
+            buckets[indices[num]].contains(keys[num], hashes[num]) is not None
+            for num in range(len(keys))])
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of the iterable that is in the hash map
+        """
+        keys = list(keys)
+        hashes, indices = self._batch_indices(keys)
+        buckets = self._buckets
+
+        for num in range(len(keys)):
+            bucket = buckets[indices[num]]
+            if bucket.remove(keys[num], hashes[num]):
+                if bucket.length() == 0:
+                    self._occupancy[indices[num]] = 0
+                    self._occupied -= 1
+                self._size -= 1
+                self._version += 1
+
+    def keys(self):
+        """
+        Yields every key in the hash map, one at a time, without building
+        an array. Raises RuntimeError if keys are added or removed while
+        iterating; replacing values is allowed.
+        """
+        for node in self._nodes():
+            yield node.key
+
+    def values(self):
+        """
+        Yields every value in the hash map, one at a time, like keys
+        """
+        for node in self._nodes():
+            yield node.value
+
+    def items(self):
+        """
+        Yields every (key, value) pair in the hash map, one at a time,
+        like keys
+        """
+        for node in self._nodes():
+            yield node.key, node.value
+
+    def _nodes(self):
+        """
+        Yields every node of the table, checking after each one that the
+        map has not been changed in the meantime
+        """
+        self._finish_migration()
+        version = self._version
+        buckets = self._buckets
+
+        for num in self._occupied_buckets():
+            for node in buckets[num]:
+                yield node
+                if self._version != version:
+                    raise RuntimeError('HashMap changed during iteration')
+
+    def _occupied_buckets(self):
+        """
+        Yields the index of every non-empty bucket of the current table,
+        skipping runs of empty buckets at C speed
+        """
+        find = self._occupancy.find
+        index = find(1)
+        while index != -1:
+            yield index
+            index = find(1, index + 1)
 
     def get_keys_and_values(self) -> DynamicArray:
         """
         This method returns a dynamic array where each index contains a tuple of a key/value pair
         stored in the hash map
         """
+        self._finish_migration()
+
         # Initialize a dynamic array
         key_value_arr = DynamicArray()
 
-        # Iterate through each bucket and add key-value pairs to array
-        for num in range(self._buckets.length()):
+        # Iterate through each non-empty bucket and add key-value pairs to array
+        for num in self._occupied_buckets():
             bucket = self._buckets[num]
             for node in bucket:
                 key_value_arr.append((node.key, node.value))
@@ -212,19 +726,32 @@ class HashMap:
         This method clears the contents of the hash map. It does not change the underlying hash
         table capacity.
         """
-        # Go through each bucket and replace with linked list
-        for num in range(self._buckets.length()):
+        # Drop any table that was still being migrated, along with the
+        # buckets of the new table that were not created yet
+        if self._old_buckets is not None:
+            self._old_buckets = None
+            self._old_capacity = 0
+            self._buckets = DynamicArray([LinkedList()
+                                          for _ in range(self._capacity)])
+
+        # Replace each non-empty bucket with an empty linked list
+        for num in self._occupied_buckets():
             self._buckets[num] = LinkedList()
+        self._occupancy = bytearray(self._capacity)
+        self._occupied = 0
 
         # Reset size
         self._size = 0
+        self._version += 1
 
     def find_bucket(self, key: str) -> LinkedList:
         """
         Calculates the bucket index of the given key
         """
+        self._finish_migration()
+
         # Calculate the bucket index
-        index = self._hash_function(key) % self._capacity
+        index = self._index(self._hash_function(key), self._capacity)
 
         return self._buckets[index]
 
@@ -232,6 +759,7 @@ class HashMap:
         """
         Retrieves the bucket at given index
         """
+        self._finish_migration()
         return self._buckets.get_at_index(index)
 
 
@@ -250,13 +778,8 @@ def find_mode(da: DynamicArray) -> tuple[DynamicArray, int]:
     for num in range(da.length()):
         value = da[num]
 
-        # Update the frequency
-        if map.contains_key(value):
-            new_count = map.get(value) + 1
-            map.put(value, new_count)
-        else:
-            map.put(value, 1)
-            new_count = 1
+        # Update the frequency with a single lookup
+        new_count = map.increment(value)
 
         # Update maximum frequency
         if new_count > max_frequency:
@@ -0,0 +1,421 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: HashMap that splits its keys between a number of independent
+#              separate chaining or open addressing HashMaps (shards),
+#              picked by the top bits of each key's mixed hash. Every shard
+#              resizes on its own, so growing never rehashes more than one
+#              shard's keys at a time, and bulk loads, snapshots and other
+#              per-shard work can run in a thread or process pool.
+
+import math
+
+from a6_include import DynamicArray, hash_function_1, hash_function_2
+from capacity_planning import next_power_of_two
+from hash_functions import (get_hash_function, hash_batch, hash_function_name,
+                            shard_index)
+import hash_map_oa
+import hash_map_sc
+
+
+class HashMap:
+    def __init__(self,
+                 capacity: int = 11,
+                 function: callable = hash_function_1,
+                 shards: int = 16,
+                 map_type: type = hash_map_oa.HashMap,
+                 **kwargs) -> None:
+        """
+        Initialize new HashMap split into the given number of shards (rounded
+        up to a power of two), each a map_type HashMap with an equal part of
+        the capacity. Other keyword arguments are passed on to map_type.
+
+        The hash function routes keys to shards and is used by the shards
+        themselves. A process pool can only be used for bulk operations if
+        the workers hash keys the same way, so with the builtin hash the
+        workers must be forked rather than spawned.
+        """
+        self._hash_function = get_hash_function(function)
+        self._map_type = map_type
+        self._shard_count = next_power_of_two(max(1, shards))
+
+        capacity = max(1, math.ceil(capacity / self._shard_count))
+        self._shards = [map_type(capacity, function, **kwargs)
+                        for _ in range(self._shard_count)]
+
+    @classmethod
+    def with_expected_size(cls,
+                           expected_size: int,
+                           function: callable = hash_function_1,
+                           shards: int = 16,
+                           map_type: type = hash_map_oa.HashMap,
+                           **kwargs) -> 'HashMap':
+        """
+        Returns an empty HashMap whose shards are sized so that
+        expected_size entries can be put without a resize. Shards do not
+        get exactly equal shares of the keys, so each one has room for four
+        standard deviations more than its average share. Other keyword
+        arguments are passed on to map_type.with_expected_size.
+        """
+        hash_map = cls(1, function, shards, map_type)
+        share = expected_size / hash_map._shard_count
+        per_shard = math.ceil(share + 4 * math.sqrt(share))
+        hash_map._shards = [map_type.with_expected_size(per_shard, function,
+                                                        **kwargs)
+                            for _ in range(hash_map._shard_count)]
+        return hash_map
+
+    @classmethod
+    def from_shards(cls, shards: list,
+                    function: callable = hash_function_1) -> 'HashMap':
+        """
+        Returns a HashMap made of already built shards, in shard order. Each
+        must hold exactly the keys that the hash function routes to it, and
+        their number must be a power of two.
+        """
+        if len(shards) != next_power_of_two(max(1, len(shards))):
+            raise ValueError(f'the number of shards must be a power of two, '
+                             f'got {len(shards)}')
+        hash_map = cls(1, function, len(shards), type(shards[0]))
+        hash_map._shards = list(shards)
+        return hash_map
+
+    def __getstate__(self) -> dict:
+        """
+        Pickles a registered hash function by name, so maps using one of
+        them can be sent to other processes
+        """
+        state = self.__dict__.copy()
+        name = hash_function_name(self._hash_function)
+        if name is not None:
+            state['_hash_function'] = name
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._hash_function = get_hash_function(self._hash_function)
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for num in range(self._shard_count):
+            out += 'shard ' + str(num) + ':\n' + str(self._shards[num])
+        return out
+
+    def _shard(self, key: str):
+        """
+        Returns the shard holding the given key
+        """
+        return self._shards[shard_index(self._hash_function(key),
+                                        self._shard_count)]
+
+    def _group(self, keys: list) -> list:
+        """
+        Hashes a batch of keys in one pass and returns, for every shard, the
+        positions of the keys routed to it
+        """
+        groups = [[] for _ in range(self._shard_count)]
+        hashes = hash_batch(self._hash_function, keys)
+        for num in range(len(keys)):
+            groups[shard_index(hashes[num], self._shard_count)].append(num)
+        return groups
+
+    def _run(self, function, arguments: list, executor=None) -> list:
+        """
+        Returns function(shard, argument) for every shard and its argument,
+        in shard order. The calls run in the executor's pool when one is
+        given; a process pool works on copies of the shards, so a function
+        that changes its shard must return it.
+        """
+        if executor is None:
+            return [function(self._shards[num], arguments[num])
+                    for num in range(self._shard_count)]
+        return list(executor.map(function, self._shards, arguments))
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return sum(shard.get_size() for shard in self._shards)
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map, the sum of the capacities of its shards
+        """
+        return sum(shard.get_capacity() for shard in self._shards)
+
+    def get_shard_count(self) -> int:
+        """
+        Returns the number of shards
+        """
+        return self._shard_count
+
+    def get_shard(self, index: int):
+        """
+        Returns the shard at the given index
+        """
+        return self._shards[index]
+
+    def shard_stats(self) -> DynamicArray:
+        """
+        Returns a da with a dict for every shard, holding its size,
+        capacity, table load and number of empty buckets
+        """
+        stats = DynamicArray()
+        for shard in self._shards:
+            stats.append({'size': shard.get_size(),
+                          'capacity': shard.get_capacity(),
+                          'table_load': shard.table_load(),
+                          'empty_buckets': shard.empty_buckets()})
+        return stats
+
+    # ------------------------------------------------------------------ #
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the shard holding the key
+        """
+        self._shard(key).put(key, value)
+
+    def increment(self, key: str, amount: int = 1) -> int:
+        """
+        Adds amount to the value of the key, treating a missing key as 0.
+        Returns the new value.
+        """
+        return self._shard(key).increment(key, amount)
+
+    def upsert(self, key: str, update, default: object = None) -> object:
+        """
+        Replaces the value of the key with update(value), or adds the key
+        with update(default) when it is absent. Returns the new value.
+        """
+        return self._shard(key).upsert(key, update, default)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key
+        """
+        return self._shard(key).get(key)
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns true if the given key is in the hashmap, false otherwise
+        """
+        return self._shard(key).contains_key(key)
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its value from the hashmap
+        """
+        self._shard(key).remove(key)
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Splits the new capacity evenly between the shards and resizes each
+        """
+        capacity = math.ceil(new_capacity / self._shard_count)
+        for shard in self._shards:
+            shard.resize_table(capacity)
+
+    def table_load(self) -> float:
+        """
+        Calculates and returns the table load factor over all shards
+        """
+        return self.get_size() / self.get_capacity()
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in all shards
+        """
+        return sum(shard.empty_buckets() for shard in self._shards)
+
+    def clear(self) -> None:
+        """
+        Clears every shard, keeping its capacity
+        """
+        for shard in self._shards:
+            shard.clear()
+
+    def put_many(self, pairs, executor=None) -> None:
+        """
+        Puts every (key, value) pair of the iterable. The pairs are split
+        by shard and each shard loads its own pairs with put_many, in
+        parallel when an executor (a thread or process pool) is given.
+        """
+        pairs = list(pairs)
+        groups = self._group([pair[0] for pair in pairs])
+        arguments = [[pairs[num] for num in group] for group in groups]
+        self._shards = self._run(_put_shard, arguments, executor)
+
+    def increment_many(self, keys, amount: int = 1) -> DynamicArray:
+        """
+        Increments every key of the iterable as increment would one at a
+        time and returns a dynamic array with each key's new value
+        """
+        keys = list(keys)
+        values = [None] * len(keys)
+        groups = self._group(keys)
+        for num in range(self._shard_count):
+            group = groups[num]
+            counts = self._shards[num].increment_many(
+                [keys[position] for position in group], amount)
+            for index in range(len(group)):
+                values[group[index]] = counts[index]
+        return DynamicArray(values)
+
+    def get_many(self, keys, default: object = None) -> DynamicArray:
+        """
+        Returns a dynamic array with the value of every key of the iterable,
+        or default for keys that are not in the hash map
+        """
+        keys = list(keys)
+        values = [default] * len(keys)
+        groups = self._group(keys)
+        for num in range(self._shard_count):
+            group = groups[num]
+            found = self._shards[num].get_many(
+                [keys[position] for position in group], default)
+            for index in range(len(group)):
+                values[group[index]] = found[index]
+        return DynamicArray(values)
+
+    def contains_many(self, keys) -> DynamicArray:
+        """
+        Returns a dynamic array telling for every key of the iterable
+        whether it is in the hash map
+        """
+        keys = list(keys)
+        found = [False] * len(keys)
+        groups = self._group(keys)
+        for num in range(self._shard_count):
+            group = groups[num]
+            contained = self._shards[num].contains_many(
+                [keys[position] for position in group])
+            for index in range(len(group)):
+                found[group[index]] = contained[index]
+        return DynamicArray(found)
+
+    def remove_many(self, keys) -> None:
+        """
+        Removes every key of the iterable that is in the hash map
+        """
+        keys = list(keys)
+        groups = self._group(keys)
+        for num in range(self._shard_count):
+            self._shards[num].remove_many([keys[position]
+                                           for position in groups[num]])
+
+    def map_shards(self, function, executor=None) -> list:
+        """
+        Returns function(shard) for every shard, in shard order, calling it
+        in the executor's pool when one is given. With a process pool the
+        function must be picklable and sees a copy of the shard.
+        """
+        return self._run(_call, [function] * self._shard_count, executor)
+
+    def keys(self):
+        """
+        Yields every key in the hash map, one shard after another
+        """
+        for shard in self._shards:
+            yield from shard.keys()
+
+    def values(self):
+        """
+        Yields every value in the hash map, one shard after another
+        """
+        for shard in self._shards:
+            yield from shard.values()
+
+    def items(self):
+        """
+        Yields every (key, value) pair in the hash map, one shard after
+        another
+        """
+        for shard in self._shards:
+            yield from shard.items()
+
+    def get_keys_and_values(self, executor=None) -> DynamicArray:
+        """
+        This method returns a dynamic array where each index contains a tuple of a key/value pair
+        stored in the hash map. Each shard's pairs are collected in the
+        executor's pool when one is given.
+        """
+        key_value_arr = DynamicArray()
+        for pairs in self.map_shards(_shard_pairs, executor):
+            for pair in pairs:
+                key_value_arr.append(pair)
+        return key_value_arr
+
+
+def _put_shard(shard, pairs: list):
+    """
+    Puts a shard's pairs into it and returns the shard, as a worker process
+    only changes its own copy
+    """
+    shard.put_many(pairs)
+    return shard
+
+
+def _call(shard, function):
+    """
+    Returns function(shard), for map_shards
+    """
+    return function(shard)
+
+
+def _shard_pairs(shard) -> list:
+    """
+    Returns the key/value pairs of a shard as a list
+    """
+    pairs = shard.get_keys_and_values()
+    return [pairs[num] for num in range(pairs.length())]
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    print("\nput / get / remove")
+    print("------------------")
+    for map_type in (hash_map_sc.HashMap, hash_map_oa.HashMap):
+        m = HashMap(53, hash_function_2, shards=4, map_type=map_type)
+        for i in range(150):
+            m.put('str' + str(i), i * 100)
+        for i in range(0, 150, 3):
+            m.remove('str' + str(i))
+        print(m.get_size(), m.get_capacity(), m.get('str1'), m.get('str3'),
+              m.contains_key('str149'), round(m.table_load(), 2))
+
+    print("\nshard stats")
+    print("-----------")
+    m = HashMap.with_expected_size(10000, 'mix64', shards=8)
+    m.put_many(('key' + str(i), i) for i in range(10000))
+    stats = m.shard_stats()
+    for num in range(stats.length()):
+        print(num, stats[num]['size'], stats[num]['capacity'])
+
+    print("\nbatches")
+    print("-------")
+    keys = ['key' + str(i) for i in range(0, 20000, 1999)]
+    print(m.get_many(keys, -1))
+    print(m.contains_many(keys))
+    print(m.increment_many(['key1', 'key2', 'key1']))
+    m.remove_many(keys)
+    print(m.get_size())
+
+    print("\nparallel bulk load and snapshot")
+    print("-------------------------------")
+    pairs = [('key' + str(i), i) for i in range(50000)]
+    for executor_type in (ThreadPoolExecutor, ProcessPoolExecutor):
+        m = HashMap(11, 'mix64', shards=4, map_type=hash_map_sc.HashMap)
+        with executor_type(2) as executor:
+            m.put_many(pairs, executor)
+            snapshot = m.get_keys_and_values(executor)
+            sizes = m.map_shards(hash_map_sc.HashMap.get_size, executor)
+        result = m.get_size() == snapshot.length() == len(pairs)
+        result &= all(m.get(key) == value for key, value in pairs)
+        print(executor_type.__name__, result, sizes)
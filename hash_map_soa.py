@@ -0,0 +1,357 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Implementation of an open addressing HashMap that stores its
+#              table as parallel arrays (struct-of-arrays) instead of one
+#              HashEntry object per slot
+
+from array import array
+
+from a6_include import (DynamicArray, HashEntry,
+                        hash_function_1, hash_function_2)
+from capacity_planning import next_prime
+from hash_functions import get_hash_function
+
+
+# Slot states kept in the control byte array
+EMPTY = 0
+LIVE = 1
+TOMBSTONE = 2
+
+# Cached hashes are stored as unsigned 64-bit integers
+_HASH_MASK = (1 << 64) - 1
+
+
+class HashMap:
+    def __init__(self, capacity: int, function) -> None:
+        """
+        Initialize new HashMap that uses quadratic probing for collision
+        resolution and keeps its slots in parallel arrays
+        """
+        # capacity must be a prime number
+        self._capacity = next_prime(capacity)
+        self._allocate(self._capacity)
+
+        self._hash_function = get_hash_function(function)
+        self._size = 0
+
+    def __str__(self) -> str:
+        """
+        Override string method to provide more readable output
+        """
+        out = ''
+        for i in range(self._capacity):
+            out += str(i) + ': ' + str(self.get_bucket(i)) + '\n'
+        return out
+
+    def get_size(self) -> int:
+        """
+        Return size of map
+        """
+        return self._size
+
+    def get_capacity(self) -> int:
+        """
+        Return capacity of map
+        """
+        return self._capacity
+
+    # ------------------------------------------------------------------ #
+
+    def _allocate(self, capacity: int) -> None:
+        """
+        Replaces the slot arrays with empty arrays of the given capacity
+        """
+        self._control = bytearray(capacity)
+        self._hashes = array('Q', bytes(8 * capacity))
+        self._keys = [None] * capacity
+        self._values = [None] * capacity
+
+    def _hash(self, key: str) -> int:
+        """
+        Returns the cached form of the key's hash
+        """
+        return self._hash_function(key) & _HASH_MASK
+
+    def _find(self, key: str, hash_code: int) -> int:
+        """
+        Returns the slot index holding the given key, or -1 if it is absent
+        """
+        control, hashes, keys = self._control, self._hashes, self._keys
+        capacity = self._capacity
+        index = hash_code % capacity
+        probe_counter = 0
+
+        while probe_counter < capacity:
+            probe_index = (index + probe_counter ** 2) % capacity
+            state = control[probe_index]
+
+            # An empty slot ends the probe sequence
+            if state == EMPTY:
+                return -1
+
+            # Compare the cached hash before the (possibly costly) key compare
+            if (state == LIVE and hashes[probe_index] == hash_code
+                    and keys[probe_index] == key):
+                return probe_index
+
+            probe_counter += 1
+
+        return -1
+
+    def put(self, key: str, value: object) -> None:
+        """
+        Updates the key/value pair in the hash map.
+        If the key already exists, its value will be replaced by the new value.
+        If the key doesn't already exist, a new key/value pair will be added.
+        """
+        # Check if resizing is necessary
+        if self.table_load() >= 0.5:
+            self.resize_table(self._capacity * 2)
+
+        hash_code = self._hash(key)
+        control = self._control
+        capacity = self._capacity
+        index = hash_code % capacity
+        probe_counter = 0
+        free_index = -1
+
+        # Probe until an empty slot proves the key is absent
+        while probe_counter < capacity:
+            probe_index = (index + probe_counter ** 2) % capacity
+            state = control[probe_index]
+
+            if state == EMPTY:
+                if free_index == -1:
+                    free_index = probe_index
+                break
+
+            if state == TOMBSTONE:
+                # Remember the first tombstone so it can be reused
+                if free_index == -1:
+                    free_index = probe_index
+            elif (self._hashes[probe_index] == hash_code
+                    and self._keys[probe_index] == key):
+                # If the key already exists, update the value
+                self._values[probe_index] = value
+                return
+
+            probe_counter += 1
+
+        if free_index == -1:
+            return
+
+        # Add the key/value pair into the first free slot found
+        control[free_index] = LIVE
+        self._hashes[free_index] = hash_code
+        self._keys[free_index] = key
+        self._values[free_index] = value
+        self._size += 1
+
+    def resize_table(self, new_capacity: int) -> None:
+        """
+        Changes the capacity of the underlying table.
+        All active key/value pairs are placed directly into the new arrays
+        using their cached hashes.
+        """
+        # Check if new capacity is not less than size
+        if new_capacity < self._size:
+            return
+
+        # Make sure that the new capacity is a prime number that keeps the
+        # load factor below 0.5 once every entry is placed
+        capacity = next_prime(new_capacity)
+        while self._size > 0 and (self._size - 1) / capacity >= 0.5:
+            capacity = next_prime(capacity * 2)
+
+        old_control, old_hashes = self._control, self._hashes
+        old_keys, old_values = self._keys, self._values
+        self._capacity = capacity
+        self._allocate(capacity)
+        control, hashes = self._control, self._hashes
+        keys, values = self._keys, self._values
+
+        # Place each live entry into the first empty slot of its sequence
+        for num in range(len(old_control)):
+            if old_control[num] != LIVE:
+                continue
+            hash_code = old_hashes[num]
+            index = hash_code % capacity
+            probe_counter = 0
+            probe_index = index
+            while control[probe_index] != EMPTY:
+                probe_counter += 1
+                probe_index = (index + probe_counter ** 2) % capacity
+
+            control[probe_index] = LIVE
+            hashes[probe_index] = hash_code
+            keys[probe_index] = old_keys[num]
+            values[probe_index] = old_values[num]
+
+    def table_load(self) -> float:
+        """
+        Calculates and returns the hash table load factor
+        """
+        return self._size / self._capacity
+
+    def empty_buckets(self) -> int:
+        """
+        Returns the number of empty buckets in the hash table
+        """
+        return self._control.count(EMPTY)
+
+    def get(self, key: str) -> object:
+        """
+        Returns the value associated with the given key.
+        If the key is not in the hash map, returns None
+        """
+        index = self._find(key, self._hash(key))
+        if index == -1:
+            return None
+        return self._values[index]
+
+    def contains_key(self, key: str) -> bool:
+        """
+        Returns true if the key is in the hash map, otherwise false
+        """
+        return self._find(key, self._hash(key)) != -1
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the given key and its associated value from the hash map.
+        If the key is not in the hash map, the method does nothing
+        """
+        index = self._find(key, self._hash(key))
+        if index == -1:
+            return
+
+        # Leave a tombstone so later probe sequences stay intact
+        self._control[index] = TOMBSTONE
+        self._keys[index] = None
+        self._values[index] = None
+        self._size -= 1
+
+    def get_keys_and_values(self) -> DynamicArray:
+        """
+        Returns a da where each index contains a tuple of a key/value pair
+        stored in the hash map
+        """
+        key_value_arr = DynamicArray()
+        control, keys, values = self._control, self._keys, self._values
+
+        for num in range(self._capacity):
+            if control[num] == LIVE:
+                key_value_arr.append((keys[num], values[num]))
+
+        return key_value_arr
+
+    def clear(self) -> None:
+        """
+        Clears the contents of the hash map
+        """
+        self._allocate(self._capacity)
+        self._size = 0
+
+    def __iter__(self):
+        """
+        Enables the hash map to iterate across itself
+        """
+        return HashMapIterator(self)
+
+    def get_bucket(self, index: int) -> HashEntry:
+        """
+        Returns a HashEntry view of the slot at the given index,
+        or None if the slot has never been used
+        """
+        state = self._control[index]
+        if state == EMPTY:
+            return None
+
+        entry = HashEntry(self._keys[index], self._values[index],
+                          self._hashes[index])
+        entry.is_tombstone = state == TOMBSTONE
+        return entry
+
+
+class HashMapIterator:
+    """
+    Hash map iterator class
+    """
+    def __init__(self, hash_map: HashMap) -> None:
+        self._hash_map = hash_map
+        self._current_index = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """
+        Returns the next active item in the hash map
+        """
+        control = self._hash_map._control
+
+        # Advance to the next live slot
+        while self._current_index < len(control):
+            index = self._current_index
+            self._current_index += 1
+
+            if control[index] == LIVE:
+                self.key = self._hash_map._keys[index]
+                self.value = self._hash_map._values[index]
+                return self
+
+        # Stop iteration if all slots have been processed
+        raise StopIteration
+
+
+# ------------------- BASIC TESTING ---------------------------------------- #
+
+if __name__ == "__main__":
+
+    print("\nPDF - put example 1")
+    print("-------------------")
+    m = HashMap(53, hash_function_1)
+    for i in range(150):
+        m.put('str' + str(i), i * 100)
+        if i % 25 == 24:
+            print(m.empty_buckets(), round(m.table_load(), 2), m.get_size(), m.get_capacity())
+
+    print("\nPDF - resize example 2")
+    print("----------------------")
+    m = HashMap(75, hash_function_2)
+    keys = [i for i in range(25, 1000, 13)]
+    for key in keys:
+        m.put(str(key), key * 42)
+    print(m.get_size(), m.get_capacity())
+
+    for capacity in range(111, 1000, 117):
+        m.resize_table(capacity)
+
+        m.put('some key', 'some value')
+        result = m.contains_key('some key')
+        m.remove('some key')
+
+        for key in keys:
+            # all inserted keys must be present
+            result &= m.contains_key(str(key))
+            # NOT inserted keys must be absent
+            result &= not m.contains_key(str(key + 1))
+        print(capacity, result, m.get_size(), m.get_capacity(), round(m.table_load(), 2))
+
+    print("\nremove / re-put example")
+    print("-----------------------")
+    m = HashMap(11, hash_function_1)
+    m.put('key1', 10)
+    m.remove('key1')
+    m.put('key1', 20)
+    print(m.get('key1'), m.get_size(), m.contains_key('key1'))
+
+    print("\n__iter__(), __next__() example")
+    print("---------------------")
+    m = HashMap(10, hash_function_2)
+    for i in range(5):
+        m.put(str(i), str(i * 24))
+    m.remove('0')
+    m.remove('4')
+    print(m)
+    for item in m:
+        print('K:', item.key, 'V:', item.value)
@@ -0,0 +1,268 @@
+# Course: CS261 - Data Structures
+# Assignment: 6
+# Description: Binary snapshot files that HashMap.dump writes and
+#              HashMap.load reads back. A snapshot stores a map's table
+#              layout (capacity, slot states, cached hashes, keys and
+#              values) so a load places every entry where it was, without
+#              hashing any key again. It is written and read as a stream
+#              of frames, optionally zlib-compressed, with a CRC-32 of the
+#              uncompressed body at the end.
+#
+#              File format, all integers little-endian:
+#
+#              magic           8 bytes  b'CS261SNP'
+#              version         u32      FORMAT_VERSION
+#              flags           u32      bit 0 set when the body is compressed
+#              header length   u32
+#              header                   pickled dict: map kind, capacity,
+#                                       size, hash function name, whether
+#                                       the cached hashes can be reused,
+#                                       constructor options
+#              body                     frames, each a u64 length followed
+#                                       by that many bytes, ending with an
+#                                       empty frame; one zlib stream when
+#                                       compressed
+#              checksum        u32      CRC-32 of the uncompressed body
+#
+#              Headers and entry frames are pickled, so only load snapshots
+#              from trusted sources.
+
+from array import array
+import os
+import pickle
+import struct
+import tempfile
+import zlib
+
+from hash_functions import hash_function_name, persistent_hash_id
+
+
+MAGIC = b'CS261SNP'
+FORMAT_VERSION = 1
+
+# Entries per frame written by write_entries
+CHUNK_SIZE = 65536
+
+_COMPRESSED = 1
+_PREAMBLE = struct.Struct('<8sIII')
+_FRAME = struct.Struct('<Q')
+_CHECKSUM = struct.Struct('<I')
+
+# Cached hashes are stored as unsigned 64-bit integers
+_HASH_MASK = (1 << 64) - 1
+
+
+def make_header(kind: str, capacity: int, size: int, function,
+                options: dict) -> dict:
+    """
+    Returns the header of a snapshot of a map of the given kind. The hash
+    function must be registered, and its cached hashes are only reused on
+    load when it gives the same hashes in every process.
+    """
+    name = hash_function_name(function)
+    if name is None:
+        raise ValueError('only maps using a registered hash function can '
+                         'be dumped')
+    try:
+        persistent_hash_id(name)
+        reuse_hashes = True
+    except ValueError:
+        reuse_hashes = False
+
+    return {'kind': kind, 'capacity': capacity, 'size': size,
+            'function': name, 'reuse_hashes': reuse_hashes,
+            'options': options}
+
+
+def open_temp_file(path) -> tuple:
+    """
+    Creates a uniquely named temporary file next to path, to be renamed
+    over it once written, and returns the open binary file and its path.
+    Writers of the same path never share a temporary file.
+    """
+    path = os.path.abspath(os.fspath(path))
+    descriptor, temp_path = tempfile.mkstemp(
+        prefix=os.path.basename(path) + '.', suffix='.tmp',
+        dir=os.path.dirname(path))
+    return os.fdopen(descriptor, 'wb'), temp_path
+
+
+def fsync_directory(path) -> None:
+    """
+    Syncs the directory holding path, so a file created or renamed into it
+    survives a crash
+    """
+    descriptor = os.open(os.path.dirname(os.path.abspath(os.fspath(path))),
+                         os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+class SnapshotWriter:
+    """
+    Streams the frames of a snapshot to a temporary file, which replaces
+    the file at path once the writer is closed without an error
+    """
+    def __init__(self, path, header: dict, compress: bool = False) -> None:
+        self._path = os.fspath(path)
+        self._file, self._temp_path = open_temp_file(self._path)
+        self._compressor = zlib.compressobj(1) if compress else None
+        self._checksum = 0
+
+        header = pickle.dumps(header, pickle.HIGHEST_PROTOCOL)
+        self._file.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION,
+                                        _COMPRESSED if compress else 0,
+                                        len(header)))
+        self._file.write(header)
+
+    def __enter__(self) -> 'SnapshotWriter':
+        return self
+
+    def __exit__(self, exc_type, *exc_info) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self._file.close()
+            os.remove(self._temp_path)
+
+    def _write(self, data: bytes) -> None:
+        """
+        Adds data to the body
+        """
+        self._checksum = zlib.crc32(data, self._checksum)
+        if self._compressor is not None:
+            data = self._compressor.compress(data)
+        self._file.write(data)
+
+    def write_frame(self, data: bytes) -> None:
+        """
+        Writes one frame of the body. Empty frames end the body, so data
+        must not be empty.
+        """
+        self._write(_FRAME.pack(len(data)))
+        self._write(data)
+
+    def write_entries(self, hashes: list, keys: list, values: list) -> None:
+        """
+        Writes the given entries in frames of at most CHUNK_SIZE entries
+        """
+        for start in range(0, len(keys), CHUNK_SIZE):
+            stop = start + CHUNK_SIZE
+            chunk = array('Q', [hash_code & _HASH_MASK
+                                for hash_code in hashes[start:stop]])
+            self.write_frame(pickle.dumps(
+                (chunk.tobytes(), keys[start:stop], values[start:stop]),
+                pickle.HIGHEST_PROTOCOL))
+
+    def close(self) -> None:
+        """
+        Ends the body, writes the checksum and moves the file into place
+        """
+        self._write(_FRAME.pack(0))
+        if self._compressor is not None:
+            self._file.write(self._compressor.flush())
+        self._file.write(_CHECKSUM.pack(self._checksum))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        os.replace(self._temp_path, self._path)
+        fsync_directory(self._path)
+
+
+class SnapshotReader:
+    """
+    Reads the header and then streams the frames of a snapshot, checking
+    the checksum once the last frame has been read
+    """
+    def __init__(self, path) -> None:
+        self._path = os.fspath(path)
+        self._file = open(self._path, 'rb')
+
+        preamble = self._file.read(_PREAMBLE.size)
+        if len(preamble) < _PREAMBLE.size:
+            self.close()
+            raise ValueError(f'{self._path} is not a snapshot')
+        magic, version, flags, header_length = _PREAMBLE.unpack(preamble)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f'{self._path} is not a version '
+                             f'{FORMAT_VERSION} snapshot')
+        self.header = pickle.loads(self._file.read(header_length))
+
+        self._decompressor = zlib.decompressobj() \
+            if flags & _COMPRESSED else None
+        self._buffer = bytearray()
+        self._checksum = 0
+
+    def __enter__(self) -> 'SnapshotReader':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def _read(self, count: int) -> bytes:
+        """
+        Returns the next count bytes of the body
+        """
+        while len(self._buffer) < count:
+            data = self._file.read(max(1 << 20, count - len(self._buffer)))
+            if not data:
+                raise ValueError(f'{self._path} is truncated')
+            if self._decompressor is not None:
+                data = self._decompressor.decompress(data)
+            self._buffer += data
+
+        data = bytes(self._buffer[:count])
+        del self._buffer[:count]
+        self._checksum = zlib.crc32(data, self._checksum)
+        return data
+
+    def read_frame(self) -> bytes:
+        """
+        Returns the next frame of the body, which must not be its end
+        """
+        length = _FRAME.unpack(self._read(_FRAME.size))[0]
+        if length == 0:
+            raise ValueError(f'{self._path} ends too early')
+        return self._read(length)
+
+    def frames(self):
+        """
+        Yields every remaining frame of the body, then checks the checksum
+        """
+        while True:
+            length = _FRAME.unpack(self._read(_FRAME.size))[0]
+            if length == 0:
+                break
+            yield self._read(length)
+
+        # Whatever follows the body holds the stored checksum
+        if self._decompressor is not None:
+            while not self._decompressor.eof:
+                data = self._file.read(1 << 20)
+                if not data:
+                    raise ValueError(f'{self._path} is truncated')
+                self._buffer += self._decompressor.decompress(data)
+            rest = self._decompressor.unused_data + self._file.read()
+        else:
+            rest = bytes(self._buffer) + self._file.read()
+        if ((self._decompressor is not None and self._buffer)
+                or len(rest) != _CHECKSUM.size
+                or _CHECKSUM.unpack(rest)[0] != self._checksum):
+            raise ValueError(f'{self._path} failed its checksum')
+
+    def entries(self):
+        """
+        Yields the (hashes, keys, values) lists of every remaining frame,
+        each written by SnapshotWriter.write_entries
+        """
+        for frame in self.frames():
+            hash_bytes, keys, values = pickle.loads(frame)
+            hashes = array('Q')
+            hashes.frombytes(hash_bytes)
+            yield hashes.tolist(), keys, values